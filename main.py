@@ -11,20 +11,49 @@ Arguments:
     --no-tray: Start without system tray icon
     --no-browser: Don't auto-open browser on startup
 """
-import argparse
+# Packages and data files for the standalone build (scripts/build_mac.py,
+# scripts/build_windows.py). Platform switches stay on the build command line.
+# nuitka-project: --include-package=trailing_stop_web
+# nuitka-project: --include-package=reflex
+# nuitka-project: --include-package=uvicorn
+# nuitka-project: --include-package=pystray
+# nuitka-project: --include-package=PIL
+# nuitka-project: --include-package=plotly
+# nuitka-project: --include-package=ib_insync
+# nuitka-project: --include-data-dir={MAIN_DIRECTORY}/trailing_stop_web=trailing_stop_web
+# nuitka-project: --include-data-files={MAIN_DIRECTORY}/rxconfig.py=rxconfig.py
+# nuitka-project: --include-data-files={MAIN_DIRECTORY}/assets/EdgeSeeker-Icon.png=assets/
+# nuitka-project-if: {OS} == "Darwin":
+#    nuitka-project: --include-data-files={MAIN_DIRECTORY}/assets/TrayIconTemplate*.png=assets/
+# nuitka-project-if: {OS} == "Windows":
+#    nuitka-project: --include-data-dir={MAIN_DIRECTORY}/.web=.web
+#    nuitka-project: --include-data-files={MAIN_DIRECTORY}/assets/TrayIcon.ico=assets/
 import atexit
+import functools
 import logging
 import os
+import select
 import signal
+import socket
 import subprocess
 import sys
 import threading
 import time
-import urllib.request
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from trailing_stop_web.tray import SystemTray
+from trailing_stop_web import processes
 from trailing_stop_web.paths import get_app_data_dir
+from trailing_stop_web.processes import (
+    SHUTDOWN_SIGNALS,
+    start_exit_watchdog,
+    tcp_ready,
+    wait_for_exit,
+)
+
+if TYPE_CHECKING:
+    # pystray/Pillow are only loaded once the tray actually starts
+    from trailing_stop_web.tray import SystemTray
 
 # Configure logging
 logging.basicConfig(
@@ -35,75 +64,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# === PID Management (shared with main_desktop.py) ===
+# === PID Management (see trailing_stop_web.processes) ===
+@functools.lru_cache(maxsize=1)
 def get_pid_file_path() -> Path:
-    """Get PID file path in app data directory."""
+    """Get PID file path in app data directory (computed once per process)."""
     return get_app_data_dir() / ".trailing_stop.pid"
 
 
-def save_pids(pids: dict[str, int]) -> None:
-    """Save process IDs to file for cleanup on next start."""
-    try:
-        pid_file = get_pid_file_path()
-        with open(pid_file, "w") as f:
-            for name, pid in pids.items():
-                f.write(f"{name}:{pid}\n")
-        logger.info(f"Saved PIDs to {pid_file}")
-    except Exception as e:
-        logger.debug(f"Could not save PIDs: {e}")
-
-
-def cleanup_ports() -> None:
-    """Kill any processes using our ports (3000-3005, 8000-8005)."""
-    ports = list(range(3000, 3006)) + list(range(8000, 8006))
-    for port in ports:
-        try:
-            result = subprocess.run(
-                ["lsof", "-ti", f":{port}"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                for pid_str in result.stdout.strip().split('\n'):
-                    try:
-                        pid = int(pid_str)
-                        if pid != os.getpid():
-                            os.kill(pid, signal.SIGKILL)
-                            logger.info(f"Killed process on port {port} (PID {pid})")
-                    except (ProcessLookupError, ValueError, PermissionError):
-                        pass
-        except Exception:
-            pass
+# Ports and command lines of a previous instance (cleaned up on start)
+PORTS = {*range(3000, 3006), *range(8000, 8006)}
+PROCESS_PATTERNS = [
+    "reflex run",
+    "trailing_stop_web",
+    "bun run dev",
+    "bun.*trailing",
+]
 
 
-def cleanup_processes_by_name() -> None:
-    """Kill related processes by name patterns."""
-    patterns = [
-        "reflex run",
-        "trailing_stop_web",
-        "bun run dev",
-        "bun.*trailing",
-    ]
-    for pattern in patterns:
-        try:
-            result = subprocess.run(
-                ["pgrep", "-f", pattern],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                for pid_str in result.stdout.strip().split('\n'):
-                    try:
-                        pid = int(pid_str)
-                        if pid != os.getpid():
-                            os.kill(pid, signal.SIGKILL)
-                            logger.info(f"Killed '{pattern}' (PID {pid})")
-                    except (ProcessLookupError, ValueError, PermissionError):
-                        pass
-        except Exception:
-            pass
+def save_pids(pids: dict[str, int]) -> None:
+    """Save process IDs to file for cleanup on next start."""
+    processes.save_pids(get_pid_file_path(), pids)
 
 
 def cleanup_vite_cache() -> None:
@@ -119,44 +99,14 @@ def cleanup_vite_cache() -> None:
 
 
 def cleanup_previous_instance() -> None:
-    """Kill processes from previous instance (aggressive cleanup)."""
-    # 1. Cleanup by PID file
-    pid_file = get_pid_file_path()
-    if pid_file.exists():
-        try:
-            with open(pid_file, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if ":" in line:
-                        name, pid_str = line.split(":", 1)
-                        try:
-                            pid = int(pid_str)
-                            os.kill(pid, signal.SIGKILL)
-                            logger.info(f"Killed previous {name} (PID {pid})")
-                        except (ProcessLookupError, ValueError):
-                            pass
-                        except PermissionError:
-                            logger.warning(f"No permission to kill {name} (PID {pid_str})")
-            pid_file.unlink(missing_ok=True)
-        except Exception as e:
-            logger.debug(f"PID cleanup error: {e}")
-
-    # 2. Cleanup by process name patterns
-    cleanup_processes_by_name()
-
-    # 3. Cleanup by ports
-    cleanup_ports()
-
-    # 4. Clear Vite cache
+    """Kill processes from previous instance and clear the Vite cache."""
+    processes.cleanup_previous_instance(get_pid_file_path(), PORTS, PROCESS_PATTERNS)
     cleanup_vite_cache()
 
 
 def remove_pid_file() -> None:
     """Remove PID file on clean shutdown."""
-    try:
-        get_pid_file_path().unlink(missing_ok=True)
-    except Exception:
-        pass
+    processes.remove_pid_file(get_pid_file_path())
 
 
 class ReflexApp:
@@ -170,13 +120,19 @@ class ReflexApp:
         """
         self.project_dir = project_dir
         self.process: subprocess.Popen | None = None
-        self.tray: SystemTray | None = None
+        self.tray: "SystemTray | None" = None
         self._shutdown_initiated = threading.Event()
+        self._shutdown_lock = threading.RLock()
+        # Written once on shutdown so select()-based waits return immediately
+        self._wake_r, self._wake_w = socket.socketpair()
+        # Signal numbers land here via signal.set_wakeup_fd (see _watch_signals)
+        self._sig_r, self._sig_w = socket.socketpair()
+        self._sig_w.setblocking(False)
         self._reflex_ready = threading.Event()
         self._monitor_thread: threading.Thread | None = None
 
     def _wait_for_reflex_ready(self, timeout: int = 60) -> bool:
-        """Poll localhost:3000 until Reflex is ready or timeout.
+        """Probe localhost:3000 until Reflex accepts connections or timeout.
 
         Args:
             timeout: Maximum seconds to wait for Reflex
@@ -184,36 +140,34 @@ class ReflexApp:
         Returns:
             True if Reflex is ready, False if timeout
         """
-        start = time.time()
-        while time.time() - start < timeout:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
             if self._shutdown_initiated.is_set():
                 return False
 
-            try:
-                urllib.request.urlopen("http://localhost:3000", timeout=2)
+            if tcp_ready(3000):
                 self._reflex_ready.set()
                 return True
-            except Exception:
-                time.sleep(1)
+
+            # Idle until the next attempt unless shutdown wakes us
+            select.select([self._wake_r], [], [], 0.05)
 
         return False
 
     def _monitor_reflex_process(self) -> None:
         """Monitor Reflex process health in background thread."""
-        while not self._shutdown_initiated.is_set():
-            if self.process and self.process.poll() is not None:
-                exit_code = self.process.returncode
-                if not self._shutdown_initiated.is_set():
-                    logger.error(f"Reflex process crashed (exit code: {exit_code})")
-                    self._reflex_ready.clear()
-                break
-            time.sleep(2)
+        process = self.process
+        if process and wait_for_exit(process, wake=self._wake_r):
+            if not self._shutdown_initiated.is_set():
+                logger.error(f"Reflex process crashed (exit code: {process.returncode})")
+                self._reflex_ready.clear()
 
     def start_reflex(self) -> None:
         """Start the Reflex application as a subprocess."""
         try:
             # Start reflex run in the project directory
             # Don't capture stdout - let it flow to terminal
+            # List argv, no shell/preexec_fn: keeps CPython on its vfork() fast path
             self.process = subprocess.Popen(
                 [sys.executable, "-m", "reflex", "run", "--loglevel", "info"],
                 cwd=self.project_dir,
@@ -221,9 +175,8 @@ class ReflexApp:
 
             logger.info("Starting Reflex application...")
 
-            # Check for immediate crash
-            time.sleep(1)
-            if self.process.poll() is not None:
+            # Check for immediate crash (returns as soon as the child exits)
+            if wait_for_exit(self.process, timeout=0.05):
                 logger.error(f"Reflex failed to start (exit code: {self.process.returncode})")
                 return
 
@@ -259,10 +212,9 @@ class ReflexApp:
             # Try graceful shutdown first
             self.process.terminate()
 
-            try:
-                exit_code = self.process.wait(timeout=5)
-                logger.info(f"Reflex stopped gracefully (exit code: {exit_code})")
-            except subprocess.TimeoutExpired:
+            if wait_for_exit(self.process, timeout=5):
+                logger.info(f"Reflex stopped gracefully (exit code: {self.process.returncode})")
+            else:
                 # Force kill if graceful shutdown fails
                 logger.warning("Force stopping Reflex...")
                 self.process.kill()
@@ -278,6 +230,8 @@ class ReflexApp:
 
     def start_tray(self) -> None:
         """Start the system tray icon (runs in main thread on macOS)."""
+        from trailing_stop_web.tray import SystemTray
+
         self.tray = SystemTray(on_quit=self._on_tray_quit)
         logger.info("System tray icon started")
         # Run tray in main thread (required on macOS)
@@ -294,25 +248,51 @@ class ReflexApp:
         if self._shutdown_initiated.is_set():
             return
         self._shutdown_initiated.set()
+        start_exit_watchdog()
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
         logger.info("Shutdown initiated...")
 
+    def _watch_signals(self) -> None:
+        """Run shutdown as soon as a shutdown signal arrives (background thread).
+
+        Python only runs signal handlers when the main thread executes
+        bytecode, which it doesn't while parked in the tray's native event
+        loop. set_wakeup_fd() writes the signal number to ``_sig_w`` from C,
+        so this thread sees it immediately.
+        """
+        while True:
+            try:
+                data = self._sig_r.recv(64)
+            except OSError:
+                return
+            if not data:
+                return
+            if any(signum in SHUTDOWN_SIGNALS for signum in data):
+                self.shutdown()
+                return
+
     def shutdown(self) -> None:
         """Shutdown the entire application (idempotent)."""
-        # Mark shutdown as initiated
-        self._initiate_shutdown()
+        # Serialized: the signal watcher and the main thread may both get here
+        with self._shutdown_lock:
+            # Mark shutdown as initiated
+            self._initiate_shutdown()
 
-        # Stop Reflex
-        self.stop_reflex()
+            # Stop Reflex
+            self.stop_reflex()
 
-        # Stop tray if running
-        if self.tray:
-            try:
-                self.tray.stop()
-            except Exception as e:
-                logger.debug(f"Tray already stopped: {e}")
+            # Stop tray if running
+            if self.tray:
+                try:
+                    self.tray.stop()
+                except Exception as e:
+                    logger.debug(f"Tray already stopped: {e}")
 
-        # Remove PID file on clean shutdown
-        remove_pid_file()
+            # Remove PID file on clean shutdown
+            remove_pid_file()
 
     def run(self, use_tray: bool = True, open_browser: bool = True) -> None:
         """Run the application.
@@ -324,14 +304,18 @@ class ReflexApp:
         # Register cleanup handler
         atexit.register(self.shutdown)
 
-        # Handle Ctrl+C gracefully
+        # Handle Ctrl+C, SIGTERM and terminal hangup gracefully
         def signal_handler(sig, frame):
             logger.info(f"Received signal {sig}")
             self.shutdown()
             sys.exit(0)
 
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        for sig in SHUTDOWN_SIGNALS:
+            signal.signal(sig, signal_handler)
+
+        # Deliver signals to the watcher thread even while main is in native code
+        signal.set_wakeup_fd(self._sig_w.fileno(), warn_on_full_buffer=False)
+        threading.Thread(target=self._watch_signals, daemon=True).start()
 
         # Clean up any leftover processes from previous runs
         cleanup_previous_instance()
@@ -374,12 +358,14 @@ class ReflexApp:
             print("\nApplication running at http://localhost:3000")
             print("Press Ctrl+C to quit.\n")
 
-            # Wait for reflex thread or shutdown
+            # Wait for reflex thread or shutdown (blocks without periodic wakeups)
+            def _shutdown_when_reflex_exits() -> None:
+                reflex_thread.join()
+                self._initiate_shutdown()
+
+            threading.Thread(target=_shutdown_when_reflex_exits, daemon=True).start()
             try:
-                while not self._shutdown_initiated.is_set():
-                    reflex_thread.join(timeout=1)
-                    if not reflex_thread.is_alive():
-                        break
+                self._shutdown_initiated.wait()
             except KeyboardInterrupt:
                 pass
             finally:
@@ -388,6 +374,8 @@ class ReflexApp:
 
 def main() -> None:
     """Main entry point for the application."""
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Trailing Stop Manager - Desktop Application"
     )
@@ -9,17 +9,26 @@ This module starts:
 For Nuitka deployment only - use main.py for development.
 """
 import atexit
+import functools
 import logging
 import os
+import select
 import signal
+import socket
 import subprocess
 import sys
 import threading
 import time
-import urllib.request
-import webbrowser
 from pathlib import Path
 
+from trailing_stop_web import processes
+from trailing_stop_web.processes import (
+    SHUTDOWN_SIGNALS,
+    start_exit_watchdog,
+    tcp_ready,
+    wait_for_exit,
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -50,8 +59,9 @@ os.chdir(APP_DIR)
 logger.info(f"App directory: {APP_DIR}")
 
 
+@functools.lru_cache(maxsize=1)
 def get_pid_file_path() -> Path:
-    """Get PID file path in app data directory (lazy evaluation)."""
+    """Get PID file path in app data directory (lazy, computed once per process)."""
     try:
         from trailing_stop_web.paths import get_app_data_dir
         return get_app_data_dir() / ".trailing_stop.pid"
@@ -60,107 +70,29 @@ def get_pid_file_path() -> Path:
         return APP_DIR / ".trailing_stop.pid"
 
 
-def save_pids(pids: dict[str, int]) -> None:
-    """Save process IDs to file for cleanup on next start."""
-    try:
-        pid_file = get_pid_file_path()
-        with open(pid_file, "w") as f:
-            for name, pid in pids.items():
-                f.write(f"{name}:{pid}\n")
-        logger.info(f"Saved PIDs to {pid_file}")
-    except Exception as e:
-        logger.debug(f"Could not save PIDs: {e}")
-
-
-def cleanup_ports() -> None:
-    """Kill any processes using our ports (5173-5178, 8000-8005)."""
-    ports = list(range(5173, 5179)) + list(range(8000, 8006))
-    for port in ports:
-        try:
-            result = subprocess.run(
-                ["lsof", "-ti", f":{port}"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                for pid_str in result.stdout.strip().split('\n'):
-                    try:
-                        pid = int(pid_str)
-                        if pid != os.getpid():
-                            os.kill(pid, signal.SIGKILL)
-                            logger.info(f"Killed process on port {port} (PID {pid})")
-                    except (ProcessLookupError, ValueError, PermissionError):
-                        pass
-        except Exception:
-            pass
+# Ports and command lines of a previous instance (cleaned up on start)
+PORTS = {*range(5173, 5179), *range(8000, 8006)}
+PROCESS_PATTERNS = [
+    "main_desktop",
+    "trailing_stop_web",
+    "bun run dev",
+    "bun.*trailing",
+]
 
 
-def cleanup_processes_by_name() -> None:
-    """Kill related processes by name patterns."""
-    patterns = [
-        "main_desktop",
-        "trailing_stop_web",
-        "bun run dev",
-        "bun.*trailing",
-    ]
-    for pattern in patterns:
-        try:
-            result = subprocess.run(
-                ["pgrep", "-f", pattern],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                for pid_str in result.stdout.strip().split('\n'):
-                    try:
-                        pid = int(pid_str)
-                        if pid != os.getpid():
-                            os.kill(pid, signal.SIGKILL)
-                            logger.info(f"Killed '{pattern}' (PID {pid})")
-                    except (ProcessLookupError, ValueError, PermissionError):
-                        pass
-        except Exception:
-            pass
+def save_pids(pids: dict[str, int]) -> None:
+    """Save process IDs to file for cleanup on next start."""
+    processes.save_pids(get_pid_file_path(), pids)
 
 
 def cleanup_previous_instance() -> None:
     """Kill processes from previous instance (aggressive cleanup)."""
-    # 1. Cleanup by PID file
-    pid_file = get_pid_file_path()
-    if pid_file.exists():
-        try:
-            with open(pid_file, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if ":" in line:
-                        name, pid_str = line.split(":", 1)
-                        try:
-                            pid = int(pid_str)
-                            os.kill(pid, signal.SIGKILL)
-                            logger.info(f"Killed previous {name} (PID {pid})")
-                        except (ProcessLookupError, ValueError):
-                            pass
-                        except PermissionError:
-                            logger.warning(f"No permission to kill {name} (PID {pid_str})")
-            pid_file.unlink(missing_ok=True)
-        except Exception as e:
-            logger.debug(f"PID cleanup error: {e}")
-
-    # 2. Cleanup by process name patterns
-    cleanup_processes_by_name()
-
-    # 3. Cleanup by ports
-    cleanup_ports()
+    processes.cleanup_previous_instance(get_pid_file_path(), PORTS, PROCESS_PATTERNS)
 
 
 def remove_pid_file() -> None:
     """Remove PID file on clean shutdown."""
-    try:
-        get_pid_file_path().unlink(missing_ok=True)
-    except Exception:
-        pass
+    processes.remove_pid_file(get_pid_file_path())
 
 
 class DesktopApp:
@@ -168,9 +100,15 @@ class DesktopApp:
 
     def __init__(self):
         self.app_dir = APP_DIR
-        self._shutdown = threading.Event()
-        self._backend_ready = threading.Event()
-        self._frontend_ready = threading.Event()
+        # Startup/shutdown status shared by all threads, guarded by one Condition
+        self._cv = threading.Condition()
+        self._status = {"backend": False, "frontend": False, "shutdown": False, "cleanup": False}
+        self._shutdown_lock = threading.RLock()
+        # Written once on shutdown so select()-based waits return immediately
+        self._wake_r, self._wake_w = socket.socketpair()
+        # Signal numbers land here via signal.set_wakeup_fd (see _watch_signals)
+        self._sig_r, self._sig_w = socket.socketpair()
+        self._sig_w.setblocking(False)
         self.backend_process = None
         self.frontend_process = None
         self.tray = None
@@ -190,17 +128,29 @@ class DesktopApp:
 
         return None
 
+    def _set_status(self, key: str) -> bool:
+        """Set a status flag and wake all waiters.
+
+        Returns:
+            False if the flag was already set
+        """
+        with self._cv:
+            if self._status[key]:
+                return False
+            self._status[key] = True
+            self._cv.notify_all()
+        return True
+
     def _wait_for_port(self, port: int, timeout: int = 60) -> bool:
         """Wait for a port to become available."""
-        start = time.time()
-        while time.time() - start < timeout:
-            if self._shutdown.is_set():
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._status["shutdown"]:
                 return False
-            try:
-                urllib.request.urlopen(f"http://localhost:{port}", timeout=2)
+            if tcp_ready(port):
                 return True
-            except Exception:
-                time.sleep(0.5)
+            # Idle until the next attempt unless shutdown wakes us
+            select.select([self._wake_r], [], [], 0.05)
         return False
 
     def start_backend(self):
@@ -243,7 +193,7 @@ class DesktopApp:
             # Run server (set ready flag after server starts)
             async def serve_and_signal():
                 # Server.serve() doesn't have a "started" callback, so we use startup event
-                self._backend_ready.set()
+                self._set_status("backend")
                 await server.serve()
 
             loop.run_until_complete(serve_and_signal())
@@ -293,6 +243,7 @@ class DesktopApp:
 
             # Start dev server
             logger.info("Starting frontend dev server...")
+            # List argv, no shell/preexec_fn: keeps CPython on its vfork() fast path
             self.frontend_process = subprocess.Popen(
                 [str(bun), "run", "dev"],
                 cwd=web_dir,
@@ -302,7 +253,7 @@ class DesktopApp:
 
             # Wait for frontend to be ready (Vite uses port 5173 by default)
             if self._wait_for_port(5173, timeout=60):
-                self._frontend_ready.set()
+                self._set_status("frontend")
                 logger.info("Frontend ready on http://localhost:5173")
             else:
                 logger.error("Frontend failed to start")
@@ -322,39 +273,73 @@ class DesktopApp:
             logger.warning(f"System tray not available: {e}")
             # Keep running without tray
             try:
-                while not self._shutdown.is_set():
-                    time.sleep(1)
+                with self._cv:
+                    self._cv.wait_for(lambda: self._status["shutdown"])
             except KeyboardInterrupt:
                 pass
 
+    def _set_shutdown(self):
+        """Flag shutdown and wake any thread blocked in select()."""
+        if self._set_status("shutdown"):
+            start_exit_watchdog()
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
     def _on_quit(self):
         """Handle quit from tray."""
-        self._shutdown.set()
+        self._set_shutdown()
 
-    def shutdown(self):
-        """Shutdown all services."""
-        if self._shutdown.is_set():
-            return
-        self._shutdown.set()
-        logger.info("Shutting down...")
+    def _watch_signals(self) -> None:
+        """Run shutdown as soon as a shutdown signal arrives (background thread).
 
-        # Stop frontend
-        if self.frontend_process:
+        Python only runs signal handlers when the main thread executes
+        bytecode, which it doesn't while parked in the tray's native event
+        loop. set_wakeup_fd() writes the signal number to ``_sig_w`` from C,
+        so this thread sees it immediately.
+        """
+        while True:
             try:
-                self.frontend_process.terminate()
-                self.frontend_process.wait(timeout=5)
-            except Exception:
-                self.frontend_process.kill()
-
-        # Stop tray
-        if self.tray:
-            try:
-                self.tray.stop()
-            except Exception:
-                pass
+                data = self._sig_r.recv(64)
+            except OSError:
+                return
+            if not data:
+                return
+            if any(signum in SHUTDOWN_SIGNALS for signum in data):
+                self.shutdown()
+                return
 
-        # Remove PID file on clean shutdown
-        remove_pid_file()
+    def shutdown(self):
+        """Shutdown all services (idempotent)."""
+        # Serialized: the signal watcher and the main thread may both get
+        # here, and a late caller must not return before cleanup is done
+        with self._shutdown_lock:
+            # Tracked apart from "shutdown": a tray Quit requests shutdown first,
+            # and the cleanup below must still run afterwards
+            if not self._set_status("cleanup"):
+                return
+            self._set_shutdown()
+            logger.info("Shutting down...")
+
+            # Stop frontend
+            if self.frontend_process:
+                try:
+                    self.frontend_process.terminate()
+                    if not wait_for_exit(self.frontend_process, timeout=5):
+                        self.frontend_process.kill()
+                except Exception:
+                    self.frontend_process.kill()
+
+            # Stop tray
+            if self.tray:
+                try:
+                    self.tray.stop()
+                except Exception:
+                    pass
+
+            # Remove PID file on clean shutdown
+            remove_pid_file()
 
     def run(self, open_browser: bool = True):
         """Run the application."""
@@ -363,8 +348,13 @@ class DesktopApp:
             self.shutdown()
             sys.exit(0)
 
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        for sig in SHUTDOWN_SIGNALS:
+            signal.signal(sig, signal_handler)
+
+        # Deliver signals to the watcher thread even while main is in native code
+        signal.set_wakeup_fd(self._sig_w.fileno(), warn_on_full_buffer=False)
+        threading.Thread(target=self._watch_signals, daemon=True).start()
+
         atexit.register(self.shutdown)
 
         # Clean up any leftover processes from previous runs
@@ -381,8 +371,20 @@ class DesktopApp:
         # Wait for both to be ready
         logger.info("Waiting for services...")
 
-        backend_ok = self._backend_ready.wait(timeout=30)
-        frontend_ok = self._frontend_ready.wait(timeout=120)
+        # Backend gets 30 s; the frontend's 120 s run from the same start
+        deadline = time.monotonic() + 120
+        with self._cv:
+            self._cv.wait_for(lambda: self._status["backend"] or self._status["shutdown"], timeout=30)
+            if self._status["backend"]:
+                self._cv.wait_for(
+                    lambda: self._status["frontend"] or self._status["shutdown"],
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+            backend_ok = self._status["backend"]
+            frontend_ok = self._status["frontend"]
+
+        if self._status["shutdown"]:
+            return
 
         if not backend_ok:
             logger.error("Backend failed to start")
@@ -400,6 +402,7 @@ class DesktopApp:
 
         # Open browser
         if open_browser and (backend_ok or frontend_ok):
+            import webbrowser
             url = "http://localhost:5173" if frontend_ok else "http://localhost:8000"
             logger.info(f"Opening browser: {url}")
             webbrowser.open(url)
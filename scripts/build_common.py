@@ -0,0 +1,282 @@
+"""Shared build steps for the macOS and Windows build scripts.
+
+build_mac.py and build_windows.py subclass BaseBuilder and add only the
+platform check, the platform-specific Nuitka flags, the runtime download and
+the installer step.
+"""
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import importlib.metadata
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+ASSETS_DIR = PROJECT_ROOT / "assets"
+DIST_DIR = PROJECT_ROOT / "dist"
+BUILD_DIR = PROJECT_ROOT / "build"
+CACHE_DIR = PROJECT_ROOT / ".cache"
+RUNTIME_CACHE = Path.home() / ".cache" / "trailing_stop_builds"
+
+APP_NAME = "Trailing Stop Manager"
+APP_BUNDLE_NAME = "TrailingStopManager"
+APP_IDENTIFIER = "com.edgeseeker.trailingstop"
+APP_VERSION = "1.0.0"
+
+
+@functools.lru_cache(maxsize=1)
+def plotly_validator_data() -> tuple[Path, ...]:
+    """Return plotly's top-level validator data files (plotly 6's _validators.json).
+
+    Only these need shipping; the validator modules are compiled via
+    --include-package=plotly, so the ~5000-file tree is not walked as data.
+    Located with find_spec, so plotly itself is never imported.
+    """
+    spec = importlib.util.find_spec("plotly")
+    validators = Path(spec.submodule_search_locations[0]) / "validators"
+    return tuple(sorted(p for p in validators.iterdir() if p.suffix == ".json"))
+
+
+def build_arg_parser(platform_name: str, installer_help: str) -> argparse.ArgumentParser:
+    """Create the command line parser shared by the build scripts."""
+    parser = argparse.ArgumentParser(description=f"Build {APP_NAME} for {platform_name}")
+    parser.add_argument("--skip-icons", action="store_true", help="Skip icon generation")
+    parser.add_argument("--skip-nuitka", action="store_true", help="Skip Nuitka build")
+    parser.add_argument("--force", action="store_true", help="Rebuild with Nuitka even if inputs are unchanged")
+    parser.add_argument("--release", action="store_true", help="Link-time optimized build (slower to compile)")
+    parser.add_argument("--keep-build", action="store_true", help="Keep build/ after a successful build")
+    parser.add_argument("--skip-installer", action="store_true", help=installer_help)
+    return parser
+
+
+class BaseBuilder(ABC):
+    """Build process shared by the platform builders."""
+
+    PLATFORM_NAME = ""
+    # Icon passed to Nuitka, relative to ASSETS_DIR
+    ICON_FILE = ""
+    # Nuitka names its output after the entry point: main.app / main.dist
+    NUITKA_OUTPUT = ""
+    # Where the finished app is moved to
+    FINAL_OUTPUT = DIST_DIR / APP_BUNDLE_NAME
+    INSTALLER_OUTPUT = DIST_DIR
+    # Source trees bundled by Nuitka, hashed by size and mtime
+    SOURCE_DIRS: tuple[Path, ...] = (PROJECT_ROOT / "trailing_stop_web",)
+
+    def __init__(self, skip_icons: bool = False, skip_nuitka: bool = False, skip_installer: bool = False,
+                 keep_build: bool = False, force: bool = False, release: bool = False):
+        self.skip_icons = skip_icons
+        self.skip_nuitka = skip_nuitka
+        self.skip_installer = skip_installer
+        self.keep_build = keep_build
+        self.force = force
+        self.release = release
+        self.start_time = datetime.now()
+        self._runtime_future: concurrent.futures.Future | None = None
+
+    def log(self, msg: str, level: str = "INFO"):
+        """Log with timestamp."""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        print(f"[{timestamp}] {level}: {msg}")
+
+    def run(self, cmd: list[str], cwd: Path = None, check: bool = True,
+            env: dict[str, str] | None = None) -> subprocess.CompletedProcess:
+        """Run command directly (no shell), so arguments with spaces need no quoting."""
+        self.log(f"Running: {' '.join(cmd[:3])}...")
+        return subprocess.run(cmd, cwd=cwd or PROJECT_ROOT, check=check, env=env)
+
+    @abstractmethod
+    def check_platform(self):
+        """Exit unless running on the target platform."""
+        raise NotImplementedError
+
+    def generate_icons(self):
+        """Generate icon assets."""
+        if self.skip_icons and (ASSETS_DIR / self.ICON_FILE).exists():
+            self.log("Skipping icon generation (--skip-icons)")
+            return
+
+        self.log("Generating icons...")
+        self.run([sys.executable, str(PROJECT_ROOT / "scripts" / "generate_icons.py")])
+
+    def _fast_rmtree(self, path: Path):
+        """Delete a directory tree with the platform's native tool; missing paths are fine.
+
+        rm -rf / rmdir /S /Q unlink entries natively instead of a Python-level
+        stat/unlink per entry, which matters on Nuitka's 100k-file build trees.
+        """
+        if os.name == "nt":
+            cmd = ["cmd", "/c", "rmdir", "/S", "/Q", str(path)]
+        else:
+            cmd = ["rm", "-rf", "--", str(path)]
+        subprocess.run(cmd, check=False, capture_output=True)
+        if path.exists():
+            shutil.rmtree(path)
+
+    def _reset_dir(self, path: Path):
+        """Replace path with an empty directory, whether or not it existed."""
+        self._fast_rmtree(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+    def clean_build(self):
+        """Clean previous build artifacts."""
+        self.log("Cleaning previous builds...")
+        # The app in dist/ is kept: build_nuitka replaces it, or reuses it if
+        # the build inputs are unchanged
+        if BUILD_DIR.exists():
+            self._fast_rmtree(BUILD_DIR)
+            self.log(f"  Removed: {BUILD_DIR.name}")
+
+    def _input_hash(self, cmd: list[str]) -> str:
+        """Hash every input of the Nuitka build.
+
+        Covers the command line, the Python/Nuitka/package versions, the entry
+        point and config files, the assets (by content, since generate_icons
+        rewrites them on every run) and the source trees (by size and mtime).
+        """
+        h = hashlib.sha256()
+        for arg in cmd:
+            h.update(arg.encode() + b"\0")
+
+        nuitka_version = subprocess.run(
+            [sys.executable, "-m", "nuitka", "--version"], capture_output=True, text=True
+        ).stdout
+        h.update(sys.version.encode() + nuitka_version.encode())
+        packages = sorted(f"{d.metadata['Name']}=={d.version}" for d in importlib.metadata.distributions())
+        h.update("\n".join(packages).encode())
+
+        for path in [PROJECT_ROOT / "main.py", PROJECT_ROOT / "rxconfig.py", *sorted(ASSETS_DIR.iterdir())]:
+            if path.is_file():
+                h.update(path.name.encode() + b"\0" + path.read_bytes())
+
+        for root in self.SOURCE_DIRS:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    st = os.stat(path)
+                    h.update(f"{os.path.relpath(path, PROJECT_ROOT)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+
+        return h.hexdigest()
+
+    @abstractmethod
+    def _nuitka_platform_flags(self) -> list[str]:
+        """Return the platform-specific Nuitka flags."""
+        raise NotImplementedError
+
+    def _nuitka_env(self) -> dict[str, str]:
+        """Return the environment Nuitka runs in."""
+        return os.environ.copy()
+
+    def _after_nuitka(self, final_output: Path):
+        """Post-process the app in dist/, after a build or a hash match."""
+
+    def build_nuitka(self):
+        """Build with Nuitka."""
+        if self.skip_nuitka:
+            self.log("Skipping Nuitka build (--skip-nuitka)")
+            return
+
+        self.log("Building with Nuitka (this takes 10-30 minutes)...")
+
+        cmd = [
+            sys.executable, "-m", "nuitka",
+            "--standalone",
+            "--assume-yes-for-downloads",
+            f"--output-dir={BUILD_DIR}",
+
+            *self._nuitka_platform_flags(),
+
+            # Packages, data files and tray icons come from the
+            # "# nuitka-project:" options in main.py
+            *(f"--include-data-files={p}=plotly/validators/{p.name}" for p in plotly_validator_data()),
+
+            # Optimization
+            "--remove-output",
+            f"--jobs={os.cpu_count()}",
+            # LTO only for release builds; it multiplies link time, and being
+            # part of cmd it also keys the build hash
+            "--lto=yes" if self.release else "--lto=no",
+
+            # Entry point
+            str(PROJECT_ROOT / "main.py"),
+        ]
+
+        final_output = self.FINAL_OUTPUT
+        hash_file = DIST_DIR / f"{APP_BUNDLE_NAME}.buildhash"
+        input_hash = self._input_hash(cmd)
+        if (not self.force and final_output.exists() and hash_file.exists()
+                and hash_file.read_text() == input_hash):
+            self.log("Nuitka build up-to-date (hash match)")
+            self._after_nuitka(final_output)
+            return
+
+        self.run(cmd, env=self._nuitka_env())
+
+        output = BUILD_DIR / self.NUITKA_OUTPUT
+        if not output.is_dir():
+            self.log(f"Nuitka build failed - no {output.name} found!", "ERROR")
+            sys.exit(1)
+
+        # Move to dist
+        DIST_DIR.mkdir(exist_ok=True)
+        self._fast_rmtree(final_output)
+        shutil.move(str(output), str(final_output))
+        hash_file.write_text(input_hash)
+
+        self.log(f"Build created: {final_output}")
+        self._after_nuitka(final_output)
+
+    @abstractmethod
+    def download_runtime(self) -> Path:
+        """Download the JavaScript runtime bundled with the installer."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_installer(self):
+        """Create the platform installer."""
+        raise NotImplementedError
+
+    def cleanup(self):
+        """Clean up temporary build files."""
+        if self.keep_build:
+            self.log(f"Keeping build directory (--keep-build): {BUILD_DIR}")
+            return
+
+        self.log("Cleaning up...")
+        if BUILD_DIR.exists():
+            self._fast_rmtree(BUILD_DIR)
+
+    def build(self):
+        """Run full build process."""
+        self.log("=" * 60)
+        self.log(f"Building {APP_NAME} for {self.PLATFORM_NAME}")
+        self.log("=" * 60)
+
+        self.check_platform()
+
+        # The runtime download and icon generation don't depend on Nuitka, so
+        # run them alongside; icons must exist before Nuitka bundles them
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+            if not self.skip_installer:
+                self._runtime_future = pool.submit(self.download_runtime)
+            icons = pool.submit(self.generate_icons)
+            self.clean_build()
+            icons.result()
+            self.build_nuitka()
+            self.create_installer()
+        self.cleanup()
+
+        elapsed = datetime.now() - self.start_time
+        self.log("=" * 60)
+        self.log(f"Build complete in {elapsed}")
+        self.log(f"App: {self.FINAL_OUTPUT}")
+        self.log(f"Installer: {self.INSTALLER_OUTPUT}")
+        self.log("=" * 60)
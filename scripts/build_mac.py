@@ -7,50 +7,45 @@ This script:
 3. Creates a .pkg installer that includes Bun runtime
 
 Usage:
-    python scripts/build_mac.py [--skip-icons] [--skip-nuitka] [--skip-installer]
+    python scripts/build_mac.py [--skip-icons] [--skip-nuitka] [--skip-installer] [--force] [--release] [--keep-build]
 
 Requirements:
-    pip install nuitka ordered-set zstandard pillow numpy
+    pip install nuitka ordered-set zstandard pillow
 """
-import argparse
+import hashlib
 import os
 import platform
 import shutil
 import subprocess
 import sys
-from datetime import datetime
 from pathlib import Path
 
-PROJECT_ROOT = Path(__file__).parent.parent
-ASSETS_DIR = PROJECT_ROOT / "assets"
-DIST_DIR = PROJECT_ROOT / "dist"
-BUILD_DIR = PROJECT_ROOT / "build"
-INSTALLER_DIR = PROJECT_ROOT / "installer" / "mac"
+from build_common import (
+    APP_BUNDLE_NAME,
+    APP_IDENTIFIER,
+    APP_NAME,
+    APP_VERSION,
+    ASSETS_DIR,
+    BUILD_DIR,
+    CACHE_DIR,
+    DIST_DIR,
+    PROJECT_ROOT,
+    RUNTIME_CACHE,
+    BaseBuilder,
+    build_arg_parser,
+)
 
-APP_NAME = "Trailing Stop Manager"
-APP_BUNDLE_NAME = "TrailingStopManager"
-APP_IDENTIFIER = "com.edgeseeker.trailingstop"
-APP_VERSION = "1.0.0"
+INSTALLER_DIR = PROJECT_ROOT / "installer" / "mac"
 
 
-class MacBuilder:
+class MacBuilder(BaseBuilder):
     """Handles macOS build process."""
 
-    def __init__(self, skip_icons: bool = False, skip_nuitka: bool = False, skip_installer: bool = False):
-        self.skip_icons = skip_icons
-        self.skip_nuitka = skip_nuitka
-        self.skip_installer = skip_installer
-        self.start_time = datetime.now()
-
-    def log(self, msg: str, level: str = "INFO"):
-        """Log with timestamp."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {msg}")
-
-    def run(self, cmd: list[str], cwd: Path = None, check: bool = True) -> subprocess.CompletedProcess:
-        """Run command."""
-        self.log(f"Running: {' '.join(cmd[:3])}...")
-        return subprocess.run(cmd, cwd=cwd or PROJECT_ROOT, check=check, capture_output=False)
+    PLATFORM_NAME = "macOS"
+    ICON_FILE = "AppIcon.icns"
+    NUITKA_OUTPUT = "main.app"
+    FINAL_OUTPUT = DIST_DIR / f"{APP_BUNDLE_NAME}.app"
+    INSTALLER_OUTPUT = DIST_DIR / f"{APP_BUNDLE_NAME}-{APP_VERSION}.pkg"
 
     def check_platform(self):
         """Ensure we're on macOS."""
@@ -59,98 +54,30 @@ class MacBuilder:
             sys.exit(1)
         self.log("Platform: macOS")
 
-    def generate_icons(self):
-        """Generate icon assets."""
-        if self.skip_icons and (ASSETS_DIR / "AppIcon.icns").exists():
-            self.log("Skipping icon generation (--skip-icons)")
-            return
-
-        self.log("Generating icons...")
-        self.run([sys.executable, str(PROJECT_ROOT / "scripts" / "generate_icons.py")])
-
-    def clean_build(self):
-        """Clean previous build artifacts."""
-        self.log("Cleaning previous builds...")
-        for path in [BUILD_DIR, DIST_DIR / f"{APP_BUNDLE_NAME}.app"]:
-            if path.exists():
-                shutil.rmtree(path)
-                self.log(f"  Removed: {path.name}")
-
-    def build_nuitka(self):
-        """Build with Nuitka."""
-        if self.skip_nuitka:
-            self.log("Skipping Nuitka build (--skip-nuitka)")
-            return
-
-        self.log("Building with Nuitka (this takes 10-30 minutes)...")
-
-        # Get plotly path for validators data
-        import plotly
-        plotly_path = Path(plotly.__path__[0])
-
-        cmd = [
-            sys.executable, "-m", "nuitka",
-            "--standalone",
-            "--assume-yes-for-downloads",
-            f"--output-dir={BUILD_DIR}",
-
-            # macOS App Bundle
+    def _nuitka_platform_flags(self) -> list[str]:
+        """Return the macOS app bundle flags."""
+        # NOTE: .web is copied separately after build to avoid codesign issues
+        # (node_modules has 29k+ files which exceeds macOS codesign limits)
+        return [
             "--macos-create-app-bundle",
             f"--macos-app-name={APP_NAME}",
-            f"--macos-app-icon={ASSETS_DIR / 'AppIcon.icns'}",
+            f"--macos-app-icon={ASSETS_DIR / self.ICON_FILE}",
             "--macos-app-mode=ui-element",  # No dock icon (tray app)
-
-            # Include packages
-            "--include-package=trailing_stop_web",
-            "--include-package=reflex",
-            "--include-package=uvicorn",
-            "--include-package=pystray",
-            "--include-package=PIL",
-            "--include-package=plotly",
-            "--include-package=ib_insync",
-
-            # Include data files
-            # NOTE: .web is copied separately after build to avoid codesign issues
-            # (node_modules has 29k+ files which exceeds macOS codesign limits)
-            f"--include-data-dir={PROJECT_ROOT / 'trailing_stop_web'}=trailing_stop_web",
-            f"--include-data-file={PROJECT_ROOT / 'rxconfig.py'}=rxconfig.py",
-            f"--include-data-dir={plotly_path / 'validators'}=plotly/validators",
-
-            # Include tray icons
-            f"--include-data-file={ASSETS_DIR / 'TrayIconTemplate.png'}=assets/TrayIconTemplate.png",
-            f"--include-data-file={ASSETS_DIR / 'TrayIconTemplate@2x.png'}=assets/TrayIconTemplate@2x.png",
-            f"--include-data-file={ASSETS_DIR / 'EdgeSeeker-Icon.png'}=assets/EdgeSeeker-Icon.png",
-
-            # Optimization
-            "--remove-output",
-
-            # Entry point
-            str(PROJECT_ROOT / "main.py"),
         ]
 
-        self.run(cmd)
-
-        # Find and rename output
-        output_app = None
-        for app in BUILD_DIR.glob("*.app"):
-            output_app = app
-            break
-
-        if not output_app:
-            self.log("Nuitka build failed - no .app found!", "ERROR")
-            sys.exit(1)
+    def _nuitka_env(self) -> dict[str, str]:
+        """Point ccache at a persistent cache directory when it is installed."""
+        # Nuitka picks up ccache automatically; keep its object cache in a
+        # persistent project-local directory so rebuilds reuse compiled C files
+        env = super()._nuitka_env()
+        if shutil.which("ccache"):
+            env.setdefault("CCACHE_DIR", str(CACHE_DIR / "ccache"))
+            self.log(f"Using ccache: {env['CCACHE_DIR']}")
+        return env
 
-        # Move to dist
-        DIST_DIR.mkdir(exist_ok=True)
-        final_app = DIST_DIR / f"{APP_BUNDLE_NAME}.app"
-        if final_app.exists():
-            shutil.rmtree(final_app)
-        shutil.move(str(output_app), str(final_app))
-
-        self.log(f"App bundle created: {final_app}")
-
-        # Copy .web directory separately (without node_modules to avoid codesign issues)
-        self._copy_web_directory(final_app)
+    def _after_nuitka(self, final_output: Path):
+        """Copy .web into the bundle (without node_modules to avoid codesign issues)."""
+        self._copy_web_directory(final_output)
 
     def _copy_web_directory(self, app_bundle: Path):
         """Copy .web directory to app bundle, excluding node_modules."""
@@ -160,8 +87,7 @@ class MacBuilder:
         # For macOS app bundle, resources go into Contents/MacOS (where binary runs)
         dest_web = app_bundle / "Contents" / "MacOS" / ".web"
 
-        if dest_web.exists():
-            shutil.rmtree(dest_web)
+        self._fast_rmtree(dest_web)
 
         # Copy everything except node_modules
         def ignore_node_modules(directory, files):
@@ -175,33 +101,68 @@ class MacBuilder:
         file_count = sum(1 for _ in dest_web.rglob("*") if _.is_file())
         self.log(f"  Copied .web with {file_count} files (node_modules excluded)")
 
-    def download_bun(self) -> Path:
-        """Download Bun runtime for macOS."""
-        self.log("Downloading Bun runtime...")
+    def _fast_copytree(self, src: Path, dst: Path):
+        """Copy a directory tree, cloning files on APFS.
 
-        bun_dir = BUILD_DIR / "bun"
-        bun_dir.mkdir(parents=True, exist_ok=True)
+        ``cp -c`` uses clonefile(2), so the copy is copy-on-write and takes
+        no extra disk space or time proportional to the bundle size. Falls
+        back to shutil.copytree on volumes without clone support.
+        """
+        result = subprocess.run(["cp", "-cR", str(src), str(dst)], capture_output=True)
+        if result.returncode == 0:
+            return
+
+        self.log(f"  clonefile copy failed, falling back to shutil.copytree: {result.stderr.decode().strip()}")
+        self._fast_rmtree(dst)
+        shutil.copytree(src, dst, symlinks=True)
 
+    def download_bun(self) -> Path:
+        """Download Bun runtime for macOS."""
         # Detect architecture
         arch = "aarch64" if platform.machine() == "arm64" else "x64"
         bun_url = f"https://github.com/oven-sh/bun/releases/latest/download/bun-darwin-{arch}.zip"
 
-        zip_path = bun_dir / "bun.zip"
-
-        # Download
-        self.run(["curl", "-L", "-o", str(zip_path), bun_url])
-
-        # Extract
-        self.run(["unzip", "-o", str(zip_path), "-d", str(bun_dir)])
-
-        # Find bun binary
-        bun_binary = None
-        for f in bun_dir.rglob("bun"):
-            if f.is_file() and os.access(f, os.X_OK):
-                bun_binary = f
-                break
-
-        if not bun_binary:
+        # Downloads and extracted trees are cached outside BUILD_DIR, keyed by URL.
+        # The URL tracks "latest", so delete RUNTIME_CACHE to pick up a new Bun release.
+        key = hashlib.sha256(bun_url.encode()).hexdigest()[:16]
+        zip_path = RUNTIME_CACHE / f"{key}.zip"
+        bun_dir = RUNTIME_CACHE / f"{key}-extracted"
+        RUNTIME_CACHE.mkdir(parents=True, exist_ok=True)
+
+        if bun_dir.exists():
+            self.log(f"Using cached Bun runtime: {bun_dir}")
+        else:
+            self.log("Downloading Bun runtime...")
+
+            # Extract next to the cache entry, then rename into place so an
+            # interrupted extraction is never mistaken for a cache hit
+            tmp_dir = bun_dir.with_name(f"{bun_dir.name}.tmp")
+            self._reset_dir(tmp_dir)
+
+            if zip_path.exists() or shutil.which("aria2c"):
+                if not zip_path.exists():
+                    # aria2c splits the file across parallel connections
+                    part_path = zip_path.with_suffix(".part")
+                    self.run(["aria2c", "-x", "8", "-s", "8", "--allow-overwrite=true",
+                              "-d", str(RUNTIME_CACHE), "-o", part_path.name, bun_url])
+                    os.replace(part_path, zip_path)
+                self.run(["ditto", "-x", "-k", str(zip_path), str(tmp_dir)])
+            else:
+                # Stream the download straight into bsdtar, which (unlike unzip)
+                # reads zip archives from stdin, so bun.zip never touches disk
+                self.log(f"Running: curl -L {bun_url} | bsdtar -xf -...")
+                curl = subprocess.Popen(["curl", "-L", "--fail", "-sS", bun_url], stdout=subprocess.PIPE)
+                tar = subprocess.Popen(["bsdtar", "-xf", "-", "-C", str(tmp_dir)], stdin=curl.stdout)
+                curl.stdout.close()  # let curl see EPIPE if bsdtar exits early
+                if tar.wait() != 0 or curl.wait() != 0:
+                    self.log("Failed to download Bun runtime!", "ERROR")
+                    sys.exit(1)
+
+            os.replace(tmp_dir, bun_dir)
+
+        # The release zip contains a single bun-darwin-<arch>/bun binary
+        bun_binary = bun_dir / f"bun-darwin-{arch}" / "bun"
+        if not (bun_binary.is_file() and os.access(bun_binary, os.X_OK)):
             self.log("Failed to find Bun binary!", "ERROR")
             sys.exit(1)
 
@@ -216,38 +177,17 @@ class MacBuilder:
 
         self.log("Creating .pkg installer...")
 
-        INSTALLER_DIR.mkdir(parents=True, exist_ok=True)
-
-        app_path = DIST_DIR / f"{APP_BUNDLE_NAME}.app"
+        app_path = self.FINAL_OUTPUT
         if not app_path.exists():
             self.log(f"App bundle not found: {app_path}", "ERROR")
             sys.exit(1)
 
         # Download Bun
-        bun_binary = self.download_bun()
-
-        # Create package root
-        pkg_root = BUILD_DIR / "pkg_root"
-        if pkg_root.exists():
-            shutil.rmtree(pkg_root)
-
-        # Structure: /Applications/Trailing Stop Manager.app
-        app_dest = pkg_root / "Applications" / f"{APP_NAME}.app"
-        app_dest.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copytree(app_path, app_dest)
-
-        # Add Bun to app bundle
-        bun_dest = app_dest / "Contents" / "MacOS" / "bun"
-        shutil.copy2(bun_binary, bun_dest)
-        os.chmod(bun_dest, 0o755)
-
-        # Create scripts directory for post-install
-        scripts_dir = BUILD_DIR / "scripts"
-        scripts_dir.mkdir(exist_ok=True)
+        # Started in build() so the download overlaps the Nuitka build
+        bun_binary = self._runtime_future.result() if self._runtime_future else self.download_bun()
 
         # Post-install script: setup Bun in PATH for the app
-        postinstall = scripts_dir / "postinstall"
-        postinstall.write_text(f'''#!/bin/bash
+        postinstall_script = f'''#!/bin/bash
 # Post-install script for {APP_NAME}
 
 APP_PATH="/Applications/{APP_NAME}.app"
@@ -262,24 +202,12 @@ chmod +x "$BUN_PATH"
 
 echo "{APP_NAME} installed successfully!"
 exit 0
-''')
-        os.chmod(postinstall, 0o755)
+'''
 
-        # Build component package
-        component_pkg = BUILD_DIR / "component.pkg"
-        self.run([
-            "pkgbuild",
-            "--root", str(pkg_root),
-            "--scripts", str(scripts_dir),
-            "--identifier", APP_IDENTIFIER,
-            "--version", APP_VERSION,
-            "--install-location", "/",
-            str(component_pkg)
-        ])
-
-        # Create distribution.xml
+        # Installer metadata for productbuild
         distribution_xml = INSTALLER_DIR / "distribution.xml"
-        distribution_xml.write_text(f'''<?xml version="1.0" encoding="utf-8"?>
+        installer_files = {
+            distribution_xml: f'''<?xml version="1.0" encoding="utf-8"?>
 <installer-gui-script minSpecVersion="2">
     <title>{APP_NAME}</title>
     <organization>{APP_IDENTIFIER}</organization>
@@ -302,11 +230,8 @@ exit 0
 
     <pkg-ref id="{APP_IDENTIFIER}" version="{APP_VERSION}" onConclusion="none">component.pkg</pkg-ref>
 </installer-gui-script>
-''')
-
-        # Create welcome.html
-        welcome_html = INSTALLER_DIR / "welcome.html"
-        welcome_html.write_text(f'''<!DOCTYPE html>
+''',
+            INSTALLER_DIR / "welcome.html": f'''<!DOCTYPE html>
 <html>
 <head>
     <style>
@@ -325,11 +250,8 @@ exit 0
     <p>Click "Continue" to proceed.</p>
 </body>
 </html>
-''')
-
-        # Create conclusion.html
-        conclusion_html = INSTALLER_DIR / "conclusion.html"
-        conclusion_html.write_text(f'''<!DOCTYPE html>
+''',
+            INSTALLER_DIR / "conclusion.html": f'''<!DOCTYPE html>
 <html>
 <head>
     <style>
@@ -344,10 +266,77 @@ exit 0
     <p><strong>Note:</strong> Make sure TWS or IB Gateway is running before starting the app.</p>
 </body>
 </html>
-''')
+''',
+        }
+
+        # Skip pkgbuild/productbuild when neither the app, Bun nor any of the
+        # installer files changed since the last installer was produced
+        final_pkg = self.INSTALLER_OUTPUT
+        build_hash_file = DIST_DIR / f"{APP_BUNDLE_NAME}.buildhash"
+        inputs_file = INSTALLER_DIR / ".inputs.sha256"
+        inputs_hash = None
+        if build_hash_file.exists():
+            bun_stat = bun_binary.stat()
+            h = hashlib.sha256()
+            h.update(build_hash_file.read_bytes())
+            h.update(f"{bun_binary}\0{bun_stat.st_size}\0{bun_stat.st_mtime_ns}".encode())
+            # .web is copied into the bundle after Nuitka, outside the build hash
+            for dirpath, dirnames, filenames in os.walk(PROJECT_ROOT / ".web"):
+                dirnames[:] = sorted(d for d in dirnames if d != "node_modules")
+                for name in sorted(filenames):
+                    st = os.stat(os.path.join(dirpath, name))
+                    h.update(f"{dirpath}/{name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+            for content in [postinstall_script, *installer_files.values()]:
+                h.update(content.encode("utf-8") + b"\0")
+            inputs_hash = h.hexdigest()
+            if (not self.force and final_pkg.exists() and inputs_file.exists()
+                    and inputs_file.read_text() == inputs_hash):
+                self.log(f"Installer up-to-date (hash match): {final_pkg}")
+                return
+
+        # Create package root and every other directory the installer writes to
+        # Structure: /Applications/Trailing Stop Manager.app
+        pkg_root = BUILD_DIR / "pkg_root"
+        app_dest = pkg_root / "Applications" / f"{APP_NAME}.app"
+        scripts_dir = BUILD_DIR / "scripts"
+        self._reset_dir(pkg_root)
+        for d in (app_dest.parent, scripts_dir, INSTALLER_DIR):
+            d.mkdir(parents=True, exist_ok=True)
+
+        self._fast_copytree(app_path, app_dest)
+
+        # Add Bun to app bundle: hardlink the cached binary, else clone it
+        # (APFS), else copy. All three keep the executable mode download_bun verified
+        bun_dest = app_dest / "Contents" / "MacOS" / "bun"
+        try:
+            os.link(bun_binary, bun_dest)
+        except OSError:
+            if subprocess.run(["cp", "-c", str(bun_binary), str(bun_dest)], capture_output=True).returncode != 0:
+                shutil.copy2(bun_binary, bun_dest)
+
+        # Create the script executable rather than chmod-ing it afterwards
+        postinstall = scripts_dir / "postinstall"
+        postinstall.unlink(missing_ok=True)  # the mode only applies to new files
+        fd = os.open(postinstall, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755)
+        with os.fdopen(fd, "wb") as f:
+            f.write(postinstall_script.encode("utf-8"))
+
+        # Build component package
+        component_pkg = BUILD_DIR / "component.pkg"
+        self.run([
+            "pkgbuild",
+            "--root", str(pkg_root),
+            "--scripts", str(scripts_dir),
+            "--identifier", APP_IDENTIFIER,
+            "--version", APP_VERSION,
+            "--install-location", "/",
+            str(component_pkg)
+        ])
+
+        for path, content in installer_files.items():
+            path.write_bytes(content.encode("utf-8"))
 
         # Build final product package
-        final_pkg = DIST_DIR / f"{APP_BUNDLE_NAME}-{APP_VERSION}.pkg"
         self.run([
             "productbuild",
             "--distribution", str(distribution_xml),
@@ -356,48 +345,17 @@ exit 0
             str(final_pkg)
         ])
 
+        if inputs_hash:
+            inputs_file.write_text(inputs_hash)
         self.log(f"Installer created: {final_pkg}")
 
-    def cleanup(self):
-        """Clean up temporary build files."""
-        self.log("Cleaning up...")
-        if BUILD_DIR.exists():
-            shutil.rmtree(BUILD_DIR)
-
-    def build(self):
-        """Run full build process."""
-        self.log("=" * 60)
-        self.log(f"Building {APP_NAME} for macOS")
-        self.log("=" * 60)
-
-        self.check_platform()
-        self.generate_icons()
-        self.clean_build()
-        self.build_nuitka()
-        self.create_pkg_installer()
-        self.cleanup()
-
-        elapsed = datetime.now() - self.start_time
-        self.log("=" * 60)
-        self.log(f"Build complete in {elapsed}")
-        self.log(f"App: {DIST_DIR / f'{APP_BUNDLE_NAME}.app'}")
-        self.log(f"Installer: {DIST_DIR / f'{APP_BUNDLE_NAME}-{APP_VERSION}.pkg'}")
-        self.log("=" * 60)
+    download_runtime = download_bun
+    create_installer = create_pkg_installer
 
 
 def main():
-    parser = argparse.ArgumentParser(description=f"Build {APP_NAME} for macOS")
-    parser.add_argument("--skip-icons", action="store_true", help="Skip icon generation")
-    parser.add_argument("--skip-nuitka", action="store_true", help="Skip Nuitka build")
-    parser.add_argument("--skip-installer", action="store_true", help="Skip .pkg creation")
-    args = parser.parse_args()
-
-    builder = MacBuilder(
-        skip_icons=args.skip_icons,
-        skip_nuitka=args.skip_nuitka,
-        skip_installer=args.skip_installer
-    )
-    builder.build()
+    args = build_arg_parser("macOS", installer_help="Skip .pkg creation").parse_args()
+    MacBuilder(**vars(args)).build()
 
 
 if __name__ == "__main__":
@@ -7,56 +7,52 @@ This script:
 3. Creates an Inno Setup installer that includes Node.js runtime
 
 Usage:
-    python scripts/build_windows.py [--skip-icons] [--skip-nuitka] [--skip-installer]
+    python scripts/build_windows.py [--skip-icons] [--skip-nuitka] [--skip-installer] [--force] [--release] [--keep-build]
 
 Requirements:
-    pip install nuitka ordered-set zstandard pillow numpy
+    pip install nuitka ordered-set zstandard pillow
     Inno Setup must be installed: https://jrsoftware.org/isinfo.php
 
 Note: This script must be run on Windows!
 """
-import argparse
+import concurrent.futures
+import hashlib
 import os
 import platform
 import shutil
-import subprocess
 import sys
 import urllib.request
-from datetime import datetime
 from pathlib import Path
 
-PROJECT_ROOT = Path(__file__).parent.parent
-ASSETS_DIR = PROJECT_ROOT / "assets"
-DIST_DIR = PROJECT_ROOT / "dist"
-BUILD_DIR = PROJECT_ROOT / "build"
+from build_common import (
+    APP_BUNDLE_NAME,
+    APP_IDENTIFIER,
+    APP_NAME,
+    APP_VERSION,
+    ASSETS_DIR,
+    CACHE_DIR,
+    DIST_DIR,
+    PROJECT_ROOT,
+    RUNTIME_CACHE,
+    BaseBuilder,
+    build_arg_parser,
+)
+
 INSTALLER_DIR = PROJECT_ROOT / "installer" / "windows"
 
-APP_NAME = "Trailing Stop Manager"
-APP_BUNDLE_NAME = "TrailingStopManager"
-APP_IDENTIFIER = "com.edgeseeker.trailingstop"
-APP_VERSION = "1.0.0"
 APP_PUBLISHER = "EdgeSeeker"
 APP_URL = "https://github.com/edgeseeker/trailing-stop-manager"
 
 
-class WindowsBuilder:
+class WindowsBuilder(BaseBuilder):
     """Handles Windows build process."""
 
-    def __init__(self, skip_icons: bool = False, skip_nuitka: bool = False, skip_installer: bool = False):
-        self.skip_icons = skip_icons
-        self.skip_nuitka = skip_nuitka
-        self.skip_installer = skip_installer
-        self.start_time = datetime.now()
-
-    def log(self, msg: str, level: str = "INFO"):
-        """Log with timestamp."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {msg}")
-
-    def run(self, cmd: list[str], cwd: Path = None, check: bool = True) -> subprocess.CompletedProcess:
-        """Run command."""
-        self.log(f"Running: {' '.join(cmd[:3])}...")
-        return subprocess.run(cmd, cwd=cwd or PROJECT_ROOT, check=check, shell=True)
+    PLATFORM_NAME = "Windows"
+    ICON_FILE = "AppIcon.ico"
+    NUITKA_OUTPUT = "main.dist"
+    FINAL_OUTPUT = DIST_DIR / APP_BUNDLE_NAME
+    INSTALLER_OUTPUT = DIST_DIR / f"{APP_BUNDLE_NAME}-{APP_VERSION}-Setup.exe"
+    SOURCE_DIRS = (PROJECT_ROOT / "trailing_stop_web", PROJECT_ROOT / ".web")
 
     def check_platform(self):
         """Ensure we're on Windows."""
@@ -81,129 +77,100 @@ class WindowsBuilder:
         self.log("Inno Setup not found! Download from: https://jrsoftware.org/isinfo.php", "ERROR")
         sys.exit(1)
 
-    def generate_icons(self):
-        """Generate icon assets."""
-        if self.skip_icons and (ASSETS_DIR / "AppIcon.ico").exists():
-            self.log("Skipping icon generation (--skip-icons)")
-            return
-
-        self.log("Generating icons...")
-        subprocess.run([sys.executable, str(PROJECT_ROOT / "scripts" / "generate_icons.py")], check=True)
-
-    def clean_build(self):
-        """Clean previous build artifacts."""
-        self.log("Cleaning previous builds...")
-        for path in [BUILD_DIR, DIST_DIR / APP_BUNDLE_NAME]:
-            if path.exists():
-                shutil.rmtree(path)
-                self.log(f"  Removed: {path.name}")
-
-    def build_nuitka(self):
-        """Build with Nuitka."""
-        if self.skip_nuitka:
-            self.log("Skipping Nuitka build (--skip-nuitka)")
-            return
-
-        self.log("Building with Nuitka (this takes 10-30 minutes)...")
-
-        # Get plotly path for validators data
-        import plotly
-        plotly_path = Path(plotly.__path__[0])
-
-        cmd = [
-            sys.executable, "-m", "nuitka",
-            "--standalone",
-            "--assume-yes-for-downloads",
-            f"--output-dir={BUILD_DIR}",
+    def _nuitka_platform_flags(self) -> list[str]:
+        """Return the Windows executable flags."""
+        return [
             f"--output-filename={APP_BUNDLE_NAME}.exe",
-
-            # Windows specific
             "--windows-console-mode=disable",
-            f"--windows-icon-from-ico={ASSETS_DIR / 'AppIcon.ico'}",
+            f"--windows-icon-from-ico={ASSETS_DIR / self.ICON_FILE}",
             f"--windows-company-name={APP_PUBLISHER}",
             f"--windows-product-name={APP_NAME}",
             f"--windows-file-version={APP_VERSION}",
             f"--windows-product-version={APP_VERSION}",
             f"--windows-file-description={APP_NAME}",
-
-            # Include packages
-            "--include-package=trailing_stop_web",
-            "--include-package=reflex",
-            "--include-package=uvicorn",
-            "--include-package=pystray",
-            "--include-package=PIL",
-            "--include-package=plotly",
-            "--include-package=ib_insync",
-
-            # Include data files
-            f"--include-data-dir={PROJECT_ROOT / 'trailing_stop_web'}=trailing_stop_web",
-            f"--include-data-dir={PROJECT_ROOT / '.web'}=.web",
-            f"--include-data-file={PROJECT_ROOT / 'rxconfig.py'}=rxconfig.py",
-            f"--include-data-dir={plotly_path / 'validators'}=plotly/validators",
-
-            # Include tray icon
-            f"--include-data-file={ASSETS_DIR / 'TrayIcon.ico'}=assets/TrayIcon.ico",
-            f"--include-data-file={ASSETS_DIR / 'EdgeSeeker-Icon.png'}=assets/EdgeSeeker-Icon.png",
-
-            # Optimization
-            "--remove-output",
-
-            # Entry point
-            str(PROJECT_ROOT / "main.py"),
         ]
 
-        subprocess.run(cmd, check=True)
+    def _nuitka_env(self) -> dict[str, str]:
+        """Pin Nuitka's own compile cache to a persistent directory."""
+        # Nuitka caches MSVC objects itself (clcache); pin its cache to a
+        # persistent project-local directory so rebuilds reuse compiled C files
+        env = super()._nuitka_env()
+        env.setdefault("NUITKA_CACHE_DIR", str(CACHE_DIR / "nuitka"))
+        return env
+
+    def _download(self, url: str, dest: Path, workers: int = 8):
+        """Download url to dest using parallel HTTP range requests.
+
+        Falls back to a single-stream download if the server does not report
+        a content length or does not accept byte ranges.
+        """
+        head = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(head) as response:
+            size = int(response.headers.get("Content-Length") or 0)
+            accepts_ranges = response.headers.get("Accept-Ranges") == "bytes"
+            url = response.url  # follow redirects once, not in every worker
+
+        if not size or not accepts_ranges:
+            urllib.request.urlretrieve(url, dest)
+            return
 
-        # Find output directory
-        output_dir = None
-        for d in BUILD_DIR.glob("*.dist"):
-            output_dir = d
-            break
+        with open(dest, "wb") as f:
+            f.truncate(size)
 
-        if not output_dir:
-            self.log("Nuitka build failed - no .dist folder found!", "ERROR")
-            sys.exit(1)
+        chunk = -(-size // workers)
 
-        # Move to dist
-        DIST_DIR.mkdir(exist_ok=True)
-        final_dir = DIST_DIR / APP_BUNDLE_NAME
-        if final_dir.exists():
-            shutil.rmtree(final_dir)
-        shutil.move(str(output_dir), str(final_dir))
+        def fetch(start: int):
+            end = min(start + chunk, size) - 1
+            req = urllib.request.Request(url, headers={"Range": f"bytes={start}-{end}"})
+            with urllib.request.urlopen(req) as response, open(dest, "r+b") as f:
+                if response.status != 206:
+                    raise RuntimeError(f"Range request not honoured (HTTP {response.status})")
+                f.seek(start)
+                shutil.copyfileobj(response, f)
 
-        self.log(f"Build created: {final_dir}")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            # list() re-raises the first worker exception
+            list(pool.map(fetch, range(0, size, chunk)))
 
     def download_nodejs(self) -> Path:
         """Download Node.js for Windows."""
-        self.log("Downloading Node.js...")
-
-        node_dir = BUILD_DIR / "nodejs"
-        node_dir.mkdir(parents=True, exist_ok=True)
-
         # Node.js LTS version
         node_version = "20.10.0"
         arch = "x64"  # or win-x86 for 32-bit
         node_url = f"https://nodejs.org/dist/v{node_version}/node-v{node_version}-win-{arch}.zip"
 
-        zip_path = node_dir / "node.zip"
-
-        # Download
-        self.log(f"Downloading from {node_url}...")
-        urllib.request.urlretrieve(node_url, zip_path)
-
-        # Extract
-        import zipfile
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(node_dir)
-
-        # Find node directory
-        node_extracted = None
-        for d in node_dir.iterdir():
-            if d.is_dir() and d.name.startswith("node-"):
-                node_extracted = d
-                break
-
-        if not node_extracted:
+        # Downloads and extracted trees are cached outside BUILD_DIR, keyed by URL
+        key = hashlib.sha256(node_url.encode()).hexdigest()[:16]
+        zip_path = RUNTIME_CACHE / f"{key}.zip"
+        node_dir = RUNTIME_CACHE / f"{key}-extracted"
+        RUNTIME_CACHE.mkdir(parents=True, exist_ok=True)
+
+        if node_dir.exists():
+            self.log(f"Using cached Node.js: {node_dir}")
+        else:
+            if not zip_path.exists():
+                self.log(f"Downloading from {node_url}...")
+                part_path = zip_path.with_suffix(".part")
+                self._download(node_url, part_path)
+                os.replace(part_path, zip_path)
+
+            # Extract next to the cache entry, then rename into place so an
+            # interrupted extraction is never mistaken for a cache hit
+            tmp_dir = node_dir.with_name(f"{node_dir.name}.tmp")
+            self._reset_dir(tmp_dir)
+            # bsdtar (shipped with Windows 10+) unpacks the ~2000-file archive
+            # much faster than zipfile's per-member Python loop
+            if shutil.which("tar"):
+                self.run(["tar", "-xf", str(zip_path), "-C", str(tmp_dir)])
+            else:
+                import zipfile
+                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                    zip_ref.extractall(tmp_dir)
+            os.replace(tmp_dir, node_dir)
+
+        # The release zip contains a single node-v<version>-win-<arch> directory
+        node_extracted = node_dir / f"node-v{node_version}-win-{arch}"
+        if not node_extracted.is_dir():
             self.log("Failed to extract Node.js!", "ERROR")
             sys.exit(1)
 
@@ -220,13 +187,14 @@ class WindowsBuilder:
 
         iscc_path = self.check_inno_setup()
 
-        app_dir = DIST_DIR / APP_BUNDLE_NAME
+        app_dir = self.FINAL_OUTPUT
         if not app_dir.exists():
             self.log(f"App directory not found: {app_dir}", "ERROR")
             sys.exit(1)
 
         # Download Node.js
-        node_dir = self.download_nodejs()
+        # Started in build() so the download overlaps the Nuitka build
+        node_dir = self._runtime_future.result() if self._runtime_future else self.download_nodejs()
 
         INSTALLER_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -255,6 +223,9 @@ OutputBaseFilename={APP_BUNDLE_NAME}-{APP_VERSION}-Setup
 SetupIconFile={ASSETS_DIR / "AppIcon.ico"}
 Compression=lzma2/max
 SolidCompression=yes
+; Split the solid LZMA2 stream into blocks compressed on all cores
+LZMANumBlockThreads={os.cpu_count()}
+LZMAUseSeparateProcess=yes
 WizardStyle=modern
 PrivilegesRequired=admin
 
@@ -298,50 +269,17 @@ end;
 
         # Run Inno Setup compiler
         self.log("Compiling installer...")
-        subprocess.run([str(iscc_path), str(iss_file)], check=True)
-
-        self.log(f"Installer created: {DIST_DIR / f'{APP_BUNDLE_NAME}-{APP_VERSION}-Setup.exe'}")
-
-    def cleanup(self):
-        """Clean up temporary build files."""
-        self.log("Cleaning up...")
-        if BUILD_DIR.exists():
-            shutil.rmtree(BUILD_DIR)
-
-    def build(self):
-        """Run full build process."""
-        self.log("=" * 60)
-        self.log(f"Building {APP_NAME} for Windows")
-        self.log("=" * 60)
+        self.run([str(iscc_path), str(iss_file)])
 
-        self.check_platform()
-        self.generate_icons()
-        self.clean_build()
-        self.build_nuitka()
-        self.create_inno_installer()
-        self.cleanup()
+        self.log(f"Installer created: {self.INSTALLER_OUTPUT}")
 
-        elapsed = datetime.now() - self.start_time
-        self.log("=" * 60)
-        self.log(f"Build complete in {elapsed}")
-        self.log(f"App: {DIST_DIR / APP_BUNDLE_NAME}")
-        self.log(f"Installer: {DIST_DIR / f'{APP_BUNDLE_NAME}-{APP_VERSION}-Setup.exe'}")
-        self.log("=" * 60)
+    download_runtime = download_nodejs
+    create_installer = create_inno_installer
 
 
 def main():
-    parser = argparse.ArgumentParser(description=f"Build {APP_NAME} for Windows")
-    parser.add_argument("--skip-icons", action="store_true", help="Skip icon generation")
-    parser.add_argument("--skip-nuitka", action="store_true", help="Skip Nuitka build")
-    parser.add_argument("--skip-installer", action="store_true", help="Skip Inno Setup creation")
-    args = parser.parse_args()
-
-    builder = WindowsBuilder(
-        skip_icons=args.skip_icons,
-        skip_nuitka=args.skip_nuitka,
-        skip_installer=args.skip_installer
-    )
-    builder.build()
+    args = build_arg_parser("Windows", installer_help="Skip Inno Setup creation").parse_args()
+    WindowsBuilder(**vars(args)).build()
 
 
 if __name__ == "__main__":
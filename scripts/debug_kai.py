@@ -1,11 +1,15 @@
+import asyncio
+
 from ib_insync import IB, Contract, ComboLeg
 import sys
 
 
 
-def main2():
+async def main2():
     ib = IB()
-    ib.connect('127.0.0.1', 7497, clientId=1)  # TWS oder IBGW
+    await ib.connectAsync('127.0.0.1', 7497, clientId=1)  # TWS oder IBGW
+    # Delayed-frozen data, damit kein Live-Abo geprüft wird
+    ib.reqMarketDataType(4)
     spx_con_ids = [834873648, 834873658]
     # ⚠️ conId-Werte durch echte Contract-IDs deiner Legs ersetzen!
     leg1 = ComboLeg(conId=spx_con_ids[0], ratio=1, action='BUY', exchange='SMART')
@@ -19,15 +23,18 @@ def main2():
         comboLegs=[leg1, leg2]
     )
 
-    details_list = ib.reqContractDetails(combo)
+    # Combo und beide Legs parallel abfragen (ein Round-Trip statt drei)
+    contracts = [combo, *(Contract(conId=con_id) for con_id in spx_con_ids)]
+    results = await asyncio.gather(*(ib.reqContractDetailsAsync(c) for c in contracts))
 
-    for d in details_list:
-        print('Contract:', d.contract)
-        print('MarketName:', d.marketName)
-        print('MinTick:', d.minTick)
-        print('-' * 40)
+    for details_list in results:
+        for d in details_list:
+            print('Contract:', d.contract)
+            print('MarketName:', d.marketName)
+            print('MinTick:', d.minTick)
+            print('-' * 40)
 
     ib.disconnect()
 
 if __name__ == '__main__':
-    main2()
+    asyncio.run(main2())
@@ -6,7 +6,7 @@ Builds a standalone desktop application using:
 2. nuitka - Compile Python to standalone executable
 
 Usage:
-    python scripts/deploy.py [--target macos|windows] [--clean] [--skip-export]
+    python scripts/deploy.py [--target macos|windows] [--clean] [--fresh] [--skip-export]
 
 Requirements:
     pip install nuitka ordered-set zstandard
@@ -16,6 +16,12 @@ Output:
     dist/TrailingStopManager.exe (Windows)
 """
 import argparse
+import collections
+import concurrent.futures
+import gzip
+import hashlib
+import importlib.metadata
+import importlib.util
 import os
 import platform
 import shutil
@@ -30,8 +36,90 @@ APP_NAME = "TrailingStopManager"
 PROJECT_ROOT = Path(__file__).parent.parent
 DIST_DIR = PROJECT_ROOT / "dist"
 BUILD_DIR = PROJECT_ROOT / "build"
+CACHE_DIR = PROJECT_ROOT / ".cache"
 EXPORT_DIR = PROJECT_ROOT / ".web" / "_static"
 
+# Static files worth shipping precompressed (.gz, and .br if brotli is installed)
+PRECOMPRESS_SUFFIXES = {".js", ".css", ".html", ".svg", ".json", ".map"}
+PRECOMPRESS_MIN_SIZE = 1024
+
+
+def _link_or_copy(src: str, dst: str) -> str:
+    """copytree copy_function: hardlink when on the same filesystem, else copy.
+
+    The build tree is only staging; _create_dist copies the finished bundle
+    into dist/, so the links never reach the shipped app.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _precompress_file(path: Path) -> None:
+    """Write .gz (and .br) siblings of path; mtime=0 keeps the output reproducible."""
+    data = path.read_bytes()
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+def _fast_rmtree(path: str) -> None:
+    """Delete a directory tree with bare scandir/unlink/rmdir calls.
+
+    Skips shutil.rmtree's per-entry lstat and error-handler bookkeeping;
+    scandir already knows which entries are directories.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                _fast_rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+    os.rmdir(path)
+
+
+# Nuitka options shared by every target
+_NUITKA_BASE = (
+    sys.executable, "-m", "nuitka",
+    "--standalone",
+    "--assume-yes-for-downloads",  # Auto-download dependencies
+
+    # Include packages
+    "--include-package=trailing_stop_web",
+    "--include-package=reflex",
+    "--include-package=uvicorn",
+    "--include-package=pystray",
+    "--include-package=PIL",
+    "--include-package=plotly",
+
+    # Faster cold start: skip site.py and the warnings machinery, drop asserts.
+    # Not no_docstrings (-OO): pydantic and Reflex read docstrings at runtime
+    "--python-flag=no_site,no_warnings,-O",
+    # setuptools is only reached through optional imports; don't bundle it
+    "--noinclude-setuptools-mode=nofollow",
+)
+
+# Target-specific Nuitka options
+_PLATFORM_ARGS = {
+    "macos": (
+        "--macos-create-app-bundle",
+        f"--macos-app-name={APP_NAME}",
+        "--macos-app-mode=ui-element",  # No dock icon
+    ),
+    # A single zstd-compressed executable (Nuitka compresses the payload when
+    # zstandard is installed); macOS keeps the .app bundle
+    "windows": (
+        "--onefile",
+        "--windows-console-mode=disable",  # No console window
+    ),
+    "linux": ("--onefile",),
+}
+
 
 class DeployError(Exception):
     """Deployment error."""
@@ -41,12 +129,21 @@ class DeployError(Exception):
 class Deployer:
     """Handles the deployment process."""
 
-    def __init__(self, target: str, skip_export: bool = False, verbose: bool = False):
+    def __init__(self, target: str, skip_export: bool = False, verbose: bool = False, fresh: bool = False):
         self.target = target or self._detect_platform()
         self.skip_export = skip_export
         self.verbose = verbose
+        self.fresh = fresh
         self.start_time = datetime.now()
 
+        # One environment for every command: Nuitka's download/compile caches
+        # and ccache's objects live in a persistent project-local directory so
+        # repeated deploys reuse them
+        self._env = os.environ.copy()
+        self._env.setdefault("NUITKA_CACHE_DIR", str(CACHE_DIR / "nuitka"))
+        if self.target != "windows" and shutil.which("ccache"):
+            self._env.setdefault("CCACHE_DIR", str(CACHE_DIR / "ccache"))
+
     def _detect_platform(self) -> str:
         """Detect current platform."""
         system = platform.system().lower()
@@ -63,22 +160,37 @@ class Deployer:
         print(f"[{timestamp}] {level}: {msg}")
 
     def _run(self, cmd: list[str], cwd: Path | None = None, check: bool = True) -> subprocess.CompletedProcess:
-        """Run command with logging."""
+        """Run command with logging.
+
+        Output is streamed line by line to build/deploy.log (and to the console
+        with --verbose) instead of being buffered in memory; only the last 200
+        lines are kept for the error message.
+        """
         if self.verbose:
             self._log(f"Running: {' '.join(cmd)}")
 
-        try:
-            result = subprocess.run(
-                cmd,
-                cwd=cwd or PROJECT_ROOT,
-                check=check,
-                capture_output=not self.verbose,
-                text=True,
-            )
-            return result
-        except subprocess.CalledProcessError as e:
-            self._log(f"Command failed: {e.stderr}", "ERROR")
+        BUILD_DIR.mkdir(parents=True, exist_ok=True)
+        tail: collections.deque[bytes] = collections.deque(maxlen=200)
+        with (BUILD_DIR / "deploy.log").open("ab") as log, subprocess.Popen(
+            cmd,
+            cwd=cwd or PROJECT_ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=self._env,
+        ) as proc:
+            for line in iter(proc.stdout.readline, b""):
+                log.write(line)
+                tail.append(line)
+                if self.verbose:
+                    sys.stdout.buffer.write(line)
+                    sys.stdout.flush()
+            returncode = proc.wait()
+
+        if check and returncode != 0:
+            output = b"".join(tail).decode(errors="replace")
+            self._log(f"Command failed (exit {returncode}):\n{output}", "ERROR")
             raise DeployError(f"Command failed: {' '.join(cmd)}")
+        return subprocess.CompletedProcess(cmd, returncode)
 
     def _check_dependencies(self) -> None:
         """Check if required tools are installed."""
@@ -88,6 +200,23 @@ class Deployer:
         if sys.version_info < (3, 10):
             raise DeployError("Python 3.10+ required")
 
+        # Skip the subprocess probes if they already passed for this interpreter,
+        # platform, target and the installed Nuitka/Reflex versions
+        try:
+            versions = f"{importlib.metadata.version('nuitka')}:{importlib.metadata.version('reflex')}"
+        except importlib.metadata.PackageNotFoundError:
+            versions = None
+        marker = None
+        if versions:
+            key = hashlib.sha1(
+                f"{sys.executable}:{os.path.getmtime(sys.executable)}:{platform.platform()}:"
+                f"{self.target}:{versions}".encode()
+            ).hexdigest()
+            marker = CACHE_DIR / "deploy-deps" / key
+            if marker.exists():
+                self._log("All dependencies OK (cached)")
+                return
+
         # Check nuitka
         try:
             self._run([sys.executable, "-m", "nuitka", "--version"])
@@ -110,24 +239,47 @@ class Deployer:
             # Nuitka will use MSVC or MinGW
             pass
 
+        # Optional: ccache makes repeated Nuitka builds reuse compiled C objects
+        if self.target != "windows" and not shutil.which("ccache"):
+            self._log("ccache not found (optional, speeds up rebuilds): brew install ccache")
+
+        if marker:
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
         self._log("All dependencies OK")
 
     def _clean_build_dirs(self) -> None:
-        """Clean previous build artifacts."""
+        """Clean previous build artifacts.
+
+        Nuitka's C sources and objects (build/*.build) are kept so the next
+        build only recompiles changed modules; --fresh removes them too.
+        """
         self._log("Cleaning build directories...")
 
         dirs_to_clean = [
-            BUILD_DIR,
             DIST_DIR,
-            PROJECT_ROOT / f"{APP_NAME}.build",
             PROJECT_ROOT / f"{APP_NAME}.dist",
             PROJECT_ROOT / f"{APP_NAME}.onefile-build",
         ]
-
-        for dir_path in dirs_to_clean:
-            if dir_path.exists():
-                self._log(f"  Removing {dir_path.name}/")
-                shutil.rmtree(dir_path)
+        if self.fresh:
+            dirs_to_clean += [BUILD_DIR, PROJECT_ROOT / f"{APP_NAME}.build"]
+        elif BUILD_DIR.exists():
+            # Previous outputs only, so a stale bundle is never picked up
+            dirs_to_clean += [*BUILD_DIR.glob("*.app"), *BUILD_DIR.glob("*.dist"), BUILD_DIR / ".web"]
+            (BUILD_DIR / "deploy.log").unlink(missing_ok=True)
+
+        self._remove_dirs(dirs_to_clean)
+
+    def _remove_dirs(self, dirs: list[Path]) -> None:
+        """Delete the existing directories in parallel; they are independent trees."""
+        existing = [d for d in dirs if d.exists()]
+        if not existing:
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(existing)) as pool:
+            # list() re-raises the first failed removal
+            list(pool.map(_fast_rmtree, existing))
+        for dir_path in existing:
+            self._log(f"  Removed {dir_path.name}/")
 
     def _export_reflex(self) -> None:
         """Export Reflex app for production."""
@@ -158,486 +310,77 @@ class Deployer:
         prod_main = BUILD_DIR / "main_prod.py"
         BUILD_DIR.mkdir(parents=True, exist_ok=True)
 
-        # Read the original main.py and modify for production
-        original_main = PROJECT_ROOT / "main.py"
-
-        prod_code = '''#!/usr/bin/env python3
-"""Production entry point for Trailing Stop Manager.
-
-Runs Granian directly (no Node.js) with static frontend mounting.
-"""
-import multiprocessing
-import logging
-import os
-import signal
-import sys
-import threading
-import time
-import urllib.request
-import webbrowser
-from pathlib import Path
-
-# Set production environment BEFORE importing reflex
-# IMPORTANT: Internal Reflex env vars need double-underscore prefix!
-os.environ["REFLEX_ENV_MODE"] = "prod"
-os.environ["__REFLEX_SKIP_COMPILE"] = "true"  # Skip frontend compilation
-os.environ["__REFLEX_MOUNT_FRONTEND_COMPILED_APP"] = "true"  # Serve static files
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%H:%M:%S'
-)
-logger = logging.getLogger(__name__)
-
-
-def get_app_dir() -> Path:
-    """Get the application directory (handles Nuitka + dev mode).
+        # The entry point is a real module under scripts/templates/. copy2 keeps
+        # its mtime, so an unchanged template is not rewritten (and Nuitka does
+        # not see a changed input) on repeated deploys
+        template = Path(__file__).parent / "templates" / "main_prod.py"
+        if prod_main.exists() and prod_main.stat().st_mtime_ns == template.stat().st_mtime_ns:
+            self._log(f"{prod_main} up to date")
+            return prod_main
 
-    Für Nuitka macOS App-Bundles:
-    - __compiled__.containing_dir zeigt auf das Parent-Verzeichnis des .app-Bundles
-    - sys.executable zeigt direkt auf Contents/MacOS/TrailingStopManager
-    - .web/ wird nach Contents/MacOS/.web/ kopiert
-
-    Die zuverlässigste Methode ist sys.executable.parent für macOS-Bundles.
-    """
-    # Debug logging
-    logger.info(f"sys.executable = {sys.executable}")
-    logger.info(f"os.getcwd() before chdir = {os.getcwd()}")
-
-    compiled_obj = globals().get("__compiled__", None)
-
-    if compiled_obj is not None:
-        logger.info(f"__compiled__ present: {compiled_obj}")
-        macos_bundle = getattr(compiled_obj, "macos_bundle_mode", False)
-        logger.info(f"macos_bundle_mode = {macos_bundle}")
-
-    # 1. Beste Methode für Nuitka: sys.executable.parent
-    # Dies funktioniert für ALLE Nuitka-Builds (standalone, onefile, macos_bundle)
-    exe_path = Path(sys.executable).resolve()
-    exe_dir = exe_path.parent
-
-    # Für macOS App-Bundles: exe_dir ist Contents/MacOS/
-    if (exe_dir / ".web").exists():
-        logger.info(f"Using app dir from sys.executable.parent: {exe_dir}")
-        return exe_dir
-
-    # 2. Falls .web nicht direkt neben exe gefunden: erweiterte Suche
-    # (für edge cases oder andere Bundle-Strukturen)
-    candidates = [
-        exe_dir,
-        exe_dir / "MacOS",
-        exe_dir.parent / "MacOS",
-        exe_dir.parent / "Resources",  # Alternative macOS-Bundle-Location
-    ]
-
-    # Auch im containing_dir suchen falls vorhanden
-    if compiled_obj is not None:
-        containing_dir = getattr(compiled_obj, "containing_dir", None)
-        if containing_dir:
-            base = Path(containing_dir).resolve()
-            candidates.extend([
-                base,
-                base / "MacOS",
-            ])
-            # Für macOS: Suche in *.app/Contents/MacOS/ innerhalb von containing_dir
-            for app_bundle in base.glob("*.app"):
-                macos_path = app_bundle / "Contents" / "MacOS"
-                if macos_path.exists():
-                    candidates.append(macos_path)
-
-    # Deduplizieren und prüfen
-    seen = set()
-    unique_candidates = []
-    for c in candidates:
-        resolved = c.resolve() if c.exists() else c
-        if str(resolved) not in seen:
-            seen.add(str(resolved))
-            unique_candidates.append(resolved)
-
-    for cand in unique_candidates:
-        if cand.exists() and (cand / ".web").exists():
-            logger.info(f"Using app dir from extended search: {cand}")
-            return cand
-
-    logger.warning(
-        f"Could not find .web in any expected location. "
-        f"exe_dir={exe_dir}, tried: {[str(c) for c in unique_candidates]}"
-    )
-
-    # 3. Fallback für Dev-Mode (kein __compiled__ vorhanden)
-    if compiled_obj is None:
-        dev_path = Path(__file__).parent.parent
-        logger.info(f"Using dev mode path: {dev_path}")
-        return dev_path
-
-    # Letzter Fallback: exe_dir
-    return exe_dir
-
-
-# CRITICAL: Change to app directory IMMEDIATELY - before any imports
-# This is necessary because Reflex's StaticFiles validation happens at import time
-APP_DIR = get_app_dir()
-os.chdir(APP_DIR)
-if str(APP_DIR) not in sys.path:
-    sys.path.insert(0, str(APP_DIR))
-logger.info(f"Working directory set to: {APP_DIR}")
-
-
-class ProductionApp:
-    """Production application manager."""
-
-    def __init__(self):
-        self.app_dir = APP_DIR  # Use globally set app dir
-        self._shutdown_initiated = threading.Event()
-        self._app_ready = threading.Event()
-        self.tray = None
-        self._server_thread = None
-
-    def _wait_for_ready(self, url: str, timeout: int = 60) -> bool:
-        """Wait for service to be ready."""
-        start = time.time()
-        while time.time() - start < timeout:
-            if self._shutdown_initiated.is_set():
-                return False
-            try:
-                urllib.request.urlopen(url, timeout=2)
-                return True
-            except Exception:
-                time.sleep(1)
-        return False
-
-    def _run_uvicorn_server(self) -> None:
-        """Run the uvicorn server directly (no subprocess, no Node.js).
-
-        Uses uvicorn instead of Granian because uvicorn supports
-        running in a background thread when properly configured.
-        """
-        try:
-            import asyncio
-            import uvicorn
-
-            # CRITICAL: Create event loop BEFORE importing reflex modules
-            # Reflex uses asyncio internally and needs an event loop present
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            # Working directory is already set at module load time
-            logger.info(f"Starting uvicorn server (cwd: {os.getcwd()})...")
-
-            # MONKEY-PATCH: Disable frontend build but keep backend-critical steps
-            # The original _compile does important things:
-            # 1. _apply_decorated_pages() - registers pages
-            # 2. _compile_page() - evaluates State references (CRITICAL!)
-            # 3. _add_optional_endpoints() - adds upload endpoints
-            # We must run these for State updates to work!
-
-            import reflex.app
-            import reflex.utils.prerequisites
-
-            # Store original _compile
-            _original_compile = reflex.app.App._compile
-
-            def _backend_only_compile(self, *args, **kwargs):
-                """Run only backend-critical parts of _compile, skip frontend generation."""
-                logger.info("Running backend-only compile (no frontend generation)...")
-
-                # 1. Apply decorated pages (registers routes)
-                self._apply_decorated_pages()
-                self._pages = {}
-
-                # 2. Evaluate all pages (CRITICAL for State var registration!)
-                for route in self._unevaluated_pages:
-                    logger.debug(f"Evaluating page: {route}")
-                    self._compile_page(route, save_page=False)
-
-                # 3. Add optional endpoints (upload, etc.)
-                self._add_optional_endpoints()
-
-                logger.info(f"Backend compile done: {len(self._unevaluated_pages)} pages evaluated")
-
-            reflex.app.App._compile = _backend_only_compile
-
-            # 2. Disable install_frontend_packages to prevent npm/bun install
-            import reflex.utils.js_runtimes
-            reflex.utils.js_runtimes.install_frontend_packages = lambda *args, **kwargs: None
-
-            # 3. Disable any other prerequisite functions that might call npm/bun
-            if hasattr(reflex.utils.prerequisites, 'initialize_frontend_dependencies'):
-                reflex.utils.prerequisites.initialize_frontend_dependencies = lambda *args, **kwargs: None
-
-            logger.info("Applied backend-only compile monkey-patch")
-
-            # 4. CRITICAL: Patch Socket.IO to accept both polling and websocket transports
-            # MUST be done BEFORE importing the app module, because app = rx.App() is
-            # created at module load time, which creates the AsyncServer
-            import socketio
-
-            _original_async_server_init = socketio.AsyncServer.__init__
-
-            def _patched_async_server_init(self, *args, **kwargs):
-                # Force dual transport support
-                kwargs['transports'] = ['polling', 'websocket']
-                kwargs['allow_upgrades'] = True
-                kwargs['cors_allowed_origins'] = '*'
-                kwargs['cors_credentials'] = True
-                logger.info(f"AsyncServer.__init__ called with patched transports")
-                return _original_async_server_init(self, *args, **kwargs)
-
-            socketio.AsyncServer.__init__ = _patched_async_server_init
-            logger.info("Patched AsyncServer to use transports=['polling', 'websocket']")
-
-            # 4b. Patch Socket.IO base_server.get_environ to handle race condition
-            # When using polling transport, events can arrive before the session is fully registered
-            # This patch adds a small wait/retry to handle the race condition gracefully
-            import asyncio
-            _original_get_environ = socketio.base_server.BaseServer.get_environ
-
-            def _patched_get_environ(self, sid, namespace=None):
-                """Patched get_environ with retry logic for polling transport race condition."""
-                eio_sid = self.manager.eio_sid_from_sid(sid, namespace or '/')
-                environ = self.environ.get(eio_sid)
-                if environ is None and eio_sid is not None:
-                    # Race condition: eio_sid exists but environ not yet stored
-                    # This can happen with polling transport when events arrive fast
-                    logger.debug(f"get_environ: eio_sid={eio_sid} found but environ missing, may be race condition")
-                return environ
-
-            socketio.base_server.BaseServer.get_environ = _patched_get_environ
-            logger.info("Patched get_environ with race condition handling")
-
-            # 4c. Patch Reflex EventNamespace.on_event to handle environ race condition
-            # The original raises RuntimeError immediately if environ is None
-            # We patch it to retry a few times with small delays
-            import reflex.app
-            _original_event_namespace_on_event = reflex.app.EventNamespace.on_event
-
-            async def _patched_on_event(self, sid, data):
-                """Patched on_event with retry logic for environ race condition."""
-                import asyncio
-                max_retries = 5
-                retry_delay = 0.1  # 100ms
-
-                for attempt in range(max_retries):
-                    # Check if environ is available
-                    if self.app.sio is not None:
-                        environ = self.app.sio.get_environ(sid, self.namespace)
-                        if environ is not None:
-                            # Environ is ready, call original method
-                            return await _original_event_namespace_on_event(self, sid, data)
-
-                    if attempt < max_retries - 1:
-                        logger.debug(f"on_event: environ not ready for sid={sid}, retry {attempt + 1}/{max_retries}")
-                        await asyncio.sleep(retry_delay)
-
-                # After all retries, log warning and skip this event
-                logger.warning(f"on_event: environ still not initialized after {max_retries} retries for sid={sid}, skipping event")
-                # Don't raise - just silently skip the event to prevent task exception
-                return None
-
-            reflex.app.EventNamespace.on_event = _patched_on_event
-            logger.info("Patched EventNamespace.on_event with retry logic")
-
-            # Import the app module AFTER patching Socket.IO
-            # This module is compiled into the Nuitka binary
-            import trailing_stop_web.trailing_stop_web as app_module
-
-            # 5. CRITICAL: Monkey-patch get_app() to return the pre-imported module
-            # config.app_module is read-only, so we patch the function directly
-            # This bypasses dynamic __import__() which doesn't work in Nuitka
-            def patched_get_app(reload: bool = False):
-                return app_module
-            reflex.utils.prerequisites.get_app = patched_get_app
-
-            # Also mark the app name as valid to skip filesystem checks
-            from reflex.config import get_config
-            rx_config = get_config()
-            rx_config._app_name_is_valid = True
-            logger.info("Patched get_app() to return pre-imported module")
-
-            # Now call the app factory
-            asgi_app = app_module.app()
-
-            uvicorn_config = uvicorn.Config(
-                app=asgi_app,
-                host="0.0.0.0",
-                port=8000,
-                log_level="warning",
-                access_log=False,
-            )
-            server = uvicorn.Server(uvicorn_config)
-
-            # Run server (event loop is already set above)
-            loop.run_until_complete(server.serve())
-        except Exception as e:
-            logger.error(f"Uvicorn server error: {e}")
-
-    def start_server(self) -> bool:
-        """Start the uvicorn server in a background thread."""
-        logger.info("Starting server...")
-
-        self._server_thread = threading.Thread(
-            target=self._run_uvicorn_server,
-            daemon=True
-        )
-        self._server_thread.start()
-
-        # Wait for server to be ready (port 8000 now, not 3000)
-        if self._wait_for_ready("http://localhost:8000", timeout=60):
-            logger.info("Server ready!")
-            self._app_ready.set()
-            return True
-        else:
-            logger.error("Server failed to start within timeout")
-            return False
-
-    def start_tray(self) -> None:
-        """Start system tray icon."""
-        try:
-            from trailing_stop_web.tray import SystemTray
-            self.tray = SystemTray(on_quit=self._on_quit)
-            logger.info("System tray started")
-            self.tray.run()
-        except ImportError as e:
-            logger.warning(f"System tray not available: {e}")
-            # Keep running without tray
-            try:
-                while not self._shutdown_initiated.is_set():
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                pass
-
-    def _on_quit(self) -> None:
-        """Handle quit from tray."""
-        self._shutdown_initiated.set()
-
-    def shutdown(self) -> None:
-        """Shutdown all services."""
-        if self._shutdown_initiated.is_set():
-            return
-        self._shutdown_initiated.set()
-        logger.info("Shutting down...")
-
-        if self.tray:
-            try:
-                self.tray.stop()
-            except Exception:
-                pass
-
-    def run(self, open_browser: bool = True) -> None:
-        """Run the application."""
-        # Setup signal handlers
-        def signal_handler(sig, frame):
-            self.shutdown()
-            sys.exit(0)
-
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
-
-        try:
-            # Start server
-            if not self.start_server():
-                logger.error("Failed to start server")
-                return
-
-            # Open browser (now port 8000)
-            if open_browser:
-                logger.info("Opening browser...")
-                webbrowser.open("http://localhost:8000")
-
-            # Start tray (blocks until quit)
-            self.start_tray()
-
-        finally:
-            self.shutdown()
-
-
-def main():
-    """Main entry point."""
-    import argparse
-    multiprocessing.freeze_support()
-
-    parser = argparse.ArgumentParser(description="Trailing Stop Manager")
-    parser.add_argument("--no-browser", action="store_true", help="Don't open browser")
-    args = parser.parse_args()
-
-    app = ProductionApp()
-    app.run(open_browser=not args.no_browser)
-
-
-if __name__ == "__main__":
-    main()
-'''
-
-        prod_main.write_text(prod_code)
+        shutil.copy2(template, prod_main)
         self._log(f"Created {prod_main}")
 
         return prod_main
 
-    def _build_nuitka(self, entry_point: Path) -> Path:
-        """Build standalone executable with Nuitka."""
-        self._log(f"Building with Nuitka for {self.target}...")
+    def _resolve_build_inputs(self) -> Path:
+        """Locate the plotly package, whose validators are bundled as data.
 
-        # Get plotly package path dynamically
-        import plotly
-        plotly_path = Path(plotly.__path__[0])
+        find_spec resolves the path without importing plotly.
+        """
+        spec = importlib.util.find_spec("plotly")
+        if spec is None or not spec.submodule_search_locations:
+            raise DeployError("plotly not installed. Run: pip install plotly")
+        return Path(spec.submodule_search_locations[0])
+
+    def _nuitka_cmd(self, entry_point: Path, plotly_path: Path) -> list[str]:
+        """Return the Nuitka command line for the current target."""
+        # Add icon if exists (macOS would need a PNG -> ICNS conversion first)
+        windows_icon = PROJECT_ROOT / "assets" / "icon.ico"
+        icon_args = (
+            [f"--windows-icon-from-ico={windows_icon}"]
+            if self.target == "windows" and windows_icon.exists() else []
+        )
 
-        # Base nuitka command
-        cmd = [
-            sys.executable, "-m", "nuitka",
-            "--standalone",
-            "--assume-yes-for-downloads",  # Auto-download dependencies
+        return [
+            *_NUITKA_BASE,
             f"--output-dir={BUILD_DIR}",
             f"--output-filename={APP_NAME}",
 
-            # Include packages
-            "--include-package=trailing_stop_web",
-            "--include-package=reflex",
-            "--include-package=uvicorn",
-            "--include-package=pystray",
-            "--include-package=PIL",
-            "--include-package=plotly",
-
             # Include data files
             f"--include-data-dir={PROJECT_ROOT / 'trailing_stop_web'}=trailing_stop_web",
 
-            # Include plotly validators JSON (required at runtime)
-            f"--include-data-dir={plotly_path / 'validators'}=plotly/validators",
+            # Include plotly validators JSON (required at runtime). Only the
+            # top-level files are data (plotly 6's _validators.json); the
+            # validator modules are compiled via --include-package=plotly
+            *(
+                f"--include-data-files={p}=plotly/validators/{p.name}"
+                for p in sorted((plotly_path / "validators").glob("*.json"))
+            ),
 
-            # Optimization
-            "--remove-output",
-        ]
+            # Optimization (no --remove-output: the kept build/*.build
+            # tree makes the next build incremental)
+            f"--jobs={os.cpu_count() or 4}",
+            "--lto=yes",
 
-        # Platform-specific options
-        if self.target == "macos":
-            cmd.extend([
-                "--macos-create-app-bundle",
-                f"--macos-app-name={APP_NAME}",
-                "--macos-app-mode=ui-element",  # No dock icon
-            ])
-
-            # Add icon if exists
-            icon_path = PROJECT_ROOT / "trailing_stop_web" / "EdgeSeeker-Icon.png"
-            if icon_path.exists():
-                # Convert PNG to ICNS for macOS (would need iconutil)
-                pass
+            # Lists every included/excluded module, to check the exclusions
+            f"--report={BUILD_DIR / 'nuitka-report.xml'}",
 
-        elif self.target == "windows":
-            cmd.extend([
-                "--windows-console-mode=disable",  # No console window
-            ])
+            *_PLATFORM_ARGS[self.target],
+            *icon_args,
+
+            # Entry point
+            str(entry_point),
+        ]
 
-            # Add icon if exists
-            icon_path = PROJECT_ROOT / "assets" / "icon.ico"
-            if icon_path.exists():
-                cmd.append(f"--windows-icon-from-ico={icon_path}")
+    def _build_nuitka(self, entry_point: Path, plotly_path: Path) -> Path:
+        """Build standalone executable with Nuitka."""
+        self._log(f"Building with Nuitka for {self.target}...")
 
-        # Add entry point
-        cmd.append(str(entry_point))
+        cmd = self._nuitka_cmd(entry_point, plotly_path)
 
         # Run nuitka (this takes a while)
-        self._log("This may take 10-30 minutes...")
+        self._log(f"This may take 10-30 minutes (progress: {BUILD_DIR / 'deploy.log'})...")
         self._run(cmd)
 
         # Find output
@@ -647,16 +390,17 @@ if __name__ == "__main__":
             if not output.exists():
                 output = BUILD_DIR / f"{APP_NAME}.app"
         else:
-            output = BUILD_DIR / f"{APP_NAME}.dist" / f"{APP_NAME}.exe"
+            # The onefile binary is named by --output-filename
+            output = BUILD_DIR / (f"{APP_NAME}.exe" if self.target == "windows" else APP_NAME)
 
-        if not output.exists():
+        if not output.exists() and self.target == "macos":
             # Check alternative locations - look for .app bundles first
             for pattern in BUILD_DIR.glob("**/*.app"):
                 if pattern.is_dir():
                     output = pattern
                     break
 
-        if not output.exists() or not output.is_dir():
+        if not output.exists() or output.is_dir() != (self.target == "macos"):
             raise DeployError(f"Build output not found at {output}")
 
         self._log(f"Build complete: {output}")
@@ -680,9 +424,15 @@ if __name__ == "__main__":
         web_export = PROJECT_ROOT / ".web"
         if web_export.exists():
             dest = macos_dir / ".web"
+            # Link into a sibling, then rename into place
+            tmp_dest = dest.with_name(".web.tmp")
+            if tmp_dest.exists():
+                shutil.rmtree(tmp_dest)
+            shutil.copytree(web_export, tmp_dest, copy_function=_link_or_copy)
+            self._precompress_static(tmp_dest / EXPORT_DIR.relative_to(web_export))
             if dest.exists():
                 shutil.rmtree(dest)
-            shutil.copytree(web_export, dest)
+            os.replace(tmp_dest, dest)
             self._log(f"  Copied .web/")
 
         # Copy icon
@@ -697,6 +447,23 @@ if __name__ == "__main__":
             shutil.copy2(rxconfig_src, macos_dir / "rxconfig.py")
             self._log(f"  Copied rxconfig.py")
 
+    def _precompress_static(self, static_dir: Path) -> None:
+        """Precompress the exported frontend once, instead of per request at runtime.
+
+        The siblings are new files, so the hardlinked originals in .web/ are
+        left untouched. zlib and brotli release the GIL, so threads suffice.
+        """
+        if not static_dir.is_dir():
+            return
+        files = [
+            p for p in static_dir.rglob("*")
+            if p.suffix in PRECOMPRESS_SUFFIXES and p.is_file() and p.stat().st_size >= PRECOMPRESS_MIN_SIZE
+        ]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            # list() re-raises the first failure
+            list(pool.map(_precompress_file, files))
+        self._log(f"  Precompressed {len(files)} static files")
+
     def _create_dist(self, build_output: Path) -> Path:
         """Create final distribution."""
         self._log("Creating distribution...")
@@ -709,8 +476,15 @@ if __name__ == "__main__":
                 shutil.rmtree(dist_path)
             shutil.copytree(build_output, dist_path)
         else:
-            dist_path = DIST_DIR / f"{APP_NAME}.exe"
+            dist_path = DIST_DIR / build_output.name
             shutil.copy2(build_output, dist_path)
+            # The onefile binary looks for .web and rxconfig.py next to itself
+            for name in [".web", "rxconfig.py"]:
+                src = build_output.parent / name
+                if src.is_dir():
+                    shutil.copytree(src, DIST_DIR / name, dirs_exist_ok=True)
+                elif src.exists():
+                    shutil.copy2(src, DIST_DIR / name)
 
         self._log(f"Distribution created: {dist_path}")
         return dist_path
@@ -719,16 +493,13 @@ if __name__ == "__main__":
         """Clean up temporary build files."""
         self._log("Cleaning up temporary files...")
 
-        temp_dirs = [
-            BUILD_DIR,
-            PROJECT_ROOT / f"{APP_NAME}.build",
-            PROJECT_ROOT / f"{APP_NAME}.onefile-build",
-        ]
+        temp_dirs = [PROJECT_ROOT / f"{APP_NAME}.onefile-build"]
+        if self.fresh:
+            temp_dirs += [BUILD_DIR, PROJECT_ROOT / f"{APP_NAME}.build"]
+        else:
+            self._log(f"  Keeping {BUILD_DIR.name}/ for incremental rebuilds (--fresh removes it)")
 
-        for dir_path in temp_dirs:
-            if dir_path.exists():
-                shutil.rmtree(dir_path)
-                self._log(f"  Removed {dir_path.name}/")
+        self._remove_dirs(temp_dirs)
 
         # Keep .web for now as it's needed at runtime
         self._log("Cleanup complete")
@@ -745,14 +516,21 @@ if __name__ == "__main__":
             # Step 2: Clean previous builds
             self._clean_build_dirs()
 
-            # Step 3: Export Reflex
-            self._export_reflex()
-
-            # Step 4: Create production entry point
-            entry_point = self._create_production_entry_point()
+            # Steps 3-4: Export Reflex while the production entry point and
+            # the Nuitka inputs are prepared; the export is bound by bun/node,
+            # the rest is pure Python
+            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
+                export = pool.submit(self._export_reflex)
+                entry_point_future = pool.submit(self._create_production_entry_point)
+                plotly_future = pool.submit(self._resolve_build_inputs)
+                concurrent.futures.wait([export, entry_point_future, plotly_future])
+            # result() re-raises a failed step's exception
+            export.result()
+            entry_point = entry_point_future.result()
+            plotly_path = plotly_future.result()
 
             # Step 5: Build with Nuitka
-            build_output = self._build_nuitka(entry_point)
+            build_output = self._build_nuitka(entry_point, plotly_path)
 
             # Step 6: Copy assets
             self._copy_assets(build_output)
@@ -802,6 +580,11 @@ def main():
         action="store_true",
         help="Verbose output"
     )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard Nuitka's build tree and recompile everything"
+    )
 
     args = parser.parse_args()
 
@@ -809,6 +592,8 @@ def main():
         target=args.target,
         skip_export=args.skip_export,
         verbose=args.verbose,
+        # --clean always wipes everything, including the incremental build tree
+        fresh=args.fresh or args.clean,
     )
 
     if args.clean:
@@ -8,9 +8,11 @@ Creates:
 Usage:
     python scripts/generate_icons.py
 """
+import os
 import platform
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -22,40 +24,63 @@ def check_dependencies():
     """Check if required packages are available."""
     try:
         from PIL import Image
-        import numpy as np
         return True
     except ImportError as e:
         print(f"Missing dependency: {e}")
-        print("Install with: pip install Pillow numpy")
+        print("Install with: pip install Pillow")
         return False
 
 
-def generate_ico(source_path: Path, output_path: Path, sizes: list[tuple[int, int]]):
-    """Generate Windows .ico file with multiple sizes."""
+def load_source(source_path: Path):
+    """Decode the source PNG once, as RGBA, for all generators."""
     from PIL import Image
 
     img = Image.open(source_path)
+    img.load()
     if img.mode != 'RGBA':
         img = img.convert('RGBA')
+    return img
 
-    icon_images = []
-    for size in sizes:
-        resized = img.resize(size, Image.Resampling.LANCZOS)
-        icon_images.append(resized)
 
+def resize_chain(img, sizes):
+    """Resize img to every size, largest first, each step from the previous one.
+
+    Only the first step reads the full-resolution source; every later LANCZOS
+    pass works on an image at most twice the target size. Returns a dict
+    mapping each (width, height) to its image.
+    """
+    from PIL import Image
+
+    resized = {}
+    current = img
+    for size in sorted(set(sizes), key=lambda s: s[0] * s[1], reverse=True):
+        current = current.resize(size, Image.Resampling.LANCZOS)
+        resized[size] = current
+    return resized
+
+
+def generate_ico(img, output_path: Path, sizes: list[tuple[int, int]]):
+    """Generate Windows .ico file with multiple sizes from an RGBA image."""
+    # Largest first: Pillow drops every requested size bigger than the image
+    # save() is called on
+    sizes = sorted(sizes, key=lambda s: s[0] * s[1], reverse=True)
+    resized = resize_chain(img, sizes)
+    icon_images = [resized[size] for size in sizes]
+
+    # Every size has an image of exactly that size, so Pillow writes them
+    # as-is and resizes nothing. sizes= must stay: without it Pillow falls
+    # back to its default list and adds thumbnails (e.g. 24x24) we don't want
     icon_images[0].save(
         output_path,
         format='ICO',
         sizes=sizes,
-        append_images=icon_images[1:] if len(icon_images) > 1 else []
+        append_images=icon_images[1:]
     )
     print(f"  Created: {output_path.name}")
 
 
-def generate_icns(source_path: Path, output_path: Path):
-    """Generate macOS .icns file using iconutil."""
-    from PIL import Image
-
+def generate_icns(img, output_path: Path):
+    """Generate macOS .icns file using iconutil from an RGBA image."""
     if platform.system() != "Darwin":
         print("  Skipping .icns generation (not on macOS)")
         return False
@@ -63,10 +88,6 @@ def generate_icns(source_path: Path, output_path: Path):
     iconset_dir = output_path.parent / "AppIcon.iconset"
     iconset_dir.mkdir(exist_ok=True)
 
-    img = Image.open(source_path)
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
-
     icon_sizes = [
         (16, "icon_16x16.png"),
         (32, "icon_16x16@2x.png"),
@@ -80,9 +101,14 @@ def generate_icns(source_path: Path, output_path: Path):
         (1024, "icon_512x512@2x.png"),
     ]
 
-    for size, filename in icon_sizes:
-        resized = img.resize((size, size), Image.Resampling.LANCZOS)
-        resized.save(iconset_dir / filename)
+    resized = resize_chain(img, [(size, size) for size, _ in icon_sizes])
+
+    def write_icon(size: int, filename: str):
+        resized[(size, size)].save(iconset_dir / filename)
+
+    # Pillow releases the GIL while PNG-encoding
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        list(pool.map(write_icon, *zip(*icon_sizes)))
 
     result = subprocess.run(
         ["iconutil", "-c", "icns", str(iconset_dir), "-o", str(output_path)],
@@ -101,28 +127,22 @@ def generate_icns(source_path: Path, output_path: Path):
     return True
 
 
-def generate_tray_template(source_path: Path, output_dir: Path):
-    """Generate macOS tray template icons (white on transparent)."""
+def generate_tray_template(img, output_dir: Path):
+    """Generate macOS tray template icons (white on transparent) from an RGBA image."""
     from PIL import Image
-    import numpy as np
 
-    img = Image.open(source_path).convert('RGBA')
-    data = np.array(img)
+    # Paint every pixel white and keep alpha; the colour of fully transparent
+    # pixels is irrelevant because Pillow resizes RGBA with premultiplied alpha
+    white_img = Image.new('RGBA', img.size, (255, 255, 255, 255))
+    white_img.putalpha(img.getchannel('A'))
 
-    alpha = data[:, :, 3]
-    mask = alpha > 0
-    data[mask, 0] = 255
-    data[mask, 1] = 255
-    data[mask, 2] = 255
+    resized = resize_chain(white_img, [(22, 22), (44, 44)])
 
-    white_img = Image.fromarray(data, 'RGBA')
+    def write_icon(size: int, filename: str):
+        resized[(size, size)].save(output_dir / filename)
 
-    white_img.resize((22, 22), Image.Resampling.LANCZOS).save(
-        output_dir / "TrayIconTemplate.png"
-    )
-    white_img.resize((44, 44), Image.Resampling.LANCZOS).save(
-        output_dir / "TrayIconTemplate@2x.png"
-    )
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(write_icon, [22, 44], ["TrayIconTemplate.png", "TrayIconTemplate@2x.png"]))
 
     print("  Created: TrayIconTemplate.png")
     print("  Created: TrayIconTemplate@2x.png")
@@ -145,21 +165,23 @@ def main():
     print(f"\nSource: {SOURCE_ICON}")
     print(f"Output: {ASSETS_DIR}/\n")
 
+    source = load_source(SOURCE_ICON)
+
     print("[1/4] Generating Windows App Icon...")
     generate_ico(
-        SOURCE_ICON,
+        source,
         ASSETS_DIR / "AppIcon.ico",
         [(16, 16), (32, 32), (48, 48), (64, 64), (128, 128), (256, 256)]
     )
 
     print("[2/4] Generating Windows Tray Icon...")
-    generate_ico(SOURCE_ICON, ASSETS_DIR / "TrayIcon.ico", [(16, 16), (32, 32)])
+    generate_ico(source, ASSETS_DIR / "TrayIcon.ico", [(16, 16), (32, 32)])
 
     print("[3/4] Generating macOS App Icon...")
-    generate_icns(SOURCE_ICON, ASSETS_DIR / "AppIcon.icns")
+    generate_icns(source, ASSETS_DIR / "AppIcon.icns")
 
     print("[4/4] Generating macOS Tray Template Icons...")
-    generate_tray_template(SOURCE_ICON, ASSETS_DIR)
+    generate_tray_template(source, ASSETS_DIR)
 
     print("\n" + "=" * 50)
     print("Done! Icons generated in assets/")
@@ -40,11 +40,9 @@ if [[ ! -d "$FINAL_APP" ]]; then
     fi
 fi
 
-# Generate background if missing
-if [[ ! -f "$BACKGROUND" ]]; then
-    log_info "Generating DMG background..."
-    $PYTHON "$PROJECT_ROOT/scripts/mac/create_dmg_background.py"
-fi
+# Generate background (the script skips an up-to-date image itself)
+log_info "Generating DMG background..."
+$PYTHON "$PROJECT_ROOT/scripts/mac/create_dmg_background.py"
 
 # Clean previous build
 rm -rf "$DMG_DIR"
@@ -1,7 +1,31 @@
 #!/usr/bin/env python3
-"""Generate DMG background image with drag-to-install arrow."""
-from PIL import Image, ImageDraw, ImageFont
+"""Generate DMG background image with drag-to-install arrow.
+
+The image only depends on this script and on whether the system font exists,
+so a hash of both is stored next to the PNG and an up-to-date image is not
+regenerated (PIL is not even imported then).
+"""
+import functools
+import hashlib
 import os
+import sys
+
+FONT_PATH = "/System/Library/Fonts/Helvetica.ttc"
+
+output_dir = os.path.dirname(os.path.abspath(__file__))
+assets_dir = os.path.join(os.path.dirname(os.path.dirname(output_dir)), 'assets')
+output_path = os.path.join(assets_dir, 'dmg_background.png')
+key_path = output_path + '.key'
+
+with open(__file__, 'rb') as f:
+    key = hashlib.sha256(f.read() + str(os.path.exists(FONT_PATH)).encode()).hexdigest()
+if os.path.exists(output_path) and os.path.exists(key_path):
+    with open(key_path) as f:
+        if f.read() == key:
+            print(f"Up to date: {output_path}")
+            sys.exit(0)
+
+from PIL import Image, ImageDraw, ImageFont
 
 # DMG window size
 WIDTH = 600
@@ -11,13 +35,17 @@ HEIGHT = 400
 img = Image.new('RGB', (WIDTH, HEIGHT), color=(30, 30, 30))
 draw = ImageDraw.Draw(img)
 
-# Try to use system font, fallback to default
-try:
-    font_large = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 24)
-    font_small = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 16)
-except:
-    font_large = ImageFont.load_default()
-    font_small = font_large
+@functools.lru_cache(maxsize=None)
+def _font(size: int):
+    """Load the system font once per size, fallback to default."""
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+font_large = _font(24)
+font_small = _font(16)
 
 # Draw arrow (simple triangle + line)
 arrow_y = HEIGHT // 2
@@ -43,9 +71,19 @@ draw.text((130, HEIGHT - 80), "App", fill=(100, 100, 100), font=font_small, anch
 draw.text((470, HEIGHT - 80), "Applications", fill=(100, 100, 100), font=font_small, anchor="mm")
 
 # Save
-output_dir = os.path.dirname(os.path.abspath(__file__))
-assets_dir = os.path.join(os.path.dirname(os.path.dirname(output_dir)), 'assets')
 os.makedirs(assets_dir, exist_ok=True)
-output_path = os.path.join(assets_dir, 'dmg_background.png')
-img.save(output_path)
+# A handful of greys plus their anti-aliased text edges: if that fits in a
+# palette, store 1 byte/pixel instead of 3 (lossless, getcolors checks it)
+if img.getcolors(256) is not None:
+    img = img.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
+
+# The background ships inside every DMG, so spend the time on compression
+img.save(output_path, format='PNG', optimize=True, compress_level=9)
+try:
+    import oxipng  # optional: pip install pyoxipng
+    oxipng.optimize(output_path, level=4, strip=oxipng.StripChunks.safe())
+except ImportError:
+    pass
+with open(key_path, 'w') as f:
+    f.write(key)
 print(f"Created: {output_path}")
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""Production entry point for Trailing Stop Manager.
+
+Runs uvicorn in-process (no Node.js) with static frontend mounting.
+"""
+import multiprocessing
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import webbrowser
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Set production environment BEFORE importing reflex
+# IMPORTANT: Internal Reflex env vars need double-underscore prefix!
+os.environ["REFLEX_ENV_MODE"] = "prod"
+os.environ["__REFLEX_SKIP_COMPILE"] = "true"  # Skip frontend compilation
+os.environ["__REFLEX_MOUNT_FRONTEND_COMPILED_APP"] = "true"  # Serve static files
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def _resolve_if_exists(path: Path) -> Path:
+    """Resolve path if it exists, else return it unchanged (one stat chain)."""
+    try:
+        return path.resolve(strict=True)
+    except OSError:
+        return path
+
+
+def get_app_dir() -> Path:
+    """Get the application directory (handles Nuitka + dev mode).
+
+    Für Nuitka macOS App-Bundles:
+    - __compiled__.containing_dir zeigt auf das Parent-Verzeichnis des .app-Bundles
+    - sys.executable zeigt direkt auf Contents/MacOS/TrailingStopManager
+    - .web/ wird nach Contents/MacOS/.web/ kopiert
+
+    Die zuverlässigste Methode ist sys.executable.parent für macOS-Bundles.
+    """
+    # Debug logging
+    logger.info(f"sys.executable = {sys.executable}")
+    logger.info(f"os.getcwd() before chdir = {os.getcwd()}")
+
+    compiled_obj = globals().get("__compiled__", None)
+
+    if compiled_obj is not None:
+        logger.info(f"__compiled__ present: {compiled_obj}")
+        macos_bundle = getattr(compiled_obj, "macos_bundle_mode", False)
+        logger.info(f"macos_bundle_mode = {macos_bundle}")
+
+    # 1. Beste Methode für Nuitka: sys.executable.parent
+    # Dies funktioniert für ALLE Nuitka-Builds (standalone, onefile, macos_bundle)
+    exe_path = Path(sys.executable).resolve()
+    exe_dir = exe_path.parent
+
+    # Für macOS App-Bundles: exe_dir ist Contents/MacOS/
+    if (exe_dir / ".web").exists():
+        logger.info(f"Using app dir from sys.executable.parent: {exe_dir}")
+        return exe_dir
+
+    # 2. Falls .web nicht direkt neben exe gefunden: erweiterte Suche
+    # (für edge cases oder andere Bundle-Strukturen)
+    candidates = [
+        exe_dir,
+        exe_dir / "MacOS",
+        exe_dir.parent / "MacOS",
+        exe_dir.parent / "Resources",  # Alternative macOS-Bundle-Location
+    ]
+
+    # Auch im containing_dir suchen falls vorhanden
+    if compiled_obj is not None:
+        containing_dir = getattr(compiled_obj, "containing_dir", None)
+        if containing_dir:
+            base = Path(containing_dir).resolve()
+            candidates.extend([
+                base,
+                base / "MacOS",
+            ])
+            # Für macOS: Suche in *.app/Contents/MacOS/ innerhalb von containing_dir
+            for app_bundle in base.glob("*.app"):
+                macos_path = app_bundle / "Contents" / "MacOS"
+                if macos_path.exists():
+                    candidates.append(macos_path)
+
+    # Deduplizieren (Reihenfolge bleibt erhalten) und prüfen
+    unique_candidates = list(dict.fromkeys(map(_resolve_if_exists, candidates)))
+
+    for cand in unique_candidates:
+        if (cand / ".web").exists():
+            logger.info(f"Using app dir from extended search: {cand}")
+            return cand
+
+    logger.warning(
+        f"Could not find .web in any expected location. "
+        f"exe_dir={exe_dir}, tried: {[str(c) for c in unique_candidates]}"
+    )
+
+    # 3. Fallback für Dev-Mode (kein __compiled__ vorhanden)
+    if compiled_obj is None:
+        dev_path = Path(__file__).parent.parent
+        logger.info(f"Using dev mode path: {dev_path}")
+        return dev_path
+
+    # Letzter Fallback: exe_dir
+    return exe_dir
+
+
+# CRITICAL: Change to app directory IMMEDIATELY - before any imports
+# This is necessary because Reflex's StaticFiles validation happens at import time
+APP_DIR = get_app_dir()
+os.chdir(APP_DIR)
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+logger.info(f"Working directory set to: {APP_DIR}")
+
+
+class PrecompressedStatic:
+    """ASGI wrapper serving the .br/.gz siblings written by scripts/deploy.py.
+
+    Reflex mounts the export with Starlette's StaticFiles, which never looks
+    for precompressed files. For a GET/HEAD whose path has a sibling in an
+    encoding the client accepts, the sibling is sent with Content-Encoding;
+    everything else (API, websocket, uncompressed files) goes to the app.
+    """
+
+    # Preferred first
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def __init__(self, app, directory: Path):
+        self.app = app
+        self.directory = directory.resolve()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            response = self._precompressed_response(scope)
+            if response is not None:
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _accepted_encodings(accept_encoding: str) -> set[str]:
+        """Parse Accept-Encoding, dropping codings explicitly refused with q=0."""
+        accepted = set()
+        for item in accept_encoding.split(","):
+            coding, _, params = item.partition(";")
+            coding = coding.strip().lower()
+            if not coding:
+                continue
+            try:
+                if params and float(params.strip().removeprefix("q=")) == 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(coding)
+        return accepted
+
+    def _precompressed_response(self, scope):
+        """Return a response for the precompressed sibling, or None."""
+        import mimetypes
+
+        from starlette.datastructures import Headers
+        from starlette.responses import FileResponse
+        from starlette.staticfiles import NotModifiedResponse
+
+        headers = Headers(scope=scope)
+        accepted = self._accepted_encodings(headers.get("accept-encoding", ""))
+        if not accepted:
+            return None
+
+        path = (self.directory / scope["path"].lstrip("/")).resolve()
+        if not path.is_relative_to(self.directory):
+            return None
+        if path.is_dir():
+            path = path / "index.html"
+
+        for encoding, suffix in self.ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                stat_result = os.stat(path.with_name(path.name + suffix))
+            except OSError:
+                continue
+            response = FileResponse(
+                path.with_name(path.name + suffix),
+                stat_result=stat_result,
+                # Content type of the original, not application/gzip
+                media_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+            )
+            etag = response.headers.get("etag")
+            if etag and etag in headers.get("if-none-match", ""):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+
+
+class ProductionApp:
+    """Production application manager."""
+
+    def __init__(self):
+        self.app_dir = APP_DIR  # Use globally set app dir
+        self._shutdown_initiated = threading.Event()
+        self._app_ready = threading.Event()
+        self.tray = None
+        self._server_thread = None
+
+    def _wait_for_ready(self, url: str, timeout: int = 60) -> bool:
+        """Wait for service to be ready (accepting TCP connections)."""
+        parts = urlsplit(url)
+        address = (parts.hostname, parts.port or 80)
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            if self._shutdown_initiated.is_set():
+                return False
+            try:
+                with socket.create_connection(address, timeout=0.2):
+                    return True
+            except OSError:
+                # Back off 10 ms -> 500 ms; shutdown still interrupts the wait
+                self._shutdown_initiated.wait(delay)
+                delay = min(delay * 1.5, 0.5)
+        return False
+
+    def _run_uvicorn_server(self) -> None:
+        """Run the uvicorn server directly (no subprocess, no Node.js).
+
+        Uses uvicorn instead of Granian because uvicorn supports
+        running in a background thread when properly configured; Granian's
+        serve() wants the main thread and an import string for the app,
+        which the Nuitka build can't resolve. The loop runs on uvloop when
+        it is installed (not on Windows).
+        """
+        try:
+            import asyncio
+            import uvicorn
+
+            # CRITICAL: Create event loop BEFORE importing reflex modules
+            # Reflex uses asyncio internally and needs an event loop present
+            try:
+                import uvloop
+                loop = uvloop.new_event_loop()
+            except ImportError:
+                loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+
+            # Working directory is already set at module load time
+            logger.info(f"Starting uvicorn server (cwd: {os.getcwd()})...")
+
+            # Disable frontend generation/installs and patch Socket.IO; must
+            # happen BEFORE importing the app module, because app = rx.App()
+            # creates the AsyncServer at module load time
+            from trailing_stop_web import _reflex_patches
+            _reflex_patches.install()
+
+            # Import the app module AFTER patching Socket.IO
+            # This module is compiled into the Nuitka binary
+            import trailing_stop_web.trailing_stop_web as app_module
+
+            # Hand the pre-imported module to Reflex (no dynamic import in Nuitka)
+            _reflex_patches.use_app_module(app_module)
+
+            # Now call the app factory
+            asgi_app = app_module.app()
+
+            # Serve the .br/.gz copies deploy.py wrote next to the export
+            asgi_app = PrecompressedStatic(asgi_app, APP_DIR / ".web" / "_static")
+
+            uvicorn_config = uvicorn.Config(
+                app=asgi_app,
+                host="0.0.0.0",
+                port=8000,
+                log_level="warning",
+                access_log=False,
+            )
+            server = uvicorn.Server(uvicorn_config)
+
+            # Run server (event loop is already set above)
+            loop.run_until_complete(server.serve())
+        except Exception as e:
+            logger.error(f"Uvicorn server error: {e}")
+
+    def start_server(self) -> bool:
+        """Start the uvicorn server in a background thread."""
+        logger.info("Starting server...")
+
+        self._server_thread = threading.Thread(
+            target=self._run_uvicorn_server,
+            daemon=True
+        )
+        self._server_thread.start()
+
+        # Wait for server to be ready (port 8000 now, not 3000)
+        if self._wait_for_ready("http://localhost:8000", timeout=60):
+            logger.info("Server ready!")
+            self._app_ready.set()
+            return True
+        else:
+            logger.error("Server failed to start within timeout")
+            return False
+
+    def start_tray(self) -> None:
+        """Start system tray icon."""
+        try:
+            from trailing_stop_web.tray import SystemTray
+            self.tray = SystemTray(on_quit=self._on_quit)
+            logger.info("System tray started")
+            self.tray.run()
+        except ImportError as e:
+            logger.warning(f"System tray not available: {e}")
+            # Keep running without tray
+            try:
+                while not self._shutdown_initiated.is_set():
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+
+    def _on_quit(self) -> None:
+        """Handle quit from tray."""
+        self._shutdown_initiated.set()
+
+    def shutdown(self) -> None:
+        """Shutdown all services."""
+        if self._shutdown_initiated.is_set():
+            return
+        self._shutdown_initiated.set()
+        logger.info("Shutting down...")
+
+        if self.tray:
+            try:
+                self.tray.stop()
+            except Exception:
+                pass
+
+    def run(self, open_browser: bool = True) -> None:
+        """Run the application."""
+        # Setup signal handlers
+        def signal_handler(sig, frame):
+            self.shutdown()
+            sys.exit(0)
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+        try:
+            # Start server
+            if not self.start_server():
+                logger.error("Failed to start server")
+                return
+
+            # Open browser (now port 8000)
+            if open_browser:
+                logger.info("Opening browser...")
+                webbrowser.open("http://localhost:8000")
+
+            # Start tray (blocks until quit)
+            self.start_tray()
+
+        finally:
+            self.shutdown()
+
+
+def main():
+    """Main entry point."""
+    import argparse
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="Trailing Stop Manager")
+    parser.add_argument("--no-browser", action="store_true", help="Don't open browser")
+    args = parser.parse_args()
+
+    app = ProductionApp()
+    app.run(open_browser=not args.no_browser)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,24 +10,142 @@ This will test:
 2. BAG (combo) contract details and market rules
 3. Compare tick sizes between single and combo
 """
-from ib_insync import IB, Contract, ComboLeg
+import asyncio
+import contextlib
+import functools
+import io
+import socket
+from collections import defaultdict
+
+from ib_insync import IB, Contract, ComboLeg, ContractDetails
 import sys
 
+# Per-run caches, keyed by conId (legs for a BAG) / rule id: the same legs are
+# qualified and looked up by the single-leg and the BAG tests. _cd_cache also
+# holds None for "no details" and the exception of a failed request
+_qual_cache: dict[int, Contract] = {}
+_cd_cache: dict = {}
+_rule_cache: dict[int, list] = {}
+
+
+def find_tws_port(host: str = '127.0.0.1', ports: tuple[int, ...] = (7497, 7496)) -> int | None:
+    """Return the first port (paper, then live) that accepts a TCP connection.
+
+    A short probe per port, so a missing paper TWS doesn't cost a full
+    ib.connect() timeout before the live port is tried.
+    """
+    for port in ports:
+        with socket.socket() as s:
+            s.settimeout(0.2)
+            if s.connect_ex((host, port)) == 0:
+                return port
+    return None
+
+
+def _contract_key(contract: Contract):
+    """Cache key: the conId, or exchange and legs for a BAG (which has none)."""
+    if contract.conId:
+        return contract.conId
+    return contract.exchange, tuple((leg.conId, leg.ratio, leg.action) for leg in contract.comboLegs)
+
+
+def _first_rule_id(cd: ContractDetails) -> int | None:
+    """Return the first market rule id of a ContractDetails, if it has a valid one."""
+    try:
+        return int((cd.marketRuleIds or "").partition(',')[0])
+    except ValueError:
+        return None
 
-def test_single_leg_by_conid(ib: IB, con_id: int):
-    """Test single leg market rules using conId."""
-    print(f"\n{'='*60}")
-    print(f"SINGLE LEG: conId={con_id}")
-    print('='*60)
 
-    contract = Contract(conId=con_id)
-    qualified = ib.qualifyContracts(contract)
+def get_qualified(ib: IB, *con_ids: int) -> list[Contract]:
+    """Qualify conIds, asking TWS only for those not qualified yet.
+
+    Returns the qualified contracts in order; conIds TWS can't qualify are
+    left out, like ib.qualifyContracts does.
+    """
+    missing = [Contract(conId=c) for c in dict.fromkeys(con_ids) if c not in _qual_cache]
+    if missing:
+        for contract in ib.qualifyContracts(*missing):
+            _qual_cache[contract.conId] = contract
+    return [_qual_cache[c] for c in con_ids if c in _qual_cache]
+
+
+def get_details(ib: IB, contract: Contract) -> ContractDetails | None:
+    """Return the first ContractDetails for a contract, cached.
+
+    Re-raises the error of a failed request that prefetch() cached.
+    """
+    key = _contract_key(contract)
+    if key not in _cd_cache:
+        details = ib.reqContractDetails(contract)
+        _cd_cache[key] = details[0] if details else None
+    cd = _cd_cache[key]
+    if isinstance(cd, Exception):
+        raise cd
+    return cd
+
+
+def get_market_rule(ib: IB, rule_id: int) -> list:
+    """Return the price increments of a market rule, cached by rule id."""
+    if rule_id not in _rule_cache:
+        _rule_cache[rule_id] = ib.reqMarketRule(rule_id)
+    return _rule_cache[rule_id]
+
+
+async def prefetch(ib: IB, contracts: list[Contract]):
+    """Fill the caches for contracts with concurrent requests.
+
+    All contract details are requested at once, then all of their first
+    market rules, so the tests below only print from the caches.
+    """
+    missing = [c for c in contracts if _contract_key(c) not in _cd_cache]
+    results = await asyncio.gather(
+        *(ib.reqContractDetailsAsync(c) for c in missing), return_exceptions=True
+    )
+    for contract, result in zip(missing, results):
+        if not isinstance(result, Exception):
+            result = result[0] if result else None
+        _cd_cache[_contract_key(contract)] = result
+
+    rule_ids = list({
+        _first_rule_id(cd) for cd in _cd_cache.values() if isinstance(cd, ContractDetails)
+    } - {None} - _rule_cache.keys())
+    rules = await asyncio.gather(*(ib.reqMarketRuleAsync(rule_id) for rule_id in rule_ids))
+    _rule_cache.update(zip(rule_ids, rules))
+
+
+def make_bag(con_id1: int, con_id2: int, symbol: str, currency: str, exchange: str = "SMART") -> Contract:
+    """Create a BAG buying leg 1 and selling leg 2."""
+    return Contract(
+        symbol=symbol, secType='BAG', currency=currency, exchange=exchange,
+        comboLegs=[
+            ComboLeg(conId=con_id1, ratio=1, action='BUY', exchange=exchange),
+            ComboLeg(conId=con_id2, ratio=1, action='SELL', exchange=exchange),
+        ],
+    )
+
+
+def _batched_output(func):
+    """Collect a test's printed report and write it to stdout in one call."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        buf = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buf):
+                return func(*args, **kwargs)
+        finally:
+            sys.stdout.write(buf.getvalue())
+            sys.stdout.flush()
+    return wrapper
+
 
-    if not qualified:
-        print(f"ERROR: Could not qualify conId={con_id}")
-        return None, None
+@_batched_output
+def test_single_leg(ib: IB, contract: Contract):
+    """Test single leg market rules for an already qualified contract."""
+    print(f"\n{'='*60}")
+    print(f"SINGLE LEG: conId={contract.conId}")
+    print('='*60)
 
-    contract = qualified[0]
     print(f"symbol: {contract.symbol}")
     print(f"secType: {contract.secType}")
     print(f"strike: {contract.strike}")
@@ -35,40 +153,37 @@ def test_single_leg_by_conid(ib: IB, con_id: int):
     print(f"expiry: {contract.lastTradeDateOrContractMonth}")
     print(f"exchange: {contract.exchange}")
 
-    details = ib.reqContractDetails(contract)
-    if not details:
+    cd = get_details(ib, contract)
+    if not cd:
         print("ERROR: No contract details")
-        return contract, None
+        return None
 
-    cd = details[0]
     print(f"\nContractDetails:")
     print(f"  minTick: {cd.minTick}")
     print(f"  validExchanges: {cd.validExchanges}")
     print(f"  marketRuleIds: {cd.marketRuleIds}")
 
     # Get market rules
-    rule_ids = (cd.marketRuleIds or "").split(',')
-    if rule_ids and rule_ids[0]:
-        rule_id = int(rule_ids[0])
-        rule = ib.reqMarketRule(rule_id)
+    head, _, _ = (cd.marketRuleIds or "").partition(',')
+    if head:
+        rule_id = int(head)
+        rule = get_market_rule(ib, rule_id)
         print(f"\nMarket Rule {rule_id}:")
         for pr in rule:
             print(f"  >= ${pr.lowEdge:.2f}: tick = {pr.increment}")
 
-    return contract, cd
+    return cd
 
 
+@_batched_output
 def test_bag_from_conids(ib: IB, con_id1: int, con_id2: int, symbol: str, exchange: str = "SMART"):
     """Test BAG (combo) contract details using conIds."""
     print(f"\n{'='*60}")
     print(f"BAG CONTRACT: {symbol} conIds={con_id1},{con_id2}")
     print('='*60)
 
-    # Qualify leg contracts
-    leg1_contract = Contract(conId=con_id1)
-    leg2_contract = Contract(conId=con_id2)
-
-    qualified = ib.qualifyContracts(leg1_contract, leg2_contract)
+    # Qualify leg contracts (cached if the single-leg test already did)
+    qualified = get_qualified(ib, con_id1, con_id2)
     if len(qualified) != 2:
         print("ERROR: Could not qualify both legs")
         return None
@@ -78,25 +193,7 @@ def test_bag_from_conids(ib: IB, con_id1: int, con_id2: int, symbol: str, exchan
     print(f"Leg 2: {leg2_contract.symbol} {leg2_contract.strike}{leg2_contract.right} conId={leg2_contract.conId}")
 
     # Create BAG contract
-    bag = Contract()
-    bag.symbol = symbol
-    bag.secType = 'BAG'
-    bag.currency = leg1_contract.currency
-    bag.exchange = exchange
-
-    leg1 = ComboLeg()
-    leg1.conId = con_id1
-    leg1.ratio = 1
-    leg1.action = 'BUY'
-    leg1.exchange = exchange
-
-    leg2 = ComboLeg()
-    leg2.conId = con_id2
-    leg2.ratio = 1
-    leg2.action = 'SELL'
-    leg2.exchange = exchange
-
-    bag.comboLegs = [leg1, leg2]
+    bag = make_bag(con_id1, con_id2, symbol, leg1_contract.currency, exchange)
 
     print(f"\nBAG contract:")
     print(f"  secType: {bag.secType}")
@@ -106,9 +203,8 @@ def test_bag_from_conids(ib: IB, con_id1: int, con_id2: int, symbol: str, exchan
     # Try to get contract details
     print(f"\nTrying reqContractDetails(BAG)...")
     try:
-        details = ib.reqContractDetails(bag)
-        if details:
-            cd = details[0]
+        cd = get_details(ib, bag)
+        if cd:
             print(f"\n*** SUCCESS! IB returns ContractDetails for BAG ***")
             print(f"  minTick: {cd.minTick}")
             print(f"  validExchanges: {cd.validExchanges}")
@@ -116,16 +212,16 @@ def test_bag_from_conids(ib: IB, con_id1: int, con_id2: int, symbol: str, exchan
 
             # Try market rule
             if cd.marketRuleIds:
-                rule_ids = cd.marketRuleIds.split(',')
-                if rule_ids and rule_ids[0]:
+                head, _, _ = cd.marketRuleIds.partition(',')
+                if head:
                     try:
-                        rule_id = int(rule_ids[0])
-                        rule = ib.reqMarketRule(rule_id)
+                        rule_id = int(head)
+                        rule = get_market_rule(ib, rule_id)
                         print(f"\nMarket Rule {rule_id} for BAG:")
                         for pr in rule:
                             print(f"  >= ${pr.lowEdge:.2f}: tick = {pr.increment}")
                     except ValueError:
-                        print(f"  Could not parse rule_id: {rule_ids[0]}")
+                        print(f"  Could not parse rule_id: {head}")
             return cd
         else:
             print("\n*** IB returns EMPTY list for BAG ContractDetails ***")
@@ -137,6 +233,7 @@ def test_bag_from_conids(ib: IB, con_id1: int, con_id2: int, symbol: str, exchan
         return None
 
 
+@_batched_output
 def test_from_portfolio(ib: IB):
     """Test using positions from the portfolio."""
     print(f"\n{'='*60}")
@@ -148,13 +245,13 @@ def test_from_portfolio(ib: IB):
         print("No positions found in portfolio")
         return
 
+    # Qualify every position in one request; later lookups hit the cache
+    get_qualified(ib, *(pos.contract.conId for pos in positions))
+
     # Group by symbol
-    by_symbol = {}
+    by_symbol = defaultdict(list)
     for pos in positions:
-        sym = pos.contract.symbol
-        if sym not in by_symbol:
-            by_symbol[sym] = []
-        by_symbol[sym].append(pos)
+        by_symbol[pos.contract.symbol].append(pos)
 
     print(f"Found {len(positions)} positions in {len(by_symbol)} symbols")
 
@@ -178,10 +275,10 @@ def main():
 
     try:
         # Try paper trading port first, then live
-        try:
-            ib.connect('127.0.0.1', 7497, clientId=99)
-        except:
-            ib.connect('127.0.0.1', 7496, clientId=99)
+        port = find_tws_port()
+        if port is None:
+            raise ConnectionError("No TWS/Gateway listening on port 7497 or 7496")
+        ib.connect('127.0.0.1', port, clientId=99)
 
         print(f"Connected! Server version: {ib.client.serverVersion()}")
 
@@ -205,11 +302,13 @@ def main():
                 spx_con_ids = []
 
         if len(spx_con_ids) >= 2:
-            # Test single leg
-            contract1, cd1 = test_single_leg_by_conid(ib, spx_con_ids[0])
-            contract2, cd2 = test_single_leg_by_conid(ib, spx_con_ids[1])
+            # Qualify both legs in one request
+            qualified = get_qualified(ib, *spx_con_ids[:2])
+            if len(qualified) != 2:
+                print(f"ERROR: Could not qualify conIds={spx_con_ids[:2]}")
+            else:
+                contract1, contract2 = qualified
 
-            if contract1 and contract2:
                 symbol = contract1.symbol
                 # Determine exchange - use primary exchange or CBOE for SPX
                 if symbol == 'SPX':
@@ -217,6 +316,15 @@ def main():
                 else:
                     exchange = contract1.exchange or 'SMART'
 
+                # Request both legs and the BAG (and their market rules)
+                # concurrently; the tests then print from the caches
+                bag = make_bag(contract1.conId, contract2.conId, symbol, contract1.currency, exchange)
+                ib.run(prefetch(ib, [contract1, contract2, bag]))
+
+                # Test single leg
+                cd1 = test_single_leg(ib, contract1)
+                cd2 = test_single_leg(ib, contract2)
+
                 # Test BAG
                 bag_cd = test_bag_from_conids(ib, spx_con_ids[0], spx_con_ids[1], symbol, exchange)
 
@@ -8,6 +8,9 @@ The goal is to determine if IB provides:
 2. Market Rules specifically for combos/spreads
 3. Different tick sizes for spreads vs single legs
 """
+import socket
+import sys
+
 import pytest
 from ib_insync import IB, Contract, ComboLeg, Option
 
@@ -19,36 +22,57 @@ pytestmark = pytest.mark.skipif(
 )
 
 
-@pytest.fixture(scope="module")
+def _find_tws_port(ports=(7497, 7496)):
+    """Return the first port (paper, then live) that accepts a TCP connection."""
+    for port in ports:
+        with socket.socket() as s:
+            s.settimeout(0.2)
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return port
+    return None
+
+
+@pytest.fixture(scope="session")
 def ib():
-    """Connect to TWS/Gateway."""
+    """Connect to TWS/Gateway (paper trading port first, then live)."""
+    port = _find_tws_port()
+    if port is None:
+        pytest.skip("No TWS/Gateway listening on port 7497 or 7496")
     ib = IB()
     try:
-        ib.connect('127.0.0.1', 7497, clientId=99)  # Paper trading port
+        ib.connect('127.0.0.1', port, clientId=99)
         yield ib
     finally:
         ib.disconnect()
 
 
+# The SPX calls used by the tests (Adjust date as needed)
+SPX_5900C = dict(symbol='SPX', lastTradeDateOrContractMonth='20241220', strike=5900,
+                 right='C', exchange='SMART', currency='USD')
+SPX_6000C = dict(SPX_5900C, strike=6000)
+
+
+@pytest.fixture(scope="session")
+def spx_legs(ib):
+    """The 5900 and 6000 SPX calls of the test spread, qualified once per session."""
+    legs = ib.qualifyContracts(Option(**SPX_5900C), Option(**SPX_6000C))
+    assert len(legs) == 2, "Could not qualify both SPX option contracts"
+    return legs
+
+
+@pytest.fixture(scope="session")
+def spx_6000c_details(ib, spx_legs):
+    """ContractDetails of the 6000 call, or None if IB returns none."""
+    details = ib.reqContractDetails(spx_legs[1])
+    return details[0] if details else None
+
+
 class TestBAGMarketRules:
     """Test Market Rules for BAG (combo) contracts."""
 
-    def test_single_leg_spx_option_market_rule(self, ib):
+    def test_single_leg_spx_option_market_rule(self, ib, spx_legs, spx_6000c_details):
         """Get market rule for a single SPX option leg."""
-        # Create a simple SPX option contract
-        contract = Option(
-            symbol='SPX',
-            lastTradeDateOrContractMonth='20241220',  # Adjust date as needed
-            strike=6000,
-            right='C',
-            exchange='SMART',
-            currency='USD'
-        )
-
-        # Qualify the contract to get conId
-        qualified = ib.qualifyContracts(contract)
-        assert qualified, "Could not qualify SPX option contract"
-        contract = qualified[0]
+        contract, cd = spx_legs[1], spx_6000c_details
 
         print(f"\n=== Single Leg SPX Option ===")
         print(f"conId: {contract.conId}")
@@ -56,72 +80,37 @@ class TestBAGMarketRules:
         print(f"secType: {contract.secType}")
         print(f"exchange: {contract.exchange}")
 
-        # Get contract details
-        details = ib.reqContractDetails(contract)
-        assert details, "No contract details returned"
-
-        cd = details[0]
+        assert cd, "No contract details returned"
         print(f"\nContractDetails:")
         print(f"  minTick: {cd.minTick}")
         print(f"  validExchanges: {cd.validExchanges}")
         print(f"  marketRuleIds: {cd.marketRuleIds}")
 
         # Get market rule
-        rule_ids = cd.marketRuleIds.split(',')
-        if rule_ids and rule_ids[0]:
-            rule_id = int(rule_ids[0])
+        head, _, _ = cd.marketRuleIds.partition(',')
+        if head:
+            rule_id = int(head)
             rule = ib.reqMarketRule(rule_id)
             print(f"\nMarket Rule {rule_id}:")
             for pr in rule:
                 print(f"  lowEdge >= ${pr.lowEdge}: increment = {pr.increment}")
 
-    def test_bag_contract_details(self, ib):
+    def test_bag_contract_details(self, ib, spx_legs):
         """Try to get ContractDetails for a BAG (combo) contract."""
-        # First, get two SPX option contracts for the spread
-        call_low = Option(
-            symbol='SPX',
-            lastTradeDateOrContractMonth='20241220',
-            strike=5900,
-            right='C',
-            exchange='SMART'
-        )
-        call_high = Option(
-            symbol='SPX',
-            lastTradeDateOrContractMonth='20241220',
-            strike=6000,
-            right='C',
-            exchange='SMART'
-        )
-
-        # Qualify contracts
-        qualified = ib.qualifyContracts(call_low, call_high)
-        assert len(qualified) == 2, "Could not qualify both contracts"
-        call_low, call_high = qualified
+        call_low, call_high = spx_legs
 
         print(f"\n=== BAG Contract (Bull Call Spread) ===")
         print(f"Leg 1: {call_low.symbol} {call_low.strike}C conId={call_low.conId}")
         print(f"Leg 2: {call_high.symbol} {call_high.strike}C conId={call_high.conId}")
 
         # Create BAG contract
-        bag = Contract()
-        bag.symbol = 'SPX'
-        bag.secType = 'BAG'
-        bag.currency = 'USD'
-        bag.exchange = 'SMART'
-
-        leg1 = ComboLeg()
-        leg1.conId = call_low.conId
-        leg1.ratio = 1
-        leg1.action = 'BUY'
-        leg1.exchange = 'SMART'
-
-        leg2 = ComboLeg()
-        leg2.conId = call_high.conId
-        leg2.ratio = 1
-        leg2.action = 'SELL'
-        leg2.exchange = 'SMART'
-
-        bag.comboLegs = [leg1, leg2]
+        bag = Contract(
+            symbol='SPX', secType='BAG', currency='USD', exchange='SMART',
+            comboLegs=[
+                ComboLeg(conId=call_low.conId, ratio=1, action='BUY', exchange='SMART'),
+                ComboLeg(conId=call_high.conId, ratio=1, action='SELL', exchange='SMART'),
+            ],
+        )
 
         print(f"\nBAG contract created:")
         print(f"  symbol: {bag.symbol}")
@@ -142,9 +131,9 @@ class TestBAGMarketRules:
 
                 # Try to get market rule
                 if cd.marketRuleIds:
-                    rule_ids = cd.marketRuleIds.split(',')
-                    if rule_ids and rule_ids[0]:
-                        rule_id = int(rule_ids[0])
+                    head, _, _ = cd.marketRuleIds.partition(',')
+                    if head:
+                        rule_id = int(head)
                         rule = ib.reqMarketRule(rule_id)
                         print(f"\nMarket Rule {rule_id} for BAG:")
                         for pr in rule:
@@ -154,49 +143,24 @@ class TestBAGMarketRules:
         except Exception as e:
             print(f"ERROR getting ContractDetails for BAG: {e}")
 
-    def test_compare_single_vs_bag_tick(self, ib):
+    def test_compare_single_vs_bag_tick(self, ib, spx_legs, spx_6000c_details):
         """Compare tick sizes between single leg and BAG."""
-        # Get single leg
-        option = Option(
-            symbol='SPX',
-            lastTradeDateOrContractMonth='20241220',
-            strike=6000,
-            right='C',
-            exchange='SMART'
-        )
-        qualified = ib.qualifyContracts(option)
-        option = qualified[0]
-
-        single_details = ib.reqContractDetails(option)
-        single_tick = single_details[0].minTick if single_details else None
+        # The single leg is the 6000 call, which is also the BAG's short leg
+        call_low, call_high = spx_legs
+        single_tick = spx_6000c_details.minTick if spx_6000c_details else None
 
         print(f"\n=== Tick Size Comparison ===")
         print(f"Single leg minTick: {single_tick}")
 
         # Create BAG
-        call_low = Option('SPX', '20241220', 5900, 'C', 'SMART')
-        call_high = Option('SPX', '20241220', 6000, 'C', 'SMART')
-        qualified = ib.qualifyContracts(call_low, call_high)
-
-        bag = Contract()
-        bag.symbol = 'SPX'
-        bag.secType = 'BAG'
-        bag.currency = 'USD'
-        bag.exchange = 'SMART'
-
-        leg1 = ComboLeg()
-        leg1.conId = qualified[0].conId
-        leg1.ratio = 1
-        leg1.action = 'BUY'
-        leg1.exchange = 'SMART'
-
-        leg2 = ComboLeg()
-        leg2.conId = qualified[1].conId
-        leg2.ratio = 1
-        leg2.action = 'SELL'
-        leg2.exchange = 'SMART'
-
-        bag.comboLegs = [leg1, leg2]
+
+        bag = Contract(
+            symbol='SPX', secType='BAG', currency='USD', exchange='SMART',
+            comboLegs=[
+                ComboLeg(conId=call_low.conId, ratio=1, action='BUY', exchange='SMART'),
+                ComboLeg(conId=call_high.conId, ratio=1, action='SELL', exchange='SMART'),
+            ],
+        )
 
         try:
             bag_details = ib.reqContractDetails(bag)
@@ -252,9 +216,9 @@ class TestDifferentUnderlyings:
             print(f"marketRuleIds: {cd.marketRuleIds[:50]}...")
 
             # Get first market rule
-            rule_ids = cd.marketRuleIds.split(',')
-            if rule_ids and rule_ids[0]:
-                rule_id = int(rule_ids[0])
+            head, _, _ = cd.marketRuleIds.partition(',')
+            if head:
+                rule_id = int(head)
                 rule = ib.reqMarketRule(rule_id)
                 print(f"Market Rule {rule_id}:")
                 for pr in rule:
@@ -266,13 +230,20 @@ class TestDifferentUnderlyings:
 
 if __name__ == "__main__":
     # Run manually without pytest
+    port = _find_tws_port()
+    if port is None:
+        sys.exit("No TWS/Gateway listening on port 7497 or 7496")
     ib = IB()
-    ib.connect('127.0.0.1', 7497, clientId=99)
+    ib.connect('127.0.0.1', port, clientId=99)
 
     try:
+        legs = ib.qualifyContracts(Option(**SPX_5900C), Option(**SPX_6000C))
+        details = ib.reqContractDetails(legs[1])
+        cd = details[0] if details else None
+
         test = TestBAGMarketRules()
-        test.test_single_leg_spx_option_market_rule(ib)
-        test.test_bag_contract_details(ib)
-        test.test_compare_single_vs_bag_tick(ib)
+        test.test_single_leg_spx_option_market_rule(ib, legs, cd)
+        test.test_bag_contract_details(ib, legs)
+        test.test_compare_single_vs_bag_tick(ib, legs, cd)
     finally:
         ib.disconnect()
@@ -12,8 +12,9 @@ The key insight: SPX options (and many others) have price-dependent tick sizes:
 This test uses fixtures that simulate real IB API responses.
 """
 import pytest
-from types import SimpleNamespace
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import MagicMock
+
+from ib_insync import ComboLeg, PriceIncrement
 
 import sys
 from pathlib import Path
@@ -23,13 +24,23 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 # Import fixtures
 from ib.fixtures.market_rules import (
     SPX_OPTION_MARKET_RULE,
+    SPX_OPTION_MARKET_RULE_SOA,
+    SPX_OPTION_MARKET_RULE_T,
     STOCK_MARKET_RULE,
     SPX_OPTION_CONTRACT_DETAILS,
     SPX_TICK_SIZE_TEST_CASES,
     BUG_CASE_TICK_010,
     create_spx_option_contract,
+    MockContract,
     MockPriceIncrement,
 )
+from trailing_stop_web.broker import TWSBroker
+
+
+@pytest.fixture
+def broker():
+    """A new, unconnected TWSBroker for each test (construction takes ~0.1ms)."""
+    return TWSBroker()
 
 
 class TestTickSizeResolution:
@@ -45,13 +56,12 @@ class TestTickSizeResolution:
         """SPX option priced below $3 should use 0.05 tick."""
         # Simulate the tick size lookup logic
         price = 2.50
-        rule = SPX_OPTION_MARKET_RULE
 
-        # Find increment for this price level (same logic as broker.py)
+        # Find increment for this price level (linear scan; broker.py bisects the same bands)
         increment = 0.01  # default
-        for price_rule in rule:
-            if price_rule.lowEdge <= price:
-                increment = price_rule.increment
+        for edge, inc in SPX_OPTION_MARKET_RULE_T:
+            if edge <= price:
+                increment = inc
             else:
                 break
 
@@ -60,12 +70,11 @@ class TestTickSizeResolution:
     def test_spx_option_at_3_uses_010_tick(self):
         """SPX option priced at exactly $3 should use 0.10 tick."""
         price = 3.00
-        rule = SPX_OPTION_MARKET_RULE
 
         increment = 0.01
-        for price_rule in rule:
-            if price_rule.lowEdge <= price:
-                increment = price_rule.increment
+        for edge, inc in SPX_OPTION_MARKET_RULE_T:
+            if edge <= price:
+                increment = inc
             else:
                 break
 
@@ -74,12 +83,11 @@ class TestTickSizeResolution:
     def test_spx_option_above_3_uses_010_tick(self):
         """SPX option priced above $3 should use 0.10 tick."""
         price = 4.60  # The specific bug case
-        rule = SPX_OPTION_MARKET_RULE
 
         increment = 0.01
-        for price_rule in rule:
-            if price_rule.lowEdge <= price:
-                increment = price_rule.increment
+        for edge, inc in SPX_OPTION_MARKET_RULE_T:
+            if edge <= price:
+                increment = inc
             else:
                 break
 
@@ -88,12 +96,10 @@ class TestTickSizeResolution:
     @pytest.mark.parametrize("price,expected_tick,description", SPX_TICK_SIZE_TEST_CASES)
     def test_spx_tick_size_at_price_levels(self, price, expected_tick, description):
         """Parametrized test for all SPX price levels."""
-        rule = SPX_OPTION_MARKET_RULE
-
         increment = 0.01
-        for price_rule in rule:
-            if price_rule.lowEdge <= price:
-                increment = price_rule.increment
+        for edge, inc in SPX_OPTION_MARKET_RULE_T:
+            if edge <= price:
+                increment = inc
             else:
                 break
 
@@ -102,12 +108,11 @@ class TestTickSizeResolution:
     def test_bug_case_price_460_must_use_010(self):
         """CRITICAL: Price $4.60 MUST use 0.10 tick for SPX (the original bug)."""
         price, expected_tick, description = BUG_CASE_TICK_010
-        rule = SPX_OPTION_MARKET_RULE
 
         increment = 0.01
-        for price_rule in rule:
-            if price_rule.lowEdge <= price:
-                increment = price_rule.increment
+        for edge, inc in SPX_OPTION_MARKET_RULE_T:
+            if edge <= price:
+                increment = inc
             else:
                 break
 
@@ -123,7 +128,7 @@ class TestFallbackMinTick:
         min_tick = 0.05
 
         # Simulate _create_fallback_rule()
-        fallback_rule = [SimpleNamespace(lowEdge=0.0, increment=min_tick)]
+        fallback_rule = [MockPriceIncrement(lowEdge=0.0, increment=min_tick)]
 
         assert len(fallback_rule) == 1
         assert fallback_rule[0].lowEdge == 0.0
@@ -132,13 +137,13 @@ class TestFallbackMinTick:
     def test_fallback_applies_at_all_prices(self):
         """Fallback rule should apply same tick at all price levels."""
         min_tick = 0.05
-        fallback_rule = [SimpleNamespace(lowEdge=0.0, increment=min_tick)]
+        fallback_rule = [MockPriceIncrement(lowEdge=0.0, increment=min_tick)]
 
         for price in [0.01, 1.00, 3.00, 10.00, 100.00]:
             increment = 0.01
-            for price_rule in fallback_rule:
-                if price_rule.lowEdge <= price:
-                    increment = price_rule.increment
+            for edge, inc in fallback_rule:
+                if edge <= price:
+                    increment = inc
                 else:
                     break
 
@@ -148,31 +153,19 @@ class TestFallbackMinTick:
 class TestBrokerTickSizeIntegration:
     """Integration tests for TWSBroker tick size methods."""
 
-    def test_get_price_increment_with_cached_rules(self):
+    def test_get_price_increment_with_cached_rules(self, broker):
         """Test _get_price_increment uses cached market rules.
 
         SPX official tick sizes (CBOE):
         - Below $3.00: tick = 0.05
         - At/above $3.00: tick = 0.10
         """
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
         # Create a mock contract
-        contract = Mock()
-        contract.conId = 123456789
-        contract.symbol = "SPX"
-        contract.secType = "OPT"
-        contract.exchange = "SMART"
-        contract.comboLegs = None
+        contract = MockContract(conId=123456789, symbol="SPX", secType="OPT", exchange="SMART")
 
         # Pre-populate the cache with SPX market rules (correct CBOE values)
         # Cache key is conId only (unique identifier)
-        broker._market_rules_cache[contract.conId] = [
-            SimpleNamespace(lowEdge=0.0, increment=0.05),   # Below $3: 0.05
-            SimpleNamespace(lowEdge=3.0, increment=0.10),   # $3 and above: 0.10
-        ]
+        broker._cache_market_rule(contract.conId, SPX_OPTION_MARKET_RULE)
 
         # Test at various price levels
         assert broker._get_price_increment(contract, 2.50) == 0.05   # Below $3
@@ -180,29 +173,18 @@ class TestBrokerTickSizeIntegration:
         assert broker._get_price_increment(contract, 4.60) == 0.10   # Above $3
         assert broker._get_price_increment(contract, 10.00) == 0.10  # Well above $3
 
-    def test_get_price_increment_with_negative_prices(self):
+    def test_get_price_increment_with_negative_prices(self, broker):
         """Test _get_price_increment handles negative prices (credit spreads).
 
-        Credit spread prices are negative, but tick size is based on abs(price).
+        Credit spread prices are negative, but tick size is based on abs(price),
+        so it must match _get_price_increment_unsigned at the absolute price.
         SPX: 0.05 below $3, 0.10 at/above $3
         """
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
-        contract = Mock()
-        contract.conId = 123456789
-        contract.symbol = "SPX"
-        contract.secType = "OPT"
-        contract.exchange = "SMART"
-        contract.comboLegs = None
+        contract = MockContract(conId=123456789, symbol="SPX", secType="OPT", exchange="SMART")
 
         # Pre-populate the cache with SPX market rules (correct CBOE values)
         # Cache key is conId only (unique identifier)
-        broker._market_rules_cache[contract.conId] = [
-            SimpleNamespace(lowEdge=0.0, increment=0.05),   # Below $3: 0.05
-            SimpleNamespace(lowEdge=3.0, increment=0.10),   # $3 and above: 0.10
-        ]
+        broker._cache_market_rule(contract.conId, SPX_OPTION_MARKET_RULE)
 
         # Credit spread prices are negative, but tick size is based on abs(price)
         # Price -4.60 has abs value 4.60, which is >= 3.0, so tick = 0.10
@@ -211,28 +193,66 @@ class TestBrokerTickSizeIntegration:
         assert broker._get_price_increment(contract, -3.00) == 0.10   # abs=3.00 >= 3
         assert broker._get_price_increment(contract, -10.00) == 0.10  # abs=10.00 >= 3
 
-    def test_get_price_increment_cache_miss_returns_default(self):
-        """Test _get_price_increment returns default when cache miss."""
-        from trailing_stop_web.broker import TWSBroker
+        for price in (-4.60, -2.50, -3.00, -10.00):
+            assert (broker._get_price_increment(contract, price)
+                    == broker._get_price_increment_unsigned(contract, -price))
+        assert broker._get_price_increment_unsigned(contract, 2.50) == 0.05
+        assert broker._get_price_increment_unsigned(contract, 3.00) == 0.10
 
-        broker = TWSBroker()
+    def test_cache_market_rule_stores_edges_and_increments(self, broker):
+        """Test _cache_market_rule stores a rule as parallel lowEdge/increment tuples."""
+        # Bands in reverse order: the cached rule is sorted by lowEdge
+        broker._cache_market_rule(123456789, SPX_OPTION_MARKET_RULE[::-1])
 
-        contract = Mock()
-        contract.conId = 999999  # Not in cache
-        contract.symbol = "TEST"
-        contract.secType = "OPT"
-        contract.exchange = "SMART"
-        contract.comboLegs = None
+        assert broker._market_rules_cache[123456789] == SPX_OPTION_MARKET_RULE_SOA
+
+    def test_get_price_increment_with_multi_band_rule(self, broker):
+        """Test _get_price_increment picks the right band of a rule with 3+ bands.
+
+        The cached rule is bisected, so check every band edge and the gaps
+        between them.
+        """
+        contract = MockContract(conId=123456789, symbol="ES", secType="FOP", exchange="CME")
+
+        broker._cache_market_rule(contract.conId, [
+            MockPriceIncrement(lowEdge=0.0, increment=0.05),
+            MockPriceIncrement(lowEdge=5.0, increment=0.25),
+            MockPriceIncrement(lowEdge=10.0, increment=0.50),
+        ])
+
+        assert broker._get_price_increment(contract, 0.00) == 0.05
+        assert broker._get_price_increment(contract, 4.99) == 0.05
+        assert broker._get_price_increment(contract, 5.00) == 0.25
+        assert broker._get_price_increment(contract, 9.99) == 0.25
+        assert broker._get_price_increment(contract, 10.00) == 0.50
+        assert broker._get_price_increment(contract, -12.00) == 0.50
+
+    def test_replacing_two_band_rule_drops_fast_path(self, broker):
+        """Test a two-band rule replaced by a multi-band rule is no longer answered by the fast path."""
+        contract = MockContract(conId=123456789, symbol="SPX", secType="OPT", exchange="SMART")
+
+        broker._cache_market_rule(contract.conId, SPX_OPTION_MARKET_RULE)
+        assert contract.conId in broker._fast_rule_cache
+        assert broker._get_price_increment(contract, 20.00) == 0.10
+
+        broker._cache_market_rule(contract.conId, [
+            MockPriceIncrement(lowEdge=0.0, increment=0.05),
+            MockPriceIncrement(lowEdge=3.0, increment=0.10),
+            MockPriceIncrement(lowEdge=10.0, increment=0.25),
+        ])
+        assert contract.conId not in broker._fast_rule_cache
+        assert broker._get_price_increment(contract, 20.00) == 0.25
+        assert broker._get_price_increment(contract, 2.00) == 0.05
+
+    def test_get_price_increment_cache_miss_returns_default(self, broker):
+        """Test _get_price_increment returns default when cache miss."""
+        contract = MockContract(conId=999999, symbol="TEST", secType="OPT", exchange="SMART")  # Not in cache
 
         # Should return default 0.01 when not cached
         assert broker._get_price_increment(contract, 5.00) == 0.01
 
-    def test_round_to_tick_preserves_sign(self):
+    def test_round_to_tick_preserves_sign(self, broker):
         """Test _round_to_tick preserves sign for credit spreads."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
         # Positive prices (debit) - use pytest.approx for floating point
         assert broker._round_to_tick(4.62, 0.05) == pytest.approx(4.60, abs=0.001)
         assert broker._round_to_tick(4.63, 0.05) == pytest.approx(4.65, abs=0.001)
@@ -243,137 +263,143 @@ class TestBrokerTickSizeIntegration:
         assert broker._round_to_tick(-4.63, 0.05) == pytest.approx(-4.65, abs=0.001)
         assert broker._round_to_tick(-4.60, 0.05) == pytest.approx(-4.60, abs=0.001)
 
-    def test_round_to_tick_with_001_increment(self):
+    def test_round_to_tick_with_001_increment(self, broker):
         """Test _round_to_tick with 0.01 increment."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
-        # Note: Python's round() uses "banker's rounding" (round half to even)
-        # So 4.625 rounds to 4.62 (even), not 4.63
         assert broker._round_to_tick(4.626, 0.01) == pytest.approx(4.63, abs=0.001)
         assert broker._round_to_tick(4.624, 0.01) == pytest.approx(4.62, abs=0.001)
         assert broker._round_to_tick(2.996, 0.01) == pytest.approx(3.00, abs=0.001)
+        # Halves round away from zero, not to even
+        assert broker._round_to_tick(4.625, 0.01) == pytest.approx(4.63, abs=0.001)
+
+    @pytest.mark.parametrize("price,increment,expected", [
+        (2.97, 0.05, 2.95),
+        (2.98, 0.05, 3.00),
+        (3.05, 0.10, 3.10),   # float division gives 30.4999... ticks
+        (4.60, 0.10, 4.60),
+        (4.64, 0.10, 4.60),
+        (12.35, 0.05, 12.35),
+        (-4.63, 0.05, -4.65),
+        (-3.05, 0.10, -3.10),
+        (0.07, 0.05, 0.05),
+        (0.0, 0.05, 0.0),
+    ])
+    def test_round_to_tick_is_exact_on_spx_grid(self, broker, price, increment, expected):
+        """Test _round_to_tick returns exactly the grid price, not just approximately."""
+        assert broker._round_to_tick(price, increment) == expected
+
+    def test_round_to_tick_with_tiny_increment(self, broker):
+        """Test _round_to_tick doesn't divide by zero for an increment below 1e-8."""
+        assert broker._round_to_tick(4.62, 1e-9) == pytest.approx(4.62)
+        assert broker._round_to_tick(-4.62, 1e-9) == pytest.approx(-4.62)
 
 
 class TestComboTickSize:
     """Test tick size resolution for BAG (combo) contracts."""
 
-    def test_spx_combo_uses_lookup_table(self):
+    def test_spx_combo_uses_lookup_table(self, broker):
         """SPX BAG contracts should use combo tick from lookup table (0.05)."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
         # Create BAG contract for SPX
-        combo_contract = Mock()
-        combo_contract.conId = 999999
-        combo_contract.symbol = "SPX"
-        combo_contract.secType = "BAG"
-        combo_contract.exchange = "CBOE"
-        combo_contract.comboLegs = [Mock(conId=111111)]
+        combo_contract = MockContract(
+            conId=999999,
+            symbol="SPX",
+            secType="BAG",
+            exchange="CBOE",
+            comboLegs=[ComboLeg(conId=111111)],
+        )
 
         # SPX combos use 0.05 tick regardless of price (CBOE rule)
         assert broker._get_price_increment(combo_contract, 4.60) == 0.05
         assert broker._get_price_increment(combo_contract, 2.50) == 0.05
         assert broker._get_price_increment(combo_contract, 50.00) == 0.05
 
-    def test_penny_pilot_combo_uses_001_tick(self):
+    def test_penny_pilot_combo_uses_001_tick(self, broker):
         """Penny Pilot symbols should use 0.01 tick for combos."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
         # Create BAG contract for TSLA (Penny Pilot)
-        combo_contract = Mock()
-        combo_contract.conId = 888888
-        combo_contract.symbol = "TSLA"
-        combo_contract.secType = "BAG"
-        combo_contract.exchange = "SMART"
-        combo_contract.comboLegs = [Mock(conId=222222)]
+        combo_contract = MockContract(
+            conId=888888,
+            symbol="TSLA",
+            secType="BAG",
+            exchange="SMART",
+            comboLegs=[ComboLeg(conId=222222)],
+        )
 
         # Penny Pilot combos use 0.01 tick
         assert broker._get_price_increment(combo_contract, 5.00) == 0.01
         assert broker._get_price_increment(combo_contract, 0.50) == 0.01
 
-    def test_unknown_symbol_combo_falls_back_to_first_leg(self):
+    def test_unknown_symbol_combo_falls_back_to_first_leg(self, broker):
         """Unknown symbols should fall back to first leg's market rules."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
-        # Create first leg contract for unknown symbol
-        leg_contract = Mock()
-        leg_contract.conId = 333333
-        leg_contract.symbol = "UNKNOWN"
-        leg_contract.secType = "OPT"
-        leg_contract.exchange = "SMART"
-        leg_contract.comboLegs = None
-
         # Create BAG contract
-        combo_contract = Mock()
-        combo_contract.conId = 777777
-        combo_contract.symbol = "UNKNOWN"
-        combo_contract.secType = "BAG"
-        combo_contract.exchange = "SMART"
-        combo_contract.comboLegs = [Mock(conId=333333)]
-
-        # Add first leg to positions
-        pos = Mock()
-        pos.raw_contract = leg_contract
-        broker._positions[333333] = pos
-
-        # Cache market rules for the leg
-        broker._market_rules_cache[333333] = [
-            SimpleNamespace(lowEdge=0.0, increment=0.05),
-            SimpleNamespace(lowEdge=3.0, increment=0.10),
-        ]
+        combo_contract = MockContract(
+            conId=777777,
+            symbol="UNKNOWN",
+            secType="BAG",
+            exchange="SMART",
+            comboLegs=[ComboLeg(conId=333333)],
+        )
+
+        # Cache market rules for the leg (keyed by the leg's conId)
+        broker._cache_market_rule(333333, SPX_OPTION_MARKET_RULE)
 
         # Unknown symbol falls back to first leg's rules
         assert broker._get_price_increment(combo_contract, 4.60) == 0.10   # >= $3
         assert broker._get_price_increment(combo_contract, 2.50) == 0.05   # < $3
 
+    def test_combo_first_leg_fallback_does_not_read_positions(self, broker):
+        """The first-leg fallback should look up the leg's rule by conId alone."""
+        # BAGs built by the app carry conId 0
+        combo_contract = MockContract(
+            conId=0,
+            symbol="UNKNOWN",
+            secType="BAG",
+            exchange="SMART",
+            comboLegs=[ComboLeg(conId=333333)],
+        )
+
+        broker._cache_market_rule(333333, SPX_OPTION_MARKET_RULE)
+        broker._positions = MagicMock()
+
+        assert broker._get_price_increment(combo_contract, 4.60) == 0.10
+        assert broker._get_price_increment(combo_contract, 2.50) == 0.05
+        assert not broker._positions.mock_calls
+
+    def test_combo_first_leg_without_cached_rule_returns_default(self, broker):
+        """Unknown symbol whose first leg has no cached rule should use the default tick."""
+        combo_contract = MockContract(
+            conId=0,
+            symbol="UNKNOWN",
+            secType="BAG",
+            exchange="SMART",
+            comboLegs=[ComboLeg(conId=444444)],
+        )
+
+        assert broker._get_price_increment(combo_contract, 4.60) == 0.01
+
 
 class TestCreateFallbackRule:
     """Test the _create_fallback_rule helper method."""
 
-    def test_creates_single_element_list(self):
+    def test_creates_single_element_list(self, broker):
         """Fallback rule should be a single-element list."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
         rule = broker._create_fallback_rule(0.05)
 
         assert isinstance(rule, list)
         assert len(rule) == 1
 
-    def test_fallback_rule_has_correct_structure(self):
-        """Fallback rule should have lowEdge and increment."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
+    def test_fallback_rule_has_correct_structure(self, broker):
+        """Fallback rule should be a PriceIncrement, like reqMarketRule() returns."""
         rule = broker._create_fallback_rule(0.05)
 
-        assert hasattr(rule[0], 'lowEdge')
-        assert hasattr(rule[0], 'increment')
+        assert isinstance(rule[0], PriceIncrement)
         assert rule[0].lowEdge == 0.0
         assert rule[0].increment == 0.05
 
-    def test_fallback_works_with_get_price_increment(self):
+    def test_fallback_works_with_get_price_increment(self, broker):
         """Fallback rule should work with _get_price_increment."""
-        from trailing_stop_web.broker import TWSBroker
-
-        broker = TWSBroker()
-
-        contract = Mock()
-        contract.conId = 888888
-        contract.symbol = "TEST"
-        contract.secType = "OPT"
-        contract.exchange = "SMART"
-        contract.comboLegs = None
+        contract = MockContract(conId=888888, symbol="TEST", secType="OPT", exchange="SMART")
 
         # Use fallback rule in cache (key is conId only)
-        broker._market_rules_cache[888888] = broker._create_fallback_rule(0.05)
+        broker._cache_market_rule(888888, broker._create_fallback_rule(0.05))
 
         # Should use 0.05 at all price levels
         assert broker._get_price_increment(contract, 1.00) == 0.05
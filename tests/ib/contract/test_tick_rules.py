@@ -142,3 +142,17 @@ class TestDataIntegrity:
         for symbol, rule in COMBO_TICK_RULES.items():
             assert rule.combo_tick > 0, f"{symbol} has invalid combo_tick"
             assert rule.single_tick_default > 0, f"{symbol} has invalid single_tick_default"
+
+    def test_get_combo_tick_matches_tables(self):
+        """get_combo_tick should agree with COMBO_TICK_RULES and PENNY_PILOT_SYMBOLS."""
+        for symbol, rule in COMBO_TICK_RULES.items():
+            assert get_combo_tick(symbol) == rule.combo_tick, symbol
+        for symbol in PENNY_PILOT_SYMBOLS:
+            assert get_combo_tick(symbol) == 0.01, symbol
+
+    def test_tables_are_read_only(self):
+        """The lookup tables can't be changed at runtime (_COMBO_TICKS is derived from them)."""
+        with pytest.raises(TypeError):
+            COMBO_TICK_RULES["XYZ"] = COMBO_TICK_RULES["SPX"]
+        with pytest.raises(AttributeError):
+            PENNY_PILOT_SYMBOLS.add("XYZ")
@@ -9,55 +9,56 @@ The watchdog uses reqCurrentTime() as a lightweight heartbeat
 to detect network issues or TWS crashes that don't trigger
 the normal disconnect events.
 """
+import time
+
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
 
+from trailing_stop_web.broker import TWSBroker
+from trailing_stop_web.config import RECONNECT_INITIAL_DELAY
+
 
 class TestHeartbeatWatchdog:
     """Test heartbeat watchdog functionality."""
 
     def test_heartbeat_success_updates_timestamp(self):
         """Successful heartbeat should update last_heartbeat timestamp."""
-        from trailing_stop_web.broker import TWSBroker
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker.ib = Mock()
             broker.ib.reqCurrentTime.return_value = datetime.now()
             broker._last_heartbeat = None
 
+            before = time.monotonic_ns()
             result = broker._send_heartbeat()
 
             assert result is True
-            assert broker._last_heartbeat is not None
+            assert isinstance(broker._last_heartbeat, int)
+            assert before <= broker._last_heartbeat <= time.monotonic_ns()
             broker.ib.reqCurrentTime.assert_called_once()
 
     def test_heartbeat_failure_returns_false(self):
         """Failed heartbeat (exception) should return False."""
-        from trailing_stop_web.broker import TWSBroker
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker.ib = Mock()
             broker.ib.reqCurrentTime.side_effect = Exception("Connection lost")
-            broker._last_heartbeat = 12345.0
+            broker._last_heartbeat = 12_345_000_000_000
 
             result = broker._send_heartbeat()
 
             assert result is False
             # Last heartbeat should NOT be updated on failure
-            assert broker._last_heartbeat == 12345.0
+            assert broker._last_heartbeat == 12_345_000_000_000
 
     def test_heartbeat_none_response_returns_false(self):
         """Heartbeat returning None should be treated as failure."""
-        from trailing_stop_web.broker import TWSBroker
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker.ib = Mock()
             broker.ib.reqCurrentTime.return_value = None
-            broker._last_heartbeat = 12345.0
+            broker._last_heartbeat = 12_345_000_000_000
 
             result = broker._send_heartbeat()
 
@@ -69,14 +70,11 @@ class TestConnectionMetrics:
 
     def test_metrics_when_connected(self):
         """Metrics should show uptime when connected."""
-        from trailing_stop_web.broker import TWSBroker
-        import time
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker._connected = True
-            broker._connect_time = time.time() - 60  # Connected 60s ago
-            broker._last_heartbeat = time.time() - 5  # Heartbeat 5s ago
+            broker._connect_time = time.monotonic_ns() - 60_000_000_000  # Connected 60s ago
+            broker._last_heartbeat = time.monotonic_ns() - 5_000_000_000  # Heartbeat 5s ago
             broker._reconnect_count = 3
             broker._last_disconnect_reason = "Test reason"
 
@@ -90,8 +88,6 @@ class TestConnectionMetrics:
 
     def test_metrics_when_disconnected(self):
         """Metrics should show zero uptime when disconnected."""
-        from trailing_stop_web.broker import TWSBroker
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker._connected = False
@@ -131,9 +127,6 @@ class TestReconnectCountTracking:
 
     def test_reconnect_increments_count(self):
         """Each reconnection attempt should increment the count."""
-        from trailing_stop_web.broker import TWSBroker
-        from trailing_stop_web.config import RECONNECT_INITIAL_DELAY
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker._reconnect_attempt = 0
@@ -156,8 +149,6 @@ class TestConnectionStatusPolling:
 
     def test_get_connection_status_returns_current(self):
         """get_connection_status should return _current_status."""
-        from trailing_stop_web.broker import TWSBroker
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker._current_status = "Reconnecting in 5s (#2) (Heartbeat timeout)"
@@ -168,8 +159,6 @@ class TestConnectionStatusPolling:
 
     def test_notify_status_updates_current_status(self):
         """_notify_status should update _current_status for polling."""
-        from trailing_stop_web.broker import TWSBroker
-
         with patch.object(TWSBroker, '__init__', lambda x: None):
             broker = TWSBroker()
             broker._current_status = "Disconnected"
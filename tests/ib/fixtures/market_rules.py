@@ -11,12 +11,11 @@ This is the root cause of the bug where we incorrectly used 0.01 for all prices.
 """
 from types import SimpleNamespace
 from dataclasses import dataclass
-from typing import Optional
+from typing import NamedTuple, Optional
 
 
-@dataclass
-class MockPriceIncrement:
-    """Mimics ib_insync PriceIncrement from reqMarketRule()."""
+class MockPriceIncrement(NamedTuple):
+    """Mimics ib_insync PriceIncrement from reqMarketRule() (also a NamedTuple)."""
     lowEdge: float
     increment: float
 
@@ -32,7 +31,7 @@ class MockContractDetails:
     timeZoneId: str = "US/Eastern"
 
 
-@dataclass
+@dataclass(slots=True)
 class MockContract:
     """Mimics ib_insync Contract."""
     conId: int
@@ -52,34 +51,50 @@ class MockContract:
 # MARKET RULE FIXTURES
 # =============================================================================
 
+# Rules are tuples so tests can share them: TWSBroker._cache_market_rule()
+# copies a rule into its own layout, and nothing may modify the fixture
+
 # SPX Option Market Rule (Rule ID 110 from IB)
 # CBOE official tick sizes for SPX:
 # - Below $3.00: tick = 0.05 ($5.00)
 # - At/above $3.00: tick = 0.10 ($10.00)
 # Source: https://www.cboe.com/tradable_products/sp_500/spx_options/specifications/
-SPX_OPTION_MARKET_RULE = [
+SPX_OPTION_MARKET_RULE = (
     MockPriceIncrement(lowEdge=0.0, increment=0.05),   # Below $3: tick=0.05
     MockPriceIncrement(lowEdge=3.0, increment=0.10),   # $3 and above: tick=0.10
-]
+)
+
+# The same rule as plain (lowEdge, increment) pairs, for scans that don't need
+# the PriceIncrement shape of SPX_OPTION_MARKET_RULE
+SPX_OPTION_MARKET_RULE_T: tuple[tuple[float, float], ...] = (
+    (0.0, 0.05),
+    (3.0, 0.10),
+)
+
+# The same rule as TWSBroker._cache_market_rule() stores it: (lowEdges, increments)
+SPX_OPTION_MARKET_RULE_SOA = (
+    (0.0, 3.0),
+    (0.05, 0.10),
+)
 
 # Stock Market Rule (typical US equities)
 # Simple: always 0.01 tick
-STOCK_MARKET_RULE = [
+STOCK_MARKET_RULE = (
     MockPriceIncrement(lowEdge=0.0, increment=0.01),
-]
+)
 
 # Penny Pilot Options (many equity options)
 # Similar to SPX but different threshold
-PENNY_PILOT_OPTION_RULE = [
+PENNY_PILOT_OPTION_RULE = (
     MockPriceIncrement(lowEdge=0.0, increment=0.01),   # Below $3: tick=0.01
     MockPriceIncrement(lowEdge=3.0, increment=0.05),   # $3 and above: tick=0.05
-]
+)
 
 # ES Future Option (CME)
 # Tick size is always 0.25 for ES options
-ES_OPTION_MARKET_RULE = [
+ES_OPTION_MARKET_RULE = (
     MockPriceIncrement(lowEdge=0.0, increment=0.25),
-]
+)
 
 
 # =============================================================================
@@ -150,7 +165,7 @@ def create_stock_contract(
 # These test cases verify the tick size at different price levels
 # Format: (price, expected_tick, description)
 # SPX official: 0.05 below $3, 0.10 at/above $3
-SPX_TICK_SIZE_TEST_CASES = [
+SPX_TICK_SIZE_TEST_CASES = (
     (0.50, 0.05, "SPX option below $3 should use 0.05 tick"),
     (1.00, 0.05, "SPX option at $1 should use 0.05 tick"),
     (2.99, 0.05, "SPX option just below $3 should use 0.05 tick"),
@@ -159,7 +174,7 @@ SPX_TICK_SIZE_TEST_CASES = [
     (5.00, 0.10, "SPX option at $5 should use 0.10 tick"),
     (10.00, 0.10, "SPX option at $10 should use 0.10 tick"),
     (50.00, 0.10, "SPX option at $50 should use 0.10 tick"),
-]
+)
 
 # This is the specific bug case: price >= $3 was incorrectly using 0.01
 # The correct tick for SPX at $4.60 is 0.10 (not 0.01, not 0.05)
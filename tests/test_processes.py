@@ -0,0 +1,139 @@
+"""Unit tests for the launcher process helpers (trailing_stop_web.processes)."""
+import io
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from trailing_stop_web import processes
+
+TCP_HEADER = ("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when "
+              "retrnsmt   uid  timeout inode\n")
+
+
+def tcp_line(local: str, state: str, inode: str) -> str:
+    """Build one /proc/net/tcp row."""
+    return (f"   0: {local} 00000000:0000 {state} 00000000:00000000 00:00000000 "
+            f"00000000  1000        0 {inode} 1 0000000000000000 100 0 0 10 0\n")
+
+
+def fake_proc_files(files: dict[str, str]):
+    """Patch open() so ``files`` are readable and every other path is missing."""
+    def fake_open(path, *args, **kwargs):
+        if path not in files:
+            raise FileNotFoundError(path)
+        return io.StringIO(files[path])
+    return patch("builtins.open", side_effect=fake_open)
+
+
+def stat_line(comm: bytes, start_time: int) -> bytes:
+    """Build a /proc/<pid>/stat line with starttime as field 22."""
+    # Fields 3..21 after "pid (comm)", then starttime, then a few more
+    return b"1234 (" + comm + b") S " + b" ".join(b"0" for _ in range(18)) \
+        + b" %d 0 0\n" % start_time
+
+
+class TestListeningInodes:
+    """Tests for the /proc/net/tcp parser."""
+
+    def test_maps_listening_inodes_to_ports(self):
+        """Only LISTEN rows on the requested ports are returned."""
+        files = {
+            "/proc/net/tcp": TCP_HEADER
+            + tcp_line("0100007F:1F40", "0A", "111")    # 8000 LISTEN
+            + tcp_line("0100007F:1F40", "01", "222")    # 8000 ESTABLISHED
+            + tcp_line("00000000:0BB8", "0A", "333"),   # 3000 LISTEN, not asked for
+            "/proc/net/tcp6": TCP_HEADER
+            + tcp_line("00000000000000000000000001000000:1435", "0A", "444"),  # 5173
+        }
+        with fake_proc_files(files):
+            assert processes._listening_inodes({8000, 5173}) == {"111": 8000, "444": 5173}
+
+    def test_missing_table_is_skipped(self):
+        """A missing tcp6 table (IPv6 disabled) is not an error."""
+        files = {"/proc/net/tcp": TCP_HEADER + tcp_line("0100007F:1F40", "0A", "111")}
+        with fake_proc_files(files):
+            assert processes._listening_inodes({8000}) == {"111": 8000}
+
+    def test_short_rows_are_ignored(self):
+        """Truncated rows are skipped instead of raising."""
+        files = {"/proc/net/tcp": TCP_HEADER + "   0: 0100007F:1F40 00000000:0000 0A\n"}
+        with fake_proc_files(files):
+            assert processes._listening_inodes({8000}) == {}
+
+
+class TestProcessStartTime:
+    """Tests for reading a process start time from /proc/<pid>/stat."""
+
+    def test_parses_starttime_field(self):
+        """starttime is field 22, even if comm contains spaces and parentheses."""
+        data = stat_line(b"bun run (dev)", 987654)
+        with patch("builtins.open", return_value=io.BytesIO(data)):
+            assert processes._process_start_time(1234) == 987654
+
+    @pytest.mark.parametrize("data", [b"", b"1234 (bun) S 1 2 3", b"1234 (bun) S " + b"x " * 25])
+    def test_malformed_stat_returns_none(self, data):
+        """Truncated or non-numeric stat content means 'unknown', not an exception."""
+        with patch("builtins.open", return_value=io.BytesIO(data)):
+            assert processes._process_start_time(1234) is None
+
+    def test_missing_process_returns_none(self):
+        """No /proc entry (process gone, or no /proc at all) returns None."""
+        with patch("builtins.open", side_effect=FileNotFoundError):
+            assert processes._process_start_time(1234) is None
+
+
+class TestIsPreviousProcess:
+    """Tests for the PID-recycling check used before killing a saved PID."""
+
+    def test_dead_process_is_not_previous(self):
+        """A PID that no longer exists is skipped."""
+        with patch("os.kill", side_effect=ProcessLookupError):
+            assert processes._is_previous_process(1234, 100) is False
+
+    def test_matching_start_time_is_previous(self):
+        """Same PID and start time: the process from the PID file."""
+        with patch("os.kill"), patch.object(processes, "_process_start_time", return_value=100):
+            assert processes._is_previous_process(1234, 100) is True
+
+    def test_recycled_pid_is_not_previous(self):
+        """Same PID, different start time: a new process reused the PID."""
+        with patch("os.kill"), patch.object(processes, "_process_start_time", return_value=200):
+            assert processes._is_previous_process(1234, 100) is False
+
+    def test_without_recorded_start_time_falls_back_to_liveness(self):
+        """PID files written without a start time (non-Linux) only check liveness."""
+        with patch("os.kill"), patch.object(processes, "_process_start_time", return_value=200):
+            assert processes._is_previous_process(1234, None) is True
+
+    @pytest.mark.skipif(sys.platform != "linux", reason="needs /proc")
+    def test_real_child_process(self):
+        """A live child matches its own start time, and stops matching once reaped."""
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            start_time = processes._process_start_time(child.pid)
+            assert start_time is not None
+            assert processes._is_previous_process(child.pid, start_time) is True
+            assert processes._is_previous_process(child.pid, start_time + 1) is False
+        finally:
+            child.kill()
+            child.wait()
+        assert processes._is_previous_process(child.pid, start_time) is False
+
+
+class TestSavePids:
+    """Tests for the PID file round trip."""
+
+    def test_save_pids_records_start_time(self, tmp_path):
+        """Start times are appended where known; the temp file is renamed away."""
+        pid_file = tmp_path / "test.pid"
+        with patch.object(processes, "_process_start_time", side_effect=[100, None]):
+            processes.save_pids(pid_file, {"backend": 11, "frontend": 22})
+        assert pid_file.read_text() == "backend:11:100\nfrontend:22\n"
+        assert not os.path.exists(f"{pid_file}.tmp")
+
+    def test_remove_pid_file_ignores_missing_file(self, tmp_path):
+        """Removing an already removed PID file is not an error."""
+        processes.remove_pid_file(tmp_path / "missing.pid")
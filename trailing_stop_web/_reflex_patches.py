@@ -0,0 +1,140 @@
+"""Runtime patches for the frozen production build (scripts/templates/main_prod.py).
+
+The production binary serves the prebuilt .web export from the backend, so
+Reflex must not try to generate or install the frontend, and the app module
+has to be handed to Reflex directly because dynamic imports don't work in
+Nuitka builds. Living in the package, these patches are compiled into the
+binary with the rest of trailing_stop_web.
+
+Usage:
+    install()                  # before importing the app module
+    use_app_module(app_module) # after importing it
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def install() -> None:
+    """Patch Reflex and Socket.IO; must run before the app module is imported."""
+    import reflex.app
+    import reflex.utils.js_runtimes
+    import reflex.utils.prerequisites
+    import socketio
+
+    # 1. Disable frontend build but keep backend-critical steps
+    # The original _compile does important things:
+    # 1. _apply_decorated_pages() - registers pages
+    # 2. _compile_page() - evaluates State references (CRITICAL!)
+    # 3. _add_optional_endpoints() - adds upload endpoints
+    # We must run these for State updates to work!
+    def _backend_only_compile(self, *args, **kwargs):
+        """Run only backend-critical parts of _compile, skip frontend generation."""
+        logger.info("Running backend-only compile (no frontend generation)...")
+
+        # 1. Apply decorated pages (registers routes)
+        self._apply_decorated_pages()
+        self._pages = {}
+
+        # 2. Evaluate all pages (CRITICAL for State var registration!)
+        for route in self._unevaluated_pages:
+            logger.debug(f"Evaluating page: {route}")
+            self._compile_page(route, save_page=False)
+
+        # 3. Add optional endpoints (upload, etc.)
+        self._add_optional_endpoints()
+
+        logger.info(f"Backend compile done: {len(self._unevaluated_pages)} pages evaluated")
+
+    reflex.app.App._compile = _backend_only_compile
+
+    # 2. Disable install_frontend_packages to prevent npm/bun install
+    reflex.utils.js_runtimes.install_frontend_packages = lambda *args, **kwargs: None
+
+    # 3. Disable any other prerequisite functions that might call npm/bun
+    if hasattr(reflex.utils.prerequisites, 'initialize_frontend_dependencies'):
+        reflex.utils.prerequisites.initialize_frontend_dependencies = lambda *args, **kwargs: None
+
+    logger.info("Applied backend-only compile monkey-patch")
+
+    # 4. CRITICAL: Patch Socket.IO to accept both polling and websocket transports
+    # MUST be done BEFORE importing the app module, because app = rx.App() is
+    # created at module load time, which creates the AsyncServer
+    _original_async_server_init = socketio.AsyncServer.__init__
+
+    def _patched_async_server_init(self, *args, **kwargs):
+        # Force dual transport support
+        kwargs['transports'] = ['polling', 'websocket']
+        kwargs['allow_upgrades'] = True
+        kwargs['cors_allowed_origins'] = '*'
+        kwargs['cors_credentials'] = True
+        logger.info("AsyncServer.__init__ called with patched transports")
+        return _original_async_server_init(self, *args, **kwargs)
+
+    socketio.AsyncServer.__init__ = _patched_async_server_init
+    logger.info("Patched AsyncServer to use transports=['polling', 'websocket']")
+
+    # 4b. Patch Socket.IO base_server.get_environ to handle race condition
+    # When using polling transport, events can arrive before the session is fully registered
+    def _patched_get_environ(self, sid, namespace=None):
+        """Patched get_environ with retry logic for polling transport race condition."""
+        eio_sid = self.manager.eio_sid_from_sid(sid, namespace or '/')
+        environ = self.environ.get(eio_sid)
+        if environ is None and eio_sid is not None:
+            # Race condition: eio_sid exists but environ not yet stored
+            # This can happen with polling transport when events arrive fast
+            logger.debug(f"get_environ: eio_sid={eio_sid} found but environ missing, may be race condition")
+        return environ
+
+    socketio.base_server.BaseServer.get_environ = _patched_get_environ
+    logger.info("Patched get_environ with race condition handling")
+
+    # 4c. Patch Reflex EventNamespace.on_event to handle environ race condition
+    # The original raises RuntimeError immediately if environ is None
+    # We patch it to retry a few times with small delays
+    _original_event_namespace_on_event = reflex.app.EventNamespace.on_event
+
+    async def _patched_on_event(self, sid, data):
+        """Patched on_event with retry logic for environ race condition."""
+        max_retries = 5
+        retry_delay = 0.1  # 100ms
+
+        for attempt in range(max_retries):
+            # Check if environ is available
+            if self.app.sio is not None:
+                environ = self.app.sio.get_environ(sid, self.namespace)
+                if environ is not None:
+                    # Environ is ready, call original method
+                    return await _original_event_namespace_on_event(self, sid, data)
+
+            if attempt < max_retries - 1:
+                logger.debug(f"on_event: environ not ready for sid={sid}, retry {attempt + 1}/{max_retries}")
+                await asyncio.sleep(retry_delay)
+
+        # After all retries, log warning and skip this event
+        logger.warning(f"on_event: environ still not initialized after {max_retries} retries for sid={sid}, skipping event")
+        # Don't raise - just silently skip the event to prevent task exception
+        return None
+
+    reflex.app.EventNamespace.on_event = _patched_on_event
+    logger.info("Patched EventNamespace.on_event with retry logic")
+
+
+def use_app_module(app_module) -> None:
+    """Make Reflex use the already imported app module.
+
+    config.app_module is read-only, so get_app() is patched directly; this
+    bypasses the dynamic __import__() which doesn't work in Nuitka.
+    """
+    import reflex.utils.prerequisites
+    from reflex.config import get_config
+
+    def patched_get_app(reload: bool = False):
+        return app_module
+
+    reflex.utils.prerequisites.get_app = patched_get_app
+
+    # Also mark the app name as valid to skip filesystem checks
+    get_config()._app_name_is_valid = True
+    logger.info("Patched get_app() to return pre-imported module")
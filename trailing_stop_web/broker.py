@@ -1,4 +1,5 @@
 """TWS Broker - connects to Interactive Brokers TWS with real-time events."""
+from bisect import bisect_right
 from dataclasses import dataclass, field
 from datetime import datetime
 from threading import Thread
@@ -6,7 +7,7 @@ from typing import Callable, Optional
 import asyncio
 import logging
 from pathlib import Path
-from ib_insync import IB, Contract, Option, Stock, Index, Future, ComboLeg, PortfolioItem, Ticker, util, Order, Trade, TimeCondition
+from ib_insync import IB, Contract, Option, Stock, Index, Future, ComboLeg, PortfolioItem, PriceIncrement, Ticker, util, Order, Trade, TimeCondition
 import uuid
 
 # Enable ib_insync debug logging to file
@@ -21,6 +22,7 @@ from .config import (
     HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT
 )
 from .logger import logger
+from .tick_rules import get_combo_tick
 
 
 @dataclass
@@ -258,8 +260,9 @@ class TWSBroker:
         self._connection_status_callback: Optional[Callable[[str], None]] = None
 
         # Connection metrics for watchdog
-        self._connect_time: Optional[float] = None  # Timestamp when connected
-        self._last_heartbeat: Optional[float] = None  # Last successful heartbeat
+        # Timestamps are time.monotonic_ns(): immune to wall-clock changes
+        self._connect_time: Optional[int] = None  # Timestamp when connected
+        self._last_heartbeat: Optional[int] = None  # Last successful heartbeat
         self._reconnect_count: int = 0  # Total reconnects since start
         self._last_disconnect_reason: str = ""  # Why we disconnected
         self._current_status: str = "Disconnected"  # Current status string for UI
@@ -269,12 +272,16 @@ class TWSBroker:
         self._trading_hours_cache: dict[str, dict] = {}
         self._last_cache_date: str = ""  # Track date for midnight cache clear
 
-        # Market rules cache: {conId: [PriceIncrement, ...]}
-        # Stores tick size rules loaded from reqMarketRule() for each contract
+        # Market rules cache: {conId: (lowEdges, increments)}
+        # Stores tick size rules loaded from reqMarketRule() for each contract, as two
+        # parallel tuples sorted by lowEdge (see _cache_market_rule)
         # Used by _get_price_increment() to determine correct tick size at any price level
         # Key is conId only (unique identifier) - previously used (conId, exchange) which
         # caused mismatches when BAG contracts had different exchange than position contracts
-        self._market_rules_cache: dict[int, list] = {}
+        self._market_rules_cache: dict[int, tuple[tuple[float, ...], tuple[float, ...]]] = {}
+        # Fast path for rules with at most two bands starting at 0 (most options, and
+        # every minTick fallback): {conId: (threshold, increment_below, increment_at_or_above)}
+        self._fast_rule_cache: dict[int, tuple[float, float, float]] = {}
 
     def _run_loop(self):
         """Run ib_insync event loop in separate thread with reconnection support."""
@@ -319,8 +326,8 @@ class TWSBroker:
 
             # Update connection metrics
             import time
-            self._connect_time = time.time()
-            self._last_heartbeat = time.time()
+            self._connect_time = time.monotonic_ns()
+            self._last_heartbeat = self._connect_time
             if self._reconnect_count > 0:
                 logger.info(f"Reconnected (total reconnects: {self._reconnect_count})")
 
@@ -380,8 +387,9 @@ class TWSBroker:
         to detect silent disconnects (network issues, TWS crashes).
         """
         import time
-        last_fetch = time.time()
-        last_heartbeat_check = time.time()
+        # Monotonic clock, so a system clock change can't delay or skip heartbeats
+        last_fetch = time.monotonic()
+        last_heartbeat_check = last_fetch
 
         while self._connected and not self._stop_requested:
             self.ib.sleep(0.1)  # Process IB events
@@ -399,7 +407,7 @@ class TWSBroker:
             # Check for midnight and clear trading hours cache
             self._check_midnight_cache_clear()
 
-            now = time.time()
+            now = time.monotonic()
 
             # Heartbeat watchdog: send reqCurrentTime every HEARTBEAT_INTERVAL
             if now - last_heartbeat_check >= HEARTBEAT_INTERVAL:
@@ -429,7 +437,7 @@ class TWSBroker:
             # reqCurrentTime is async-aware in ib_insync event loop
             server_time = self.ib.reqCurrentTime()
             if server_time is not None:
-                self._last_heartbeat = time.time()
+                self._last_heartbeat = time.monotonic_ns()
                 return True
             else:
                 logger.warning("Heartbeat: reqCurrentTime returned None")
@@ -518,12 +526,12 @@ class TWSBroker:
         - last_disconnect_reason: str
         """
         import time
-        now = time.time()
+        now = time.monotonic_ns()
         return {
             "connected": self._connected,
-            "uptime_seconds": (now - self._connect_time) if self._connected and self._connect_time else 0,
+            "uptime_seconds": (now - self._connect_time) / 1e9 if self._connected and self._connect_time is not None else 0,
             "reconnect_count": self._reconnect_count,
-            "last_heartbeat_ago": (now - self._last_heartbeat) if self._last_heartbeat else None,
+            "last_heartbeat_ago": (now - self._last_heartbeat) / 1e9 if self._last_heartbeat is not None else None,
             "last_disconnect_reason": self._last_disconnect_reason,
         }
 
@@ -1253,7 +1261,7 @@ class TWSBroker:
                 if rule_id_to_use is not None:
                     rule = self.ib.reqMarketRule(rule_id_to_use)
                     if rule:
-                        self._market_rules_cache[cache_key] = rule
+                        self._cache_market_rule(cache_key, rule)
                         loaded += 1
                         # Log actual tick sizes from the rule
                         tick_info = ", ".join(f"≥${r.lowEdge}→{r.increment}" for r in rule[:3])
@@ -1262,12 +1270,12 @@ class TWSBroker:
                         logger.info(f"[TICK] {contract.symbol} {contract.secType}: {tick_info}")
                     else:
                         # reqMarketRule returned empty - use minTick fallback
-                        self._market_rules_cache[cache_key] = self._create_fallback_rule(min_tick)
+                        self._cache_market_rule(cache_key, self._create_fallback_rule(min_tick))
                         fallback_count += 1
                         logger.debug(f"[TICK] {contract.symbol}: market rule empty, using minTick={min_tick}")
                 else:
                     # No rule ID found - use minTick fallback
-                    self._market_rules_cache[cache_key] = self._create_fallback_rule(min_tick)
+                    self._cache_market_rule(cache_key, self._create_fallback_rule(min_tick))
                     fallback_count += 1
                     logger.debug(f"[TICK] {contract.symbol}: no rule ID, using minTick={min_tick}")
 
@@ -1276,33 +1284,61 @@ class TWSBroker:
 
         logger.info(f"Pre-loaded {loaded} market rules ({fallback_count} using minTick fallback)")
 
-    def _create_fallback_rule(self, min_tick: float) -> list:
+    def _create_fallback_rule(self, min_tick: float) -> list[PriceIncrement]:
         """Create a fallback market rule using minTick from ContractDetails.
 
-        Returns a list with a single SimpleNamespace object that mimics
-        the PriceIncrement structure from reqMarketRule().
+        Returns a list with a single PriceIncrement, the same type that
+        reqMarketRule() returns.
         """
-        from types import SimpleNamespace
-        return [SimpleNamespace(lowEdge=0.0, increment=min_tick)]
+        return [PriceIncrement(lowEdge=0.0, increment=min_tick)]
+
+    def _cache_market_rule(self, con_id: int, rule: list):
+        """Store a market rule (list of PriceIncrement) in _market_rules_cache.
+
+        The rule is kept as a tuple of lowEdges and a parallel tuple of
+        increments, both sorted by lowEdge, so _get_price_increment() can
+        bisect the edges instead of scanning every price band.
+        """
+        bands = sorted((float(r.lowEdge), float(r.increment)) for r in rule)
+        edges = tuple(edge for edge, _ in bands)
+        increments = tuple(increment for _, increment in bands)
+        self._market_rules_cache[con_id] = (edges, increments)
+
+        # A one-band rule is a two-band rule whose threshold is 0
+        if 1 <= len(edges) <= 2 and edges[0] == 0.0:
+            self._fast_rule_cache[con_id] = (edges[-1], increments[0], increments[-1])
+        else:
+            self._fast_rule_cache.pop(con_id, None)
 
     def _get_price_increment(self, contract: Contract, price: float) -> float:
         """Get price increment for a contract at a given price using MarketRules.
 
         The tick size can vary based on the price level (e.g., SPX options have
-        different increments for prices above/below $3).
+        different increments for prices above/below $3). Credit spreads can have
+        negative prices, but the tick size is determined by the absolute price.
+
+        Args:
+            contract: IB Contract
+            price: Current price to determine increment for (may be negative)
+
+        Returns:
+            Price increment (e.g., 0.01, 0.05, 0.10)
+        """
+        return self._get_price_increment_unsigned(contract, -price if price < 0 else price)
+
+    def _get_price_increment_unsigned(self, contract: Contract, abs_price: float) -> float:
+        """Same as _get_price_increment(), for a price already known to be >= 0.
 
         According to IB docs: marketRuleIds and validExchanges are positionally mapped.
         marketRuleIds[n] corresponds to validExchanges[n].
 
         Args:
             contract: IB Contract
-            price: Current price to determine increment for
+            abs_price: Absolute price to determine increment for
 
         Returns:
             Price increment (e.g., 0.01, 0.05, 0.10)
         """
-        from trailing_stop_web.tick_rules import get_combo_tick
-
         default_tick = 0.01
 
         # BAG (combo) contracts: use combo tick rules
@@ -1311,16 +1347,18 @@ class TWSBroker:
         if contract.secType == "BAG":
             combo_tick = get_combo_tick(contract.symbol)
             if combo_tick is not None:
-                logger.debug(f"[TICK] BAG {contract.symbol}: using combo tick override = {combo_tick}")
+                logger.debug("[TICK] BAG {}: using combo tick override = {}", contract.symbol, combo_tick)
                 return combo_tick
 
             # Fallback: get tick from first leg (for unknown symbols)
+            # Market rules are cached by the leg's conId, so look the rule up
+            # directly instead of going through the leg's position contract
             if contract.comboLegs:
                 first_leg_id = contract.comboLegs[0].conId
-                pos = self._positions.get(first_leg_id)
-                if pos and pos.raw_contract:
-                    logger.debug(f"[TICK] BAG {contract.symbol}: no combo rule, using first leg {first_leg_id}")
-                    return self._get_price_increment(pos.raw_contract, price)
+                increment = self._cached_rule_increment(first_leg_id, abs_price, default_tick)
+                if increment is not None:
+                    logger.debug("[TICK] BAG {}: no combo rule, using first leg {}", contract.symbol, first_leg_id)
+                    return increment
 
             logger.warning(f"BAG contract {contract.symbol}: no combo rule and could not get tick from legs!")
             return default_tick
@@ -1330,28 +1368,40 @@ class TWSBroker:
 
         # Use pre-loaded cache only (no API calls during async handlers)
         # Market rules are loaded in _preload_market_rules() during load_portfolio()
-        rule = self._market_rules_cache.get(cache_key, [])
+        increment = self._cached_rule_increment(cache_key, abs_price, default_tick)
 
-        if not rule:
+        if increment is None:
             # Cache miss - market rules weren't pre-loaded for this contract
             logger.warning(f"No cached market rules for {contract.symbol} {contract.secType} "
                           f"conId={contract.conId} - using default tick")
             return default_tick
 
-        # Find increment for this price level
-        # Use abs(price) because credit spreads can have negative prices
-        # but tick size is determined by absolute price magnitude
-        abs_price = abs(price)
-        increment = default_tick
-        for price_rule in rule:
-            if price_rule.lowEdge <= abs_price:
-                increment = float(price_rule.increment)
-            else:
-                break
-
-        logger.debug(f"[TICK] {contract.symbol} {contract.secType} at ${price:.2f} (abs=${abs_price:.2f}): increment={increment}")
+        # Called for every stop price: let loguru format the message only if
+        # DEBUG is enabled, instead of building an f-string on every call
+        logger.debug("[TICK] {} {} at ${:.2f}: increment={}",
+                     contract.symbol, contract.secType, abs_price, increment)
         return increment
 
+    def _cached_rule_increment(self, con_id: int, abs_price: float, default_tick: float) -> Optional[float]:
+        """Look up the increment at abs_price in the cached market rule for con_id.
+
+        Returns default_tick if abs_price is below the rule's first band, and
+        None if no rule is cached for con_id.
+        """
+        fast_rule = self._fast_rule_cache.get(con_id)
+        if fast_rule is not None:
+            threshold, increment_below, increment_above = fast_rule
+            return increment_above if abs_price >= threshold else increment_below
+
+        rule = self._market_rules_cache.get(con_id)
+        if rule is None:
+            return None
+
+        edges, increments = rule
+        # Index of the last band whose lowEdge <= abs_price (-1 if below all bands)
+        i = bisect_right(edges, abs_price) - 1
+        return increments[i] if i >= 0 else default_tick
+
     def _get_min_tick(self, contract: Contract) -> float:
         """Get minTick (fallback, uses default price of 10).
 
@@ -1372,9 +1422,19 @@ class TWSBroker:
         if increment <= 0:
             increment = 0.01  # Fallback
 
+        # Round in integers (units of 1e-8): the result is the float closest to
+        # an exact multiple of the increment, and halves round away from zero
+        # instead of to even. float division would put e.g. 3.05 / 0.10 at
+        # 30.4999... and round it down
+        scale = 100_000_000
+        scaled_price = round(abs(price) * scale)
+        # At least one unit, so a sub-1e-8 increment can't divide by zero
+        scaled_increment = max(1, round(increment * scale))
+        ticks = (scaled_price + scaled_increment // 2) // scaled_increment
+
         # Preserve sign for negative prices (credit spreads)
         sign = 1 if price >= 0 else -1
-        return sign * round(abs(price) / increment) * increment
+        return sign * ticks * scaled_increment / scale
 
     def place_stop_order(
         self,
@@ -1420,7 +1480,7 @@ class TWSBroker:
 
         # Get price increment based on actual price level and round
         # For combos: auxPrice can be NEGATIVE (credit spreads use SELL @ negative price)
-        stop_increment = self._get_price_increment(contract, abs(stop_price))
+        stop_increment = self._get_price_increment_unsigned(contract, abs(stop_price))
         stop_price_rounded = self._round_to_tick(stop_price, stop_increment)
         logger.debug(f"Price rounding: ${stop_price:.4f} -> ${stop_price_rounded:.2f} (tick={stop_increment})")
 
@@ -1431,7 +1491,7 @@ class TWSBroker:
         else:
             # Stop-Limit Order - limit price may have different increment
             # For combos: lmtPrice can be NEGATIVE (credit spreads use SELL @ negative price)
-            limit_increment = self._get_price_increment(contract, abs(limit_price))
+            limit_increment = self._get_price_increment_unsigned(contract, abs(limit_price))
             limit_price_rounded = self._round_to_tick(limit_price, limit_increment)
             order.orderType = "STP LMT"
             order.auxPrice = stop_price_rounded
@@ -1530,10 +1590,10 @@ class TWSBroker:
                     return True  # No change needed
 
                 # Get price increment and round
-                stop_increment = self._get_price_increment(trade.contract, abs(new_stop_price))
+                stop_increment = self._get_price_increment_unsigned(trade.contract, abs(new_stop_price))
                 order.auxPrice = self._round_to_tick(new_stop_price, stop_increment)
                 if new_limit_price != 0:
-                    limit_increment = self._get_price_increment(trade.contract, abs(new_limit_price))
+                    limit_increment = self._get_price_increment_unsigned(trade.contract, abs(new_limit_price))
                     order.lmtPrice = self._round_to_tick(new_limit_price, limit_increment)
 
                 # Re-place the order (ib_insync handles modification)
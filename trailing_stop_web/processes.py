@@ -0,0 +1,396 @@
+"""Process management shared by the launchers (main.py, main_desktop.py).
+
+- PID file bookkeeping and cleanup of processes left over by a previous run
+- Waiting for child processes and ports without busy polling
+- Shutdown signals and the exit watchdog
+"""
+import logging
+import os
+import re
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def _process_start_time(pid: int) -> int | None:
+    """Return the kernel start time of ``pid`` from /proc (Linux), or None.
+
+    Together with the PID this identifies a process across PID reuse.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        # comm (field 2) may contain spaces; starttime is field 22 overall
+        return int(stat.rpartition(b")")[2].split()[19])
+    except (OSError, ValueError, IndexError):
+        # Unreadable or truncated stat: treat like a system without /proc
+        return None
+
+
+def _is_previous_process(pid: int, start_time: int | None) -> bool:
+    """Check that ``pid`` is alive, ours, and not a recycled PID."""
+    try:
+        os.kill(pid, 0)  # liveness/permission probe, no signal delivered
+    except OSError:
+        return False
+    current = _process_start_time(pid)
+    return start_time is None or current is None or current == start_time
+
+
+def save_pids(pid_file: Path, pids: dict[str, int]) -> None:
+    """Save process IDs to ``pid_file`` for cleanup on next start."""
+    try:
+        lines = []
+        for name, pid in pids.items():
+            start_time = _process_start_time(pid)
+            lines.append(f"{name}:{pid}\n" if start_time is None else f"{name}:{pid}:{start_time}\n")
+        data = "".join(lines).encode()
+        # Write-then-rename so a crash never leaves a truncated PID file behind
+        tmp_file = f"{pid_file}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0), 0o600)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_file, pid_file)
+        logger.info(f"Saved PIDs to {pid_file}")
+    except Exception as e:
+        logger.debug(f"Could not save PIDs: {e}")
+
+
+_SOCKET_LINK_RE = re.compile(r"socket:\[(\d+)\]")
+
+
+def _listening_inodes(ports: set[int]) -> dict[str, int]:
+    """Map socket inode -> port for TCP sockets listening on ``ports`` (Linux).
+
+    Parses /proc/net/tcp and /proc/net/tcp6 (state ``0A`` is LISTEN).
+    """
+    inodes: dict[str, int] = {}
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                lines = f.read().splitlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 10 or fields[3] != "0A":
+                continue
+            port = int(fields[1].rsplit(":", 1)[1], 16)
+            if port in ports:
+                inodes[fields[9]] = port
+    return inodes
+
+
+def _cleanup_ports_linux(ports: set[int]) -> None:
+    """Kill processes listening on ``ports`` by walking /proc (no subprocesses)."""
+    inodes = _listening_inodes(ports)
+    if not inodes:
+        return
+
+    own_pid = os.getpid()
+    uid = os.getuid()
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit() or int(entry.name) == own_pid:
+            continue
+        try:
+            # Other users' fd tables are unreadable and unkillable for us
+            if uid != 0 and entry.stat(follow_symlinks=False).st_uid != uid:
+                continue
+            # Resolve links relative to one open dirfd (readlinkat) instead of
+            # walking the full /proc/<pid>/fd/<n> path for every descriptor
+            dir_fd = os.open(f"/proc/{entry.name}/fd", os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            continue
+        try:
+            port = None
+            for fd in os.listdir(dir_fd):
+                try:
+                    match = _SOCKET_LINK_RE.match(os.readlink(fd, dir_fd=dir_fd))
+                except OSError:
+                    continue
+                if match and match.group(1) in inodes:
+                    port = inodes[match.group(1)]
+                    break
+        finally:
+            os.close(dir_fd)
+        if port is not None:
+            try:
+                os.kill(int(entry.name), signal.SIGKILL)
+                logger.info(f"Killed process on port {port} (PID {entry.name})")
+            except (ProcessLookupError, PermissionError):
+                pass
+
+
+def _cleanup_ports_lsof(ports: set[int]) -> None:
+    """Kill processes listening on ``ports`` with a single ``lsof`` call (macOS fallback)."""
+    # -F pn output: "p<pid>" starts a process, "n<addr>:<port>" lists its sockets.
+    # Parsed as lsof writes it rather than buffering the whole listing.
+    pid_ports: dict[int, int] = {}
+    try:
+        with subprocess.Popen(
+            ["lsof", "-nP", "-iTCP", "-sTCP:LISTEN", "-F", "pn"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ) as proc:
+            watchdog = threading.Timer(5, proc.kill)
+            watchdog.start()
+            try:
+                pid = None
+                for line in proc.stdout:
+                    if line.startswith("p"):
+                        pid = int(line[1:])
+                    elif line.startswith("n") and pid is not None:
+                        port_str = line.rstrip().rpartition(":")[2]
+                        if port_str.isdigit() and int(port_str) in ports:
+                            pid_ports.setdefault(pid, int(port_str))
+            finally:
+                watchdog.cancel()
+    except Exception:
+        return
+
+    pid_ports.pop(os.getpid(), None)
+    for pid, port in pid_ports.items():
+        try:
+            os.kill(pid, signal.SIGKILL)
+            logger.info(f"Killed process on port {port} (PID {pid})")
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def _port_in_use(port: int) -> bool:
+    """Cheap bind() probe: False only if nothing holds ``port`` on IPv4 or IPv6."""
+    for family, host in ((socket.AF_INET, "0.0.0.0"), (socket.AF_INET6, "::")):
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+        except OSError:
+            continue  # address family unsupported (e.g. IPv6 disabled)
+        try:
+            if family == socket.AF_INET6:
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+            sock.bind((host, port))
+        except OSError:
+            return True
+        finally:
+            sock.close()
+    return False
+
+
+def cleanup_ports(ports: set[int]) -> None:
+    """Kill any processes listening on ``ports``."""
+    # Common case on a clean start: nothing to find, skip process discovery
+    ports = {port for port in ports if _port_in_use(port)}
+    if not ports:
+        return
+    if sys.platform == "linux":
+        try:
+            _cleanup_ports_linux(ports)
+            return
+        except OSError as e:
+            logger.debug(f"/proc port scan failed, falling back to lsof: {e}")
+    _cleanup_ports_lsof(ports)
+
+
+def _cleanup_processes_by_name_linux(patterns: list[str]) -> None:
+    """Kill processes whose command line matches a pattern, in one /proc scan."""
+    # One alternation searched once per cmdline; the named group tells which matched
+    union = re.compile(b"|".join(
+        b"(?P<p%d>%s)" % (i, pattern.encode()) for i, pattern in enumerate(patterns)
+    ))
+    own_pid = os.getpid()
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit() or int(entry.name) == own_pid:
+            continue
+        try:
+            with open(f"/proc/{entry.name}/cmdline", "rb") as f:
+                match = union.search(f.read().replace(b"\0", b" "))
+        except OSError:
+            continue
+        if match:
+            try:
+                os.kill(int(entry.name), signal.SIGKILL)
+                logger.info(f"Killed '{patterns[int(match.lastgroup[1:])]}' (PID {entry.name})")
+            except (ProcessLookupError, PermissionError):
+                pass
+
+
+def _cleanup_processes_by_name_pgrep(patterns: list[str]) -> None:
+    """Kill processes matching each pattern via ``pgrep -f`` (non-Linux fallback)."""
+    for pattern in patterns:
+        try:
+            result = subprocess.run(
+                ["pgrep", "-f", pattern],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                for pid_str in result.stdout.strip().split('\n'):
+                    try:
+                        pid = int(pid_str)
+                        if pid != os.getpid():
+                            os.kill(pid, signal.SIGKILL)
+                            logger.info(f"Killed '{pattern}' (PID {pid})")
+                    except (ProcessLookupError, ValueError, PermissionError):
+                        pass
+        except Exception:
+            pass
+
+
+def cleanup_processes_by_name(patterns: list[str]) -> None:
+    """Kill processes whose command line matches one of the regex ``patterns``."""
+    if sys.platform == "linux":
+        try:
+            _cleanup_processes_by_name_linux(patterns)
+            return
+        except OSError as e:
+            logger.debug(f"/proc process scan failed, falling back to pgrep: {e}")
+    _cleanup_processes_by_name_pgrep(patterns)
+
+
+def cleanup_previous_instance(pid_file: Path, ports: set[int], patterns: list[str]) -> None:
+    """Kill processes from previous instance (aggressive cleanup).
+
+    Args:
+        pid_file: PID file written by save_pids() on the previous run
+        ports: Ports the previous instance listened on
+        patterns: Command line patterns of its processes
+    """
+    # 1. Cleanup by PID file
+    try:
+        for line in pid_file.read_bytes().splitlines():
+            # "name:pid[:start_time]" (start time only recorded on Linux)
+            name, _, rest = line.partition(b":")
+            pid_bytes, _, start_bytes = rest.partition(b":")
+            try:
+                pid = int(pid_bytes)
+                if not _is_previous_process(pid, int(start_bytes) if start_bytes else None):
+                    continue
+                os.kill(pid, signal.SIGKILL)
+                logger.info(f"Killed previous {name.decode()} (PID {pid})")
+            except (ProcessLookupError, ValueError):
+                pass
+            except PermissionError:
+                logger.warning(f"No permission to kill {name.decode()} (PID {pid})")
+        os.unlink(pid_file)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.debug(f"PID cleanup error: {e}")
+
+    # 2. Cleanup by process name patterns
+    cleanup_processes_by_name(patterns)
+
+    # 3. Cleanup by ports
+    cleanup_ports(ports)
+
+
+def remove_pid_file(pid_file: Path) -> None:
+    """Remove PID file on clean shutdown."""
+    try:
+        os.unlink(pid_file)
+    except Exception:
+        pass
+
+
+def tcp_ready(port: int, timeout: float = 0.5) -> bool:
+    """Return True if localhost:port accepts a TCP connection.
+
+    "localhost" rather than 127.0.0.1: create_connection tries every address
+    it resolves to, and Vite/Node listen on ::1 only on some hosts.
+    """
+    try:
+        with socket.create_connection(("localhost", port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _poll_for_exit(process: subprocess.Popen, timeout: float | None,
+                   waiters: list[socket.socket]) -> bool:
+    """Fallback for wait_for_exit: poll the child every 0.5 s."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while process.poll() is None:
+        interval = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+        if interval <= 0:
+            return False
+        if waiters:
+            if select.select(waiters, [], [], interval)[0]:
+                return False
+        else:
+            time.sleep(interval)
+    return True
+
+
+def wait_for_exit(process: subprocess.Popen, timeout: float | None = None,
+                   wake: socket.socket | None = None) -> bool:
+    """Block until ``process`` exits, without periodic wakeups.
+
+    Uses a pidfd on Linux and a kqueue NOTE_EXIT filter on macOS, so the
+    kernel wakes us exactly when the child exits. Falls back to polling
+    elsewhere. Returns early if ``wake`` becomes readable.
+
+    Returns:
+        True if the process has exited (and was reaped)
+    """
+    if process.poll() is not None:
+        return True
+    waiters = [] if wake is None else [wake]
+    try:
+        if hasattr(os, "pidfd_open"):
+            pidfd = os.pidfd_open(process.pid)
+            try:
+                readable, _, _ = select.select([pidfd, *waiters], [], [], timeout)
+            finally:
+                os.close(pidfd)
+            exited = pidfd in readable
+        elif hasattr(select, "kqueue"):
+            kq = select.kqueue()
+            try:
+                changes = [select.kevent(process.pid, select.KQ_FILTER_PROC,
+                                         select.KQ_EV_ADD, select.KQ_NOTE_EXIT)]
+                changes += [select.kevent(w, select.KQ_FILTER_READ, select.KQ_EV_ADD)
+                            for w in waiters]
+                events = kq.control(changes, len(changes), timeout)
+            finally:
+                kq.close()
+            exited = any(e.filter == select.KQ_FILTER_PROC for e in events)
+        else:
+            return _poll_for_exit(process, timeout, waiters)
+    except OSError:
+        # ENOSYS on pre-5.3 kernels, or the child was already reaped
+        return _poll_for_exit(process, timeout, waiters)
+
+    if exited:
+        # Reap it (or let a concurrent wait() in another thread finish)
+        process.wait()
+    return exited
+
+
+# SIGHUP (terminal closed) and SIGQUIT (Ctrl+\) do not exist on Windows
+SHUTDOWN_SIGNALS = tuple(
+    getattr(signal, name)
+    for name in ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT")
+    if hasattr(signal, name)
+)
+
+
+def start_exit_watchdog(timeout: float = 10.0) -> None:
+    """Force-exit the process if shutdown hangs for longer than ``timeout`` seconds."""
+    def force_exit() -> None:
+        logger.error(f"Shutdown did not finish within {timeout:.0f}s, forcing exit")
+        os._exit(1)
+
+    timer = threading.Timer(timeout, force_exit)
+    timer.daemon = True
+    timer.start()
@@ -13,11 +13,13 @@ Sources:
 - ES: CME rules (to be researched)
 - TSLA/Equities: Penny Pilot program allows $0.01 for most spreads
 """
+from collections.abc import Mapping
 from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class TickRule:
     """Tick size rule for a symbol."""
     combo_tick: float          # Tick size for combo/spread orders
@@ -29,7 +31,8 @@ class TickRule:
 # Combo tick size overrides by symbol
 # Key: symbol (uppercase)
 # Value: TickRule with combo-specific tick size
-COMBO_TICK_RULES: dict[str, TickRule] = {
+# Read-only at runtime (edit the table here); _COMBO_TICKS below is derived from it
+COMBO_TICK_RULES: Mapping[str, TickRule] = MappingProxyType({
     # SPX Index Options (CBOE)
     # Single-leg: $0.05 below $3, $0.10 at/above $3
     # Combo/Spread: Always $0.05 net price
@@ -80,16 +83,24 @@ COMBO_TICK_RULES: dict[str, TickRule] = {
         exchange="CBOE",
         notes="Russell 2000 Index options"
     ),
-}
+})
 
 # Penny Pilot symbols - equity options that allow $0.01 tick for spreads
 # Most liquid equity options are in the Penny Pilot program
-PENNY_PILOT_SYMBOLS: set[str] = {
+PENNY_PILOT_SYMBOLS: frozenset[str] = frozenset({
     "AAPL", "AMZN", "AMD", "GOOGL", "GOOG", "META", "MSFT", "NVDA",
     "TSLA", "SPY", "QQQ", "IWM", "DIA", "XLF", "GLD", "SLV",
     "NFLX", "BABA", "BA", "JPM", "BAC", "C", "WFC", "GS",
     "XOM", "CVX", "PFE", "JNJ", "UNH", "MRK", "ABBV",
     # Add more as needed...
+})
+
+# Combo tick per symbol, precomputed from the two tables above so
+# get_combo_tick() is a single dict lookup. Explicit combo rules win over
+# Penny Pilot.
+_COMBO_TICKS: dict[str, float] = {
+    **{symbol.upper(): 0.01 for symbol in PENNY_PILOT_SYMBOLS},
+    **{symbol.upper(): rule.combo_tick for symbol, rule in COMBO_TICK_RULES.items()},
 }
 
 
@@ -102,18 +113,9 @@ def get_combo_tick(symbol: str) -> Optional[float]:
     Returns:
         Tick size for combo orders, or None if not defined (use single-leg rules)
     """
-    symbol = symbol.upper()
-
-    # Check explicit combo rules first
-    if symbol in COMBO_TICK_RULES:
-        return COMBO_TICK_RULES[symbol].combo_tick
-
-    # Penny Pilot symbols use $0.01 for spreads
-    if symbol in PENNY_PILOT_SYMBOLS:
-        return 0.01
-
-    # Unknown symbol - return None to signal "use single-leg rules"
-    return None
+    # Explicit combo rules, else $0.01 for Penny Pilot symbols, else None
+    # to signal "use single-leg rules"
+    return _COMBO_TICKS.get(symbol.upper())
 
 
 def get_tick_rule(symbol: str) -> Optional[TickRule]: